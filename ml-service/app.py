@@ -1,60 +1,201 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import joblib
-from train_model import TravelClassifier
+from nb_inference import InferenceClassifier, QUESTION_FIELDS, EXPORT_FILENAME, answer_options, answers_text
+from place_index import CandidateIndex, INDOOR_CODES
+from place_store import load_places, places_version as data_version, apply_delta_files, delta_files, validate_places
+from trip_cache import TripCache, plan_key
+from metrics import MetricsRegistry, NULL_TIMER, configure_logging
+from route_engine import RouteEngine, ROUTE_MODES, haversine_km, nearest_neighbour, path_length
+from scoring import CandidateScores, FITTING_VENUES, PLANNERS, condition_class, resolve_weights, top_k
+from scheduler import schedule_days
+from opening_hours import DAY_START_MINUTES, format_minutes, schedule_visits, travel_minutes
+from spatial_index import GridIndex
+from day_clusters import cluster_day_scores
+from explanations import ExplanationFragments
+from payloads import RESPONSE_FORMATS, compact_trip, encode, response_format
+from model_store import publish_version, save_version
+from background_jobs import JobRunner
+from online_learning import OnlineNaiveBayes
+from weather_cache import ForecastCache, OpenWeatherMapBackend
 import os
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from math import radians, sin, cos, sqrt, atan2
-import requests
-from datetime import datetime, timedelta
 
 
 app = Flask(__name__)
 CORS(app)
 
+configure_logging()
+logger = logging.getLogger('ml_service.planner')
+
+# Stage latency histograms for /metrics (METRICS_ENABLED=0 turns timing into no-ops)
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1') == '1')
+metrics.describe('stage_seconds', 'Trip planning stage latency in seconds')
+metrics.describe('cache_events_total', 'Weather and trip cache events')
+
 
 # Load Naive Bayes model at startup
-classifier = TravelClassifier()
+classifier = InferenceClassifier()
 model_path = 'models'
 
+CLASSIFIER_COMPILED = os.environ.get('CLASSIFIER_COMPILED', '1') == '1'
+
+# Background retraining: one job at a time, swapped in only after validation
+RETRAIN_CSV_PATH = 'data/training-data.csv'
+RETRAIN_MIN_ACCURACY = float(os.environ.get('RETRAIN_MIN_ACCURACY', 0.5))
+retrain_jobs = JobRunner('retrain')
+
+# Online learning from ingested answer sets, snapshotted in the background
+ONLINE_SNAPSHOT_DIR = os.environ.get('ONLINE_SNAPSHOT_DIR', f'{model_path}/online')
+ONLINE_SNAPSHOT_SECONDS = float(os.environ.get('ONLINE_SNAPSHOT_SECONDS', 60))
+ONLINE_MAX_BATCH = 1000
+# Every ingested answer set, in the training CSV's columns, so a retrain can learn from them too
+ONLINE_SAMPLES_PATH = os.environ.get('ONLINE_SAMPLES_PATH', 'data/ingested-data.csv')
+snapshot_jobs = JobRunner('online-snapshot')
+_snapshot_timer = None
+_snapshot_timer_lock = threading.Lock()
+# Serializes every replacement of the live classifier (ingest, snapshot, retrain)
+model_swap_lock = threading.Lock()
+# Worker processes serving the app (set by gunicorn.conf.py). Routes that change a process's
+# own model or places, and their job status, only make sense when there is one
+PREFORK_WORKERS = int(os.environ.get('PREFORK_WORKERS', 1))
+
+
+def export_legacy_model(model_dir):
+    """Write the NumPy export from the joblib pickles (imports scikit-learn once)"""
+    from train_model import TravelClassifier
+    legacy = TravelClassifier()
+    legacy.load_model(model_dir)
+    legacy.export(model_dir)
 
-if os.path.exists(f'{model_path}/naive_bayes_model.pkl'):
-    classifier.load_model(model_path)
-    print("✅ Naive Bayes model loaded on startup")
+
+def load_served_model():
+    """
+    The classifier to serve, preferring the online snapshot (the base model
+    plus every answer set ingested since) and falling back to the base
+    model. Returns an unloaded classifier when neither can be read.
+    """
+    sources = [(model_path, '')]
+    if os.path.exists(f'{ONLINE_SNAPSHOT_DIR}/{EXPORT_FILENAME}'):
+        sources.insert(0, (ONLINE_SNAPSHOT_DIR, ' (online snapshot)'))
+    for model_dir, label in sources:
+        model = InferenceClassifier()
+        try:
+            model.load_model(model_dir)
+        except Exception as e:
+            print(f"⚠ Could not load Naive Bayes model from {model_dir}: {e}")
+            continue
+        print(f"✅ Naive Bayes model loaded on startup{label}")
+        return model
+    return InferenceClassifier()
+
+
+if os.path.exists(f'{model_path}/naive_bayes_model.pkl') and not os.path.exists(f'{model_path}/{EXPORT_FILENAME}'):
+    # A hashed (streaming) model can't be exported from its pickles alone
+    try:
+        export_legacy_model(model_path)
+        print("✅ Exported Naive Bayes model for NumPy inference")
+    except Exception as e:
+        print(f"⚠ Could not export Naive Bayes model for NumPy inference: {e}")
+
+if os.path.exists(f'{model_path}/{EXPORT_FILENAME}'):
+    classifier = load_served_model()
+    
+    # Compiled mode: answer every known quiz combination from a lookup table
+    if CLASSIFIER_COMPILED and classifier.version is not None:
+        try:
+            combos = classifier.compile(answer_options(pd.read_csv(RETRAIN_CSV_PATH)))
+            print(f"✅ Compiled lookup table for {combos} answer combinations")
+        except Exception as e:
+            print(f"⚠ Could not compile classifier lookup table: {e}")
 else:
     print("⚠ No trained model found. Please run train_model.py first!")
 
 
-# Load places datasets
-try:
-    places_dataset = pd.read_csv('data/places_dataset.csv')
-    place_metadata = pd.read_csv('data/place_metadata.csv')
-    place_coordinates = pd.read_csv('data/place_coordinates.csv')
-    
-    # Keep category from places_dataset, add indoor_outdoor and popularity_rating from metadata
-    metadata_cols = place_metadata[['place_name', 'indoor_outdoor', 'popularity_rating']].copy()
-    
-    # Merge datasets
-    places = places_dataset.merge(metadata_cols, on='place_name', how='left')
-    places = places.merge(place_coordinates[['place_name', 'latitude', 'longitude']], on='place_name', how='left')
-    
-    print(f"✅ Loaded {len(places)} places from datasets")
-    print(f"✅ Columns: {places.columns.tolist()}")
-    print(f"\n📊 Category sample:")
-    print(places[['place_name', 'category']].head(10))
-    print(f"\n📊 Category distribution:")
-    print(places['category'].value_counts().head(20))
+def start_online_learning(model):
+    """Online learner continuing from a model, or None when it can't be started"""
+    try:
+        training_df = None if model.feature_count is not None else pd.read_csv(RETRAIN_CSV_PATH)
+        return OnlineNaiveBayes.from_model(model, training_df)
+    except Exception as e:
+        logger.warning("online_learning_unavailable error=%r", str(e))
+        return None
+
+
+online_model = start_online_learning(classifier) if classifier.version is not None else None
+
+
+# Load places datasets (pre-joined columnar snapshot, rebuilt from the CSVs when stale)
+places_data_dir = os.environ.get('PLACES_DATA_DIR', 'data')
+PLACES_SNAPSHOT = os.environ.get('PLACES_SNAPSHOT', '1') == '1'
+# Delta CSVs that upsert or delete single places on top of the merged data, applied by file name
+PLACES_DELTA_DIR = os.environ.get('PLACES_DELTA_DIR', f'{places_data_dir}/deltas')
+
+
+def load_place_data():
+    """Merged places data with the delta files applied: (places, applied deltas, version)"""
+    deltas = []
+    try:
+        places, places_source = load_places(places_data_dir, use_snapshot=PLACES_SNAPSHOT)
+        try:
+            found = delta_files(PLACES_DELTA_DIR)
+            if found:
+                updated = apply_delta_files(places, PLACES_DELTA_DIR, found)
+                validate_places(updated)
+                places, deltas = updated, found
+                print(f"✅ Applied {len(found)} place delta files")
+        except Exception as e:
+            print(f"⚠ Place deltas not applied: {e}")
+        
+        print(f"✅ Loaded {len(places)} places from {places_source}")
+        print(f"✅ Columns: {places.columns.tolist()}")
+        print(f"\n📊 Category sample:")
+        print(places[['place_name', 'category']].head(10))
+        print(f"\n📊 Category distribution:")
+        print(places['category'].value_counts().head(20))
+        return places, deltas, data_version(places_data_dir, deltas)
     
-except Exception as e:
-    print(f"⚠ Places data not found: {e}")
-    import traceback
-    traceback.print_exc()
-    places = pd.DataFrame()
+    except Exception as e:
+        print(f"⚠ Places data not found: {e}")
+        import traceback
+        traceback.print_exc()
+        return pd.DataFrame(), [], None
+
+
+# Cost categories allowed for each trip budget
+BUDGET_MAP = {
+    'LIMITED': ['Budget'],
+    'MODERATE': ['Budget', 'Mid-range'],
+    'LUXURY': ['Budget', 'Mid-range', 'Premium']
+}
+
+
+# Default time budget for route improvement modes (per day)
+ROUTE_TIME_BUDGET_MS = int(os.environ.get('ROUTE_TIME_BUDGET_MS', 50))
+
+# Default time budget for improving the multi-day schedule (per trip)
+SCHEDULE_TIME_BUDGET_MS = int(os.environ.get('SCHEDULE_TIME_BUDGET_MS', 10))
 
 
 # Weather API Configuration
 WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY', '419fb4dbb88789fe0e07850906085a82')
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', 'http://api.openweathermap.org/data/2.5')
+
+# Forecasts are cached per city; point WEATHER_API_URL at a stub server (or swap
+# weather_cache.backend) to run without OpenWeatherMap
+weather_cache = ForecastCache(
+    OpenWeatherMapBackend(WEATHER_API_KEY, WEATHER_API_URL),
+    ttl=int(os.environ.get('WEATHER_CACHE_TTL', 600)),
+    stale_ttl=int(os.environ.get('WEATHER_CACHE_STALE_TTL', 3600)),
+    max_entries=int(os.environ.get('WEATHER_CACHE_SIZE', 256))
+)
 
 
 # Traveler type information
@@ -153,318 +294,484 @@ TRAVELER_INFO = {
 
 
 # Helper functions
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two coordinates in km"""
-    R = 6371
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    return R * c
+def get_weather_forecast(city, days):
+    """Fetch weather forecast from OpenWeatherMap API (through the forecast cache)"""
+    return weather_cache.get(city, days)
 
 
-def get_weather_forecast(city, days):
-    """Fetch weather forecast from OpenWeatherMap API"""
-    try:
-        url = f"http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={WEATHER_API_KEY}&units=metric"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code != 200:
-            print(f"⚠ Weather API error: {response.status_code}")
-            return []
-        
-        data = response.json()
-        forecast = []
-        
-        for i in range(min(days, 5)):
-            if i * 8 < len(data['list']):
-                day_data = data['list'][i * 8]
-                forecast.append({
-                    'day': i + 1,
-                    'condition': day_data['weather'][0]['main'],
-                    'temp': round(day_data['main']['temp'], 1),
-                    'description': day_data['weather'][0]['description'],
-                    'humidity': day_data['main']['humidity']
-                })
-        
-        print(f"🌤 Weather forecast fetched: {len(forecast)} days")
-        return forecast
+def generate_explanation(state, row, user_data, condition, day_number, score=None):
+    """
+    Generate explainable AI reasons for recommendation.
+    
+    Built from the place's precomputed explanation fragments; condition is
+    the day's weather (None without a forecast) and score the scored
+    planner's breakdown, if any.
+    """
+    return state.fragments.explain(
+        row, user_data['travelerProfile']['travelerType'], user_data['latestTrip']['budget'],
+        condition, day_number, score
+    )
+
+
+def plan_trip_csp(user_data, weather_forecast=None, state=None):
+    """CSP-based trip planner with TRAVELER TYPE FILTERING"""
+    for event in plan_trip_events(user_data, weather_forecast, state):
+        if event[0] == 'done':
+            return event[1]
+
+
+def plan_trip_events(user_data, weather_forecast=None, state=None):
+    """
+    Plan a trip step by step so responses can be streamed.
+    
+    Yields ('weather', forecast) as soon as the forecast is known, then
+    ('day', name, places, route) as each day is planned, and finally
+    ('done', (itinerary, weather_forecast, route_summary)). The forecast is
+    fetched unless one is given. The whole trip is planned from one places
+    state, the current one unless given.
+    """
+    if state is None:
+        state = place_state
+    district = user_data['latestTrip']['district']
+    days = user_data['latestTrip']['days']
+    timer = metrics.timer()
+    start = time.perf_counter()
+    
+    with timer.span('total'):
+        if weather_forecast is None:
+            with timer.span('weather_fetch'):
+                weather_forecast = get_weather_forecast(district, days)
+        yield 'weather', weather_forecast
         
-    except Exception as e:
-        print(f"⚠ Weather API failed: {e}")
-        return []
+        # Same inputs and forecast give the same plan, so serve it from the result cache.
+        # Plans don't use the classifier, so only a places change invalidates them
+        key = plan_key(user_data, weather_forecast)
+        version = state.version
+        result = trip_cache.get(key, version)
+        if result is not None:
+            logger.debug("trip_cache_hit district=%s days=%s", district, days)
+            itinerary, _, route_summary = result
+            planned = ((name, day_places, route_summary['days'][name]) for name, day_places in itinerary.items())
+        else:
+            itinerary = {}
+            route_summary = new_route_summary(user_data.get('options') or {})
+            planned = iter_itinerary(state, user_data, weather_forecast, timer)
+        
+        for name, day_places, day_route in planned:
+            if name == 'Day 1':
+                # What a streaming client waits before it can show anything beyond the forecast
+                timer.add('time_to_first_day', time.perf_counter() - start)
+            if result is None:
+                itinerary[name] = day_places
+                route_summary['days'][name] = day_route
+            yield 'day', name, day_places, day_route
+        
+        if result is None:
+            route_summary['totalDistanceKm'] = round(sum(d['distanceKm'] for d in route_summary['days'].values()), 2)
+            route_summary['greedyDistanceKm'] = round(sum(d['greedyDistanceKm'] for d in route_summary['days'].values()), 2)
+            result = itinerary, weather_forecast, route_summary
+            trip_cache.put(key, version, result)
+    
+    timer.finish()
+    yield 'done', result
+
+
+def new_route_summary(options):
+    """Route summary for a trip before any day is planned"""
+    route_summary = {'mode': options.get('routeMode', 'greedy'), 'days': {}}
+    if options.get('planner', 'scored') != 'legacy':
+        route_summary['clustered'] = bool(options.get('clusterDays', False))
+    return route_summary
 
 
-def generate_explanation(place, user_data, constraints_met, day_number):
-    """Generate explainable AI reasons for recommendation"""
-    reasons = []
-    confidence_score = 0
-    max_score = 5
+def iter_itinerary(state, user_data, weather_forecast, timer=NULL_TIMER):
+    """Plan the trip's days for a known weather forecast, yielding (day name, places, route) in order"""
     
-    traveler_type = user_data['travelerProfile']['travelerType']
-    place_category = str(place.get('category', ''))
+    district = user_data['latestTrip']['district']
+    days = user_data['latestTrip']['days']
+    options = user_data.get('options') or {}
+    planner = options.get('planner', 'scored')
+    route_mode = options.get('routeMode', 'greedy')
+    route_budget_ms = options.get('routeTimeBudgetMs', ROUTE_TIME_BUDGET_MS)
+    cluster_days = bool(options.get('clusterDays', False))
+    explanations = options.get('explanations', True)
     
-    if traveler_type in place_category:
-        reasons.append(f"✓ Perfect match for '{traveler_type}' traveler type")
-        confidence_score += 1
-    elif any(keyword in place_category for keyword in traveler_type.split()):
-        reasons.append(f"≈ Partial match for '{traveler_type}' interests")
-        confidence_score += 0.5
+    if planner == 'legacy':
+        selected = select_places_legacy(state, user_data, weather_forecast, timer)
+        day_plans = (route_day(state, district, picks, route_mode, route_budget_ms, timer) for picks in selected)
+    else:
+        weights = resolve_weights(options.get('weights'))
+        schedule_budget_ms = options.get('scheduleTimeBudgetMs', SCHEDULE_TIME_BUDGET_MS)
+        day_plans = plan_days_scored(state, user_data, weather_forecast, weights, schedule_budget_ms,
+                                     route_mode, route_budget_ms, cluster_days, timer)
     
-    budget = user_data['latestTrip']['budget']
-    place_cost = str(place.get('cost_category', 'Budget'))
-    reasons.append(f"✓ Fits {budget} budget (place cost: {place_cost})")
-    confidence_score += 1
-    
-    rating = place.get('popularity_rating', 0)
-    if rating >= 4:
-        reasons.append(f"⭐ Highly rated: {rating}/5 stars")
-        confidence_score += 1
-    elif rating >= 2:
-        reasons.append(f"⭐ Rated: {rating}/5 stars")
-        confidence_score += 0.5
-    
-    duration = place.get('duration_hours', 2)
-    reasons.append(f"⏱ Duration: {duration}hrs fits Day {day_number} schedule")
-    confidence_score += 1
-    
-    if 'weather_condition' in constraints_met:
-        weather = constraints_met['weather_condition']
-        place_type = place.get('indoor_outdoor', 'outdoor')
-        if weather in ['Rain', 'Thunderstorm'] and place_type == 'indoor':
-            reasons.append(f"☔ Weather-smart: Indoor venue for rainy conditions")
-            confidence_score += 1
-        elif weather in ['Clear', 'Clouds'] and place_type == 'outdoor':
-            reasons.append(f"☀ Weather-perfect: Outdoor activity for good weather")
-            confidence_score += 1
+    # BUILD DAILY ITINERARY
+    for day, plan in zip(range(1, days + 1), day_plans):
+        day_weather = weather_forecast[day - 1] if day <= len(weather_forecast) else None
+        day_places = day_entries(state, plan, day, day_weather, user_data, explanations, timer)
+        
+        if day_places:
+            logger.debug("day_planned day=%d places=%d hours=%d distance_km=%.2f",
+                         day, len(day_places), sum(p['duration'] for p in day_places), plan['distanceKm'])
         else:
-            reasons.append(f"🌦 Weather-aware: {place_type} venue")
-            confidence_score += 0.5
+            logger.warning("empty_day district=%s day=%d", district, day)
+        
+        # Always add day to itinerary
+        yield f'Day {day}', day_places, {
+            'distanceKm': round(plan['distanceKm'], 2),
+            'greedyDistanceKm': round(plan['greedyDistanceKm'], 2)
+        }
+
+
+def day_entries(state, plan, day, day_weather, user_data, explanations=True, timer=NULL_TIMER):
+    """Itinerary entries for one day plan: place details, visiting times and explanations"""
+    day_places = [place_details(place, day_weather) for place, _, _ in plan['picks']]
+    for place_info, (start, end) in zip(day_places, plan.get('times') or []):
+        place_info['start'] = format_minutes(start)
+        place_info['end'] = format_minutes(end)
+    
+    # Clients that show explanations on demand fetch them from /explain instead
+    if explanations:
+        with timer.span('explanation_generation'):
+            condition = day_weather['condition'] if day_weather else None
+            for place_info, (_, row, score) in zip(day_places, plan['picks']):
+                place_info['explanation'] = generate_explanation(state, row, user_data, condition, day, score)
+    return day_places
+
+
+def route_day(state, district, picks, route_mode, route_budget_ms, timer=NULL_TIMER):
+    """A* Route Optimization over the cached district distance matrix"""
+    with timer.span('route_optimization'):
+        order, distance_km, greedy_km = state.engine.optimize(
+            district, [row for _, row, _ in picks], route_mode, route_budget_ms
+        )
+    return {'picks': [picks[i] for i in order], 'distanceKm': distance_km, 'greedyDistanceKm': greedy_km}
+
+
+def place_details(place, day_weather):
+    """Itinerary entry for one selected place"""
+    place_info = {
+        'name': str(place['place_name']),
+        'duration': int(place.get('duration_hours', 2)),
+        'category': str(place.get('category', '')),
+        'cost_category': str(place.get('cost_category', '')),
+        'rating': int(place.get('popularity_rating', 0)),
+        'type': str(place.get('indoor_outdoor', '')),
+        'latitude': float(place.get('latitude', 0)),
+        'longitude': float(place.get('longitude', 0)),
+        'timing': str(place.get('timing', ''))
+    }
     
+    if day_weather:
+        place_info['weather'] = weather_details(day_weather)
+    return place_info
+
+
+def weather_details(day_weather):
+    """The part of a day's forecast carried by each of its places"""
     return {
-        'reasons': reasons,
-        'confidence': round(confidence_score / max_score, 2),
-        'algorithm': 'CSP + A* + Weather-Aware Planning'
+        'condition': day_weather.get('condition'),
+        'temp': day_weather.get('temp'),
+        'description': day_weather.get('description')
     }
 
 
-def plan_trip_csp(user_data):
-    """CSP-based trip planner with TRAVELER TYPE FILTERING"""
+def plan_days_scored(state, user_data, weather_forecast, weights, time_budget_ms, route_mode, route_budget_ms,
+                     cluster_days=False, timer=NULL_TIMER):
+    """
+    Schedule every day at once to maximize the total weighted score.
     
+    Every de-duplicated place in the district is a candidate; type, budget
+    and weather fit are score terms rather than filters. With cluster_days
+    each day is limited to one spatial cluster of candidates. Each day is
+    then routed and timed against opening hours. Yields one day plan per
+    day as soon as it is routed and timed.
+    """
     district = user_data['latestTrip']['district']
     days = user_data['latestTrip']['days']
     budget = user_data['latestTrip']['budget']
     traveler_type = user_data['travelerProfile']['travelerType']
+    daily_hours = 8
+    
+    with timer.span('candidate_scoring'):
+        rows = state.index.unique_rows(district)
+        scores = CandidateScores(state.index, rows, traveler_type, budget, weights, daily_hours)
+    logger.info(
+        "candidate_scores district=%s traveler_type=%r budget=%s candidates=%d type_matched=%d",
+        district, traveler_type, budget, len(rows), int((scores.components['type'] == 1).sum())
+    )
+    
+    if len(rows) < days * 2:
+        logger.warning("small_pool district=%s pool=%d days=%d needed=%d", district, len(rows), days, days * 2)
     
-    weather_forecast = get_weather_forecast(district, days)
+    max_food = 2 if traveler_type == 'Foodie' else 1
+    conditions = [
+        weather_forecast[day - 1].get('condition') if day <= len(weather_forecast) and weather_forecast[day - 1]
+        else None
+        for day in range(1, days + 1)
+    ]
     
-    # Filter by district
-    filtered = places[places['destination_city'] == district].copy()
-    print(f"\n{'='*80}")
-    print(f"📍 STEP 1: Filter by District")
-    print(f"{'='*80}")
-    print(f"Total places in {district}: {len(filtered)}")
+    durations = state.index.duration[rows].astype(np.int64)
+    food = state.index.food_mask[rows]
     
-    # TRAVELER TYPE FILTERING
-    print(f"\n{'='*80}")
-    print(f"📍 STEP 2: Filter by Traveler Type")
-    print(f"{'='*80}")
-    print(f"Traveler Type: '{traveler_type}'")
+    with timer.span('day_selection'):
+        day_scores = np.array([scores.day_scores(condition) for condition in conditions]).reshape(days, len(rows))
+        # Places that can't be visited for their whole duration inside the day window never get scheduled
+        day_scores[:, ~state.index.opening_hours.visitable(rows, durations * 60)] = -np.inf
+        if cluster_days:
+            # Each day only draws from its own compact part of the district
+            day_scores = cluster_day_scores(day_scores, state.engine.latitudes[rows], state.engine.longitudes[rows],
+                                            durations, daily_hours)
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        assignment = schedule_days(day_scores, durations, food, daily_hours, max_food, deadline)
     
-    if 'category' in filtered.columns:
-        category_mask = filtered['category'].apply(
-            lambda x: traveler_type in str(x) if pd.notna(x) else False
+    for day in range(days):
+        picks = np.flatnonzero(assignment == day)
+        if len(picks) == 0:
+            # Nothing fits in the day's hours: fall back to the best unused place, as a single visit
+            free = np.flatnonzero((assignment < 0) & np.isfinite(day_scores[day]))
+            if len(free):
+                picks = free[[int(np.argmax(day_scores[day, free]))]]
+                assignment[picks] = day
+        picks = picks[np.argsort(-day_scores[day, picks], kind='stable')]
+        picks, times, distance_km, greedy_km = route_and_time(
+            state, district, rows, picks, assignment, day, day_scores[day], durations, food, daily_hours, max_food,
+            route_mode, route_budget_ms, timer
         )
         
-        type_matched = filtered[category_mask]
-        
-        print(f"Found {len(type_matched)} places with '{traveler_type}' in category")
-        
-        if len(type_matched) > 0:
-            print(f"\nMatching places (showing first 10):")
-            for idx, row in type_matched.head(10).iterrows():
-                print(f"  ✓ {row['place_name']:<40} | {row['category']}")
-        
-        if len(type_matched) >= days * 2:
-            filtered = type_matched
-            print(f"\n✅ Using {len(filtered)} matching places")
-        else:
-            print(f"\n⚠ Only {len(type_matched)} places (need {days * 2} minimum)")
-            if len(type_matched) > 0:
-                filtered = type_matched
-                print(f"⚠ Proceeding with all {len(filtered)} available places")
-    
-    # BUDGET FILTERING
-    print(f"\n{'='*80}")
-    print(f"📍 STEP 3: Budget Filtering (Optional)")
-    print(f"{'='*80}")
-    print(f"Budget: {budget}")
-    
-    budget_map = {
-        'LIMITED': ['Budget'],
-        'MODERATE': ['Budget', 'Mid-range'],
-        'LUXURY': ['Budget', 'Mid-range', 'Premium']
-    }
+        yield {
+            'picks': [(state.index.record(rows[p]), int(rows[p]), scores.breakdown(p, conditions[day])) for p in picks],
+            'times': times,
+            'distanceKm': distance_km,
+            'greedyDistanceKm': greedy_km
+        }
+
+
+def route_and_time(state, district, rows, picks, assignment, day, scores, durations, food, daily_hours, max_food,
+                   route_mode, route_budget_ms, timer=NULL_TIMER):
+    """Route one day's picks, then time them against opening hours; returns (picks, times, km, greedy km)"""
+    with timer.span('route_optimization'):
+        order, distance_km, greedy_km = state.engine.optimize(district, rows[picks], route_mode, route_budget_ms)
+    routed = picks[order]
     
-    if budget in budget_map and 'cost_category' in filtered.columns:
-        allowed_costs = budget_map[budget]
-        budget_filtered = filtered[filtered['cost_category'].isin(allowed_costs)]
-        
-        print(f"Allowed costs: {allowed_costs}")
-        print(f"Places matching budget: {len(budget_filtered)}")
-        
-        if len(budget_filtered) >= days * 2:
-            filtered = budget_filtered
-            print(f"✅ Applied budget filter: {len(filtered)} places")
-        else:
-            print(f"⚠ Budget filter too strict, keeping all {len(filtered)} places")
+    with timer.span('timetable'):
+        picks, times = fit_opening_hours(
+            state, district, rows, routed, assignment, day, scores, durations, food, daily_hours, max_food
+        )
+        if not np.array_equal(picks, routed):
+            dist = state.engine.stop_matrix(district, rows[picks])
+            distance_km = path_length(dist, np.arange(len(picks)))
+            greedy_km = path_length(dist, nearest_neighbour(dist)) if len(picks) else 0.0
+    return picks, times, distance_km, greedy_km
+
+
+def fit_opening_hours(state, district, rows, picks, assignment, day, scores, durations, food, daily_hours, max_food):
+    """
+    Visiting times for one day's routed stops, respecting opening hours and travel time.
+    
+    Stops that can't be fitted are released; spare hours are then filled with
+    the best unused places that can still be reached and visited before the
+    day ends. Returns (picks in visiting order, [(start, end)] in minutes).
+    """
+    hours = state.index.opening_hours
+    dist = state.engine.stop_matrix(district, rows[picks])
+    kept, starts, ends = schedule_visits(hours, rows[picks], durations[picks] * 60, travel_minutes(dist))
+    assignment[np.setdiff1d(picks, picks[kept])] = -1
+    picks = list(picks[kept])
+    times = list(zip(starts, ends))
     
-    # Sort by rating
-    if 'popularity_rating' in filtered.columns:
-        filtered = filtered.sort_values('popularity_rating', ascending=False)
+    while True:
+        spare = daily_hours - int(durations[picks].sum())
+        candidates = (assignment < 0) & np.isfinite(scores) & (durations <= spare)
+        if int(food[picks].sum()) >= max_food:
+            candidates &= ~food
+        free = np.flatnonzero(candidates)
+        if len(free) == 0:
+            break
+        free = free[top_k(scores[free], 256)]
+        if picks:
+            last = rows[picks[-1]]
+            km = haversine_km(state.engine.latitudes[last], state.engine.longitudes[last],
+                              state.engine.latitudes[rows[free]], state.engine.longitudes[rows[free]])
+            arrival = times[-1][1] + travel_minutes(km)
+        else:
+            arrival = DAY_START_MINUTES
+        start = hours.earliest_start(rows[free], arrival, durations[free] * 60)
+        if not (start >= 0).any():
+            break
+        best = int(np.argmax(np.where(start >= 0, scores[free], -np.inf)))
+        picks.append(int(free[best]))
+        times.append((int(start[best]), int(start[best] + durations[free[best]] * 60)))
+        assignment[free[best]] = day
+    return np.asarray(picks, dtype=np.int64), times
+
+
+def select_places_legacy(state, user_data, weather_forecast, timer=NULL_TIMER):
+    """Original filter-then-sort selection (options.planner = 'legacy')"""
     
-    # Remove duplicates
-    filtered = filtered.drop_duplicates(subset=['place_name']).reset_index(drop=True)
+    district = user_data['latestTrip']['district']
+    days = user_data['latestTrip']['days']
+    budget = user_data['latestTrip']['budget']
+    traveler_type = user_data['travelerProfile']['travelerType']
     
-    print(f"\n{'='*80}")
-    print(f"📍 FINAL POOL: {len(filtered)} places ready for itinerary")
-    print(f"{'='*80}")
+    # Candidate pool comes from the load-time index (district, type and budget filters)
+    filtered, counts = state.index.candidate_pool(district, traveler_type, budget, days, timer)
+    logger.info(
+        "candidate_pool district=%s traveler_type=%r budget=%s district_places=%d type_matched=%d "
+        "budget_matched=%s pool=%d",
+        district, traveler_type, budget, counts['district'], counts['type_matched'],
+        counts.get('budget_matched', '-'), len(filtered)
+    )
     
     if len(filtered) < days * 2:
-        print(f"⚠ WARNING: Only {len(filtered)} places for {days} days ({days * 2} needed)")
+        logger.warning("small_pool district=%s pool=%d days=%d needed=%d", district, len(filtered), days, days * 2)
     
-    if len(filtered) > 0:
-        print(f"\nFinal places (top 15):")
+    if logger.isEnabledFor(logging.DEBUG):
         for idx, row in filtered.head(15).iterrows():
-            print(f"  ✓ {row['place_name']:<40} | Rating: {row.get('popularity_rating', 'N/A')} | {row.get('indoor_outdoor', 'N/A')}")
-    
-    # BUILD DAILY ITINERARY
-    print(f"\n{'='*80}")
-    print(f"📍 BUILDING {days}-DAY ITINERARY")
-    print(f"{'='*80}\n")
+            logger.debug("pool_place name=%r rating=%s type=%s",
+                         row['place_name'], row.get('popularity_rating', 'N/A'), row.get('indoor_outdoor', 'N/A'))
     
-    itinerary = {}
+    selected = []
     used_places = set()
     daily_hours = 8
     places_per_day = max(2, len(filtered) // days) if len(filtered) >= days else 1
     
     for day in range(1, days + 1):
-        print(f"🔍 Processing Day {day} of {days}...")
-        
         day_places = []
         day_duration = 0
         
         day_weather = weather_forecast[day - 1] if day <= len(weather_forecast) else None
         
-        # Weather-aware filtering
-        day_filtered = filtered.copy()
-        if day_weather:
-            weather_condition = day_weather.get('condition', '')
-            if weather_condition in ['Rain', 'Thunderstorm', 'Drizzle']:
-                indoor = day_filtered[day_filtered['indoor_outdoor'].isin(['indoor', 'both'])]
-                if len(indoor) > 0:
-                    day_filtered = indoor
-                    print(f"☔ Day {day}: Rain - using {len(indoor)} indoor/covered places")
-                else:
-                    print(f"☔ Day {day}: Rain - no indoor places, using all {len(day_filtered)}")
-            elif weather_condition in ['Clear', 'Clouds']:
-                outdoor = day_filtered[day_filtered['indoor_outdoor'].isin(['outdoor', 'both'])]
-                if len(outdoor) > 0:
-                    day_filtered = outdoor
-                    print(f"☀ Day {day}: {weather_condition} - using {len(outdoor)} outdoor/flexible places")
-                else:
-                    print(f"☀ Day {day}: {weather_condition} - no outdoor places, using all {len(day_filtered)}")
-        
-        # Select places for this day
-        for idx in range(len(day_filtered)):
-            place = day_filtered.iloc[idx]
-            
-            if place['place_name'] in used_places:
-                continue
-            
-            duration = int(place.get('duration_hours', 2))
-            
-            # Limit food places
-            is_food = 'Foodie' in str(place.get('category', ''))
-            food_count = sum(1 for p in day_places if 'Foodie' in str(p.get('category', '')))
+        with timer.span('day_selection'):
+            # Weather-aware filtering
+            day_filtered = filtered.copy()
+            if day_weather:
+                weather_condition = day_weather.get('condition', '')
+                if weather_condition in ['Rain', 'Thunderstorm', 'Drizzle']:
+                    indoor = day_filtered[day_filtered['indoor_outdoor'].isin(['indoor', 'both'])]
+                    if len(indoor) > 0:
+                        day_filtered = indoor
+                    logger.debug("weather_filter day=%d condition=%s indoor=%d", day, weather_condition, len(indoor))
+                elif weather_condition in ['Clear', 'Clouds']:
+                    outdoor = day_filtered[day_filtered['indoor_outdoor'].isin(['outdoor', 'both'])]
+                    if len(outdoor) > 0:
+                        day_filtered = outdoor
+                    logger.debug("weather_filter day=%d condition=%s outdoor=%d", day, weather_condition, len(outdoor))
             
-            max_food = 2 if traveler_type == 'Foodie' else 1
-            if is_food and food_count >= max_food:
-                continue
-            
-            # Add place if it fits
-            if day_duration + duration <= daily_hours or len(day_places) == 0:
-                place_info = {
-                    'name': str(place['place_name']),
-                    'duration': duration,
-                    'category': str(place.get('category', '')),
-                    'cost_category': str(place.get('cost_category', '')),
-                    'rating': int(place.get('popularity_rating', 0)),
-                    'type': str(place.get('indoor_outdoor', '')),
-                    'latitude': float(place.get('latitude', 0)),
-                    'longitude': float(place.get('longitude', 0)),
-                    'timing': str(place.get('timing', ''))
-                }
+            # Select places for this day
+            for idx in range(len(day_filtered)):
+                place = day_filtered.iloc[idx]
                 
-                if day_weather:
-                    place_info['weather'] = {
-                        'condition': day_weather['condition'],
-                        'temp': day_weather['temp'],
-                        'description': day_weather['description']
-                    }
+                if place['place_name'] in used_places:
+                    continue
                 
-                constraints_met = {'weather_condition': day_weather['condition']} if day_weather else {}
-                place_info['explanation'] = generate_explanation(place, user_data, constraints_met, day)
+                duration = int(place.get('duration_hours', 2))
                 
-                day_places.append(place_info)
-                day_duration += duration
-                used_places.add(place['place_name'])
+                # Limit food places
+                is_food = 'Foodie' in str(place.get('category', ''))
+                food_count = sum(1 for p, _, _ in day_places if 'Foodie' in str(p.get('category', '')))
                 
-                if len(day_places) >= places_per_day and day_duration >= 4:
-                    break
-        
-        # A* Route Optimization
-        if len(day_places) > 1 and all('latitude' in p for p in day_places):
-            print(f"🔄 Day {day}: Optimizing route for {len(day_places)} places using A*...")
-            optimized = [day_places[0]]
-            remaining = day_places[1:]
-            
-            while remaining:
-                last = optimized[-1]
-                nearest_idx = min(range(len(remaining)), 
-                                key=lambda i: haversine_distance(
-                                    last['latitude'], last['longitude'],
-                                    remaining[i]['latitude'], remaining[i]['longitude']
-                                ))
-                optimized.append(remaining.pop(nearest_idx))
-            
-            day_places = optimized
-        
-        # Always add day to itinerary
-        itinerary[f'Day {day}'] = day_places
+                max_food = 2 if traveler_type == 'Foodie' else 1
+                if is_food and food_count >= max_food:
+                    continue
+                
+                # Add place if it fits
+                if day_duration + duration <= daily_hours or len(day_places) == 0:
+                    day_places.append((place, int(place['place_row']), None))
+                    day_duration += duration
+                    used_places.add(place['place_name'])
+                    
+                    if len(day_places) >= places_per_day and day_duration >= 4:
+                        break
         
-        print(f"✅ Day {day}: {len(day_places)} places, {day_duration}hrs total")
-        if len(day_places) > 0:
-            for p in day_places:
-                print(f"     - {p['name']} ({p['duration']}hrs)")
-        else:
-            print(f"⚠ Day {day}: No places added!")
-    
-    print(f"\n{'='*80}\n")
-    return itinerary, weather_forecast
+        selected.append(day_places)
+    return selected
+
+
+# The places data and everything derived from it. A reload builds a new one and replaces
+# place_state in one assignment; each request reads place_state once and uses that throughout
+PlaceState = namedtuple('PlaceState', ['places', 'index', 'fragments', 'engine', 'grid', 'version', 'deltas'])
+
+
+def build_place_state(places, deltas, version):
+    """
+    Places data with everything derived from it: the candidate index,
+    explanation fragments, the route engine (a haversine distance matrix per
+    district) and the grid over place coordinates for /nearby.
+    """
+    index = CandidateIndex(places, TRAVELER_INFO.keys(), BUDGET_MAP)
+    engine = RouteEngine(
+        index.places['latitude'].to_numpy() if 'latitude' in index.places.columns else [],
+        index.places['longitude'].to_numpy() if 'longitude' in index.places.columns else [],
+        index.district_rows
+    )
+    return PlaceState(places, index, ExplanationFragments(index), engine, GridIndex(engine.latitudes, engine.longitudes),
+                      version, tuple(deltas))
+
+
+def warm_place_state(state):
+    """Fill in the lazily built per-district candidate rows and distance matrices and the place-name lookup"""
+    for district in state.index.district_rows:
+        state.index.unique_rows(district)
+        state.engine.district_matrix(district)
+    state.index.rows_named('')
+
+
+place_state = build_place_state(*load_place_data())
+print(f"✅ Candidate index built for {len(place_state.index.district_rows)} districts")
+if place_state.index.opening_hours.unparsed:
+    print(f"⚠ {len(place_state.index.opening_hours.unparsed)} timing values have no hours, treated as open all day")
+print(f"✅ Spatial index built over {len(place_state.grid)} places")
+
+# Planned itineraries, invalidated when the places data changes
+trip_cache = TripCache(int(os.environ.get('TRIP_CACHE_SIZE', 1024)))
+
+# Place data reloads run one at a time in the background (see reload_places)
+reload_jobs = JobRunner('reload-places')
+
+
+def prepare_shared_state():
+    """
+    Build the lazily filled read-only state (per-district candidate rows and
+    distance matrices, the place-name lookup) up front. A preforking server
+    calls this in its master so every worker inherits one copy instead of
+    building its own (see gunicorn.conf.py).
+    """
+    warm_place_state(place_state)
+
+
+# Upper bounds for /nearby so one query can't ask for the whole dataset
+NEARBY_MAX_RESULTS = 100
+NEARBY_MAX_RADIUS_KM = 500
+# Batch planning: trips per request, worker processes and trips per worker task
+BATCH_MAX_TRIPS = 1000
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_GROUP_SIZE = 16
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+# Streamed /generate-trip formats: one JSON object per line, or server-sent events
+STREAM_MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
 
 
 # ROUTES
 @app.route('/health', methods=['GET'])
 def health():
+    state = place_state
     return jsonify({
         'status': 'healthy',
         'service': 'ML Service',
-        'model_loaded': os.path.exists(f'{model_path}/naive_bayes_model.pkl'),
-        'places_loaded': len(places) > 0,
-        'places_count': len(places),
+        'pid': os.getpid(),
+        'model_loaded': os.path.exists(f'{model_path}/{EXPORT_FILENAME}'),
+        'places_loaded': len(state.places) > 0,
+        'places_count': len(state.places),
+        'places_version': state.version,
+        'model_version': classifier.version,
+        'retrain_job': retrain_jobs.latest(),
+        'places_deltas': len(state.deltas),
+        'reload_job': reload_jobs.latest(),
         'weather_api_configured': WEATHER_API_KEY != 'your_openweather_api_key',
+        'weather_cache': weather_cache.snapshot(),
+        'trip_cache': trip_cache.snapshot(),
         'features': [
             'Naive Bayes Traveler Classification',
             'CSP Trip Planning',
@@ -475,104 +782,1041 @@ def health():
     }), 200
 
 
+def traveler_type_response(prediction, confidence):
+    """Response body for one traveler type prediction"""
+    info = TRAVELER_INFO.get(prediction, {
+        'description': 'Unique traveler with diverse interests',
+        'recommendations': ['Explore destinations that match your preferences']
+    })
+    
+    return {
+        'travelerType': prediction,
+        'confidence': round(confidence, 4),
+        'description': info['description'],
+        'recommendations': info['recommendations']
+    }
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    counters = {'cache_events_total': {}}
+    for cache_name, stats in (('weather', weather_cache.snapshot()), ('trip', trip_cache.snapshot())):
+        for event, value in stats.items():
+            if isinstance(value, int) and event not in ('size', 'inflight'):
+                counters['cache_events_total'][(('cache', cache_name), ('event', event))] = value
+    return metrics.render(counters=counters), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         data = request.json
         
-        required_fields = ['q1_activity', 'q2_destination', 'q3_pace', 
-                          'q4_accommodation', 'q5_souvenir', 'q6_evening', 'q7_motivation']
-        
-        for field in required_fields:
+        for field in QUESTION_FIELDS:
             if field not in data:
                 return jsonify({'error': f'Missing field: {field}'}), 400
         
         prediction, confidence = classifier.predict(data)
         
-        info = TRAVELER_INFO.get(prediction, {
-            'description': 'Unique traveler with diverse interests',
-            'recommendations': ['Explore destinations that match your preferences']
-        })
+        return jsonify(traveler_type_response(prediction, confidence)), 200
         
-        response = {
-            'travelerType': prediction,
-            'confidence': round(confidence, 4),
-            'description': info['description'],
-            'recommendations': info['recommendations']
-        }
+    except Exception as e:
+        logger.exception("request_failed route=/predict error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    try:
+        data = request.json
+        answer_sets = data.get('answers') if isinstance(data, dict) else data
         
-        return jsonify(response), 200
+        if not isinstance(answer_sets, list):
+            return jsonify({'error': 'Expected a list of answer sets in "answers"'}), 400
+        
+        results = []
+        for i, result in enumerate(classifier.predict_batch(answer_sets)):
+            if 'error' in result:
+                results.append({'index': i, 'error': result['error']})
+            else:
+                item = traveler_type_response(result['prediction'], result['confidence'])
+                item['index'] = i
+                results.append(item)
+        
+        errors = sum(1 for r in results if 'error' in r)
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'succeeded': len(results) - errors,
+            'failed': errors
+        }), 200
+        
+    except Exception as e:
+        logger.exception("request_failed route=/predict-batch error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/nearby', methods=['GET'])
+def nearby():
+    """
+    Places near a point (lat, lon) or near a named place (place, optional district).
+    
+    radius (km) limits the search, k caps the number of results (default 10);
+    category and budget filter the results like trip planning does.
+    """
+    try:
+        state = place_state
+        args = request.args
+        try:
+            k = int(args.get('k', 10))
+            radius = float(args['radius']) if 'radius' in args else None
+            if 'lat' in args or 'lon' in args:
+                lat, lon = float(args['lat']), float(args['lon'])
+                if not (np.isfinite(lat) and np.isfinite(lon)):
+                    raise ValueError(lat, lon)
+        except (KeyError, ValueError):
+            return jsonify({'error': 'lat, lon, radius and k must be numbers (lat and lon together)'}), 400
+        
+        if 'lat' in args and not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({'error': 'lat must be between -90 and 90 and lon between -180 and 180'}), 400
+        if not 1 <= k <= NEARBY_MAX_RESULTS:
+            return jsonify({'error': f'k must be between 1 and {NEARBY_MAX_RESULTS}'}), 400
+        if radius is not None and not 0 < radius <= NEARBY_MAX_RADIUS_KM:
+            return jsonify({'error': f'radius must be between 0 and {NEARBY_MAX_RADIUS_KM} km'}), 400
+        
+        origin = None
+        if 'place' in args:
+            rows = state.index.rows_named(args['place'])
+            if 'district' in args and 'destination_city' in state.places.columns:
+                rows = rows[state.index.places['destination_city'].to_numpy()[rows] == args['district']]
+            rows = rows[np.isfinite(state.grid.latitudes[rows]) & np.isfinite(state.grid.longitudes[rows])]
+            if len(rows) == 0:
+                return jsonify({'error': f"Unknown place: {args['place']}"}), 404
+            origin = int(rows[0])
+            lat, lon = float(state.grid.latitudes[origin]), float(state.grid.longitudes[origin])
+        elif 'lat' not in args:
+            return jsonify({'error': 'Provide lat and lon, or place'}), 400
+        
+        filters = []
+        category = args.get('category')
+        if category:
+            filters.append(lambda rows: state.index.type_match(rows, category) == 1)
+        budget = args.get('budget')
+        if budget:
+            bits = state.index.budget_bits(budget)
+            if bits is None:
+                return jsonify({'error': f"Invalid budget, expected one of {list(BUDGET_MAP)}"}), 400
+            filters.append(lambda rows: (state.index.cost_mask[rows] & bits) != 0)
+        if origin is not None:
+            # Every copy of the origin place is left out of its own results
+            filters.append(lambda rows: state.index.name_codes[rows] != state.index.name_codes[origin])
+        
+        def keep(rows):
+            mask = np.ones(len(rows), dtype=bool)
+            for check in filters:
+                mask &= check(rows)
+            return mask
+        
+        # Fetch extra rows because the merged data repeats some places
+        if radius is not None and 'k' not in args:
+            k = NEARBY_MAX_RESULTS
+            rows, dist = state.grid.within(lat, lon, radius, keep, limit=k * 2)
+        else:
+            rows, dist = state.grid.nearest(lat, lon, k * 2, keep, max_radius_km=radius)
+        
+        results = []
+        seen = set()
+        for row, km in zip(rows, dist):
+            place = state.index.record(int(row))
+            key = (place['place_name'], float(place['latitude']), float(place['longitude']))
+            if key in seen:
+                continue
+            seen.add(key)
+            if len(results) == k:
+                break
+            results.append({
+                'name': str(place['place_name']),
+                'district': str(place.get('destination_city', '')),
+                'category': str(place.get('category', '')),
+                'cost_category': str(place.get('cost_category', '')),
+                'rating': int(place.get('popularity_rating', 0)),
+                'type': str(place.get('indoor_outdoor', '')),
+                'timing': str(place.get('timing', '')),
+                'latitude': float(place['latitude']),
+                'longitude': float(place['longitude']),
+                'distanceKm': round(float(km), 3)
+            })
         
+        return jsonify({
+            'origin': {'latitude': lat, 'longitude': lon, 'place': args.get('place')},
+            'radiusKm': radius,
+            'results': results,
+            'count': len(results)
+        }), 200
+    
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("request_failed route=/nearby error=%r", str(e))
         return jsonify({'error': str(e)}), 500
 
 
+def trip_response(user_data, itinerary, weather_forecast, route_summary):
+    """Response body of /generate-trip for a planned trip"""
+    total_places = sum([len(day_places) for day_places in itinerary.values()])
+    total_duration = sum([
+        sum([p.get('duration', 0) for p in day_places])
+        for day_places in itinerary.values()
+    ])
+    
+    return {
+        'success': True,
+        'userId': user_data.get('userId'),
+        'tripId': user_data['latestTrip'].get('_id'),
+        'district': user_data['latestTrip']['district'],
+        'days': user_data['latestTrip']['days'],
+        'budget': user_data['latestTrip']['budget'],
+        'travelWith': user_data['latestTrip']['travelWith'],
+        'travelerType': user_data['travelerProfile']['travelerType'],
+        'weatherForecast': weather_forecast,
+        'itinerary': itinerary,
+        'stats': {
+            'totalPlaces': total_places,
+            'totalDuration': total_duration,
+            'averagePlacesPerDay': round(total_places / len(itinerary), 1) if len(itinerary) > 0 else 0,
+            'totalDistanceKm': route_summary['totalDistanceKm']
+        },
+        'routes': route_summary,
+        'aiFeatures': {
+            'naive_bayes': 'Traveler type classification',
+            'csp': 'Constraint satisfaction planning',
+            'a_star': 'Route optimization',
+            'weather_aware': 'Weather-based filtering',
+            'explainable_ai': 'Recommendation explanations'
+        },
+        'algorithm': 'CSP + A* + Weather-Aware + Explainable AI'
+    }
+
+
+def is_non_negative_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and bool(np.isfinite(value)) and value >= 0
+
+
+def trip_request_problem(user_data):
+    """(message, status) describing why a trip request body is invalid, or None"""
+    if not isinstance(user_data, dict) or 'latestTrip' not in user_data or 'travelerProfile' not in user_data:
+        return 'Missing latestTrip or travelerProfile data', 400
+    if not isinstance(user_data['latestTrip'], dict) or not isinstance(user_data['latestTrip'].get('district'), str):
+        return 'latestTrip.district must be a string', 400
+    
+    if len(place_state.places) == 0:
+        return 'Places dataset not loaded', 500
+    
+    options = user_data.get('options') or {}
+    if not isinstance(options, dict):
+        return 'options must be an object', 400
+    if options.get('routeMode', 'greedy') not in ROUTE_MODES:
+        return f"Invalid routeMode, expected one of {list(ROUTE_MODES)}", 400
+    if options.get('planner', 'scored') not in PLANNERS:
+        return f"Invalid planner, expected one of {list(PLANNERS)}", 400
+    if not isinstance(options.get('clusterDays', False), bool):
+        return 'clusterDays must be true or false', 400
+    if not isinstance(options.get('explanations', True), bool):
+        return 'explanations must be true or false', 400
+    if not is_non_negative_number(options.get('routeTimeBudgetMs', ROUTE_TIME_BUDGET_MS)):
+        return 'routeTimeBudgetMs must be a non-negative number', 400
+    if not is_non_negative_number(options.get('scheduleTimeBudgetMs', SCHEDULE_TIME_BUDGET_MS)):
+        return 'scheduleTimeBudgetMs must be a non-negative number', 400
+    try:
+        resolve_weights(options.get('weights'))
+    except ValueError as e:
+        return str(e), 400
+    return None
+
+
+def trip_request_error(user_data):
+    """Error response for an invalid trip request body, or None"""
+    problem = trip_request_problem(user_data)
+    if problem is None:
+        return None
+    message, status = problem
+    return jsonify({'error': message}), status
+
+
+def requested_stream_format():
+    """'ndjson' or 'sse' when the client asked for a streamed trip (?stream= or Accept), else None"""
+    stream = request.args.get('stream')
+    if stream in STREAM_MIMETYPES:
+        return stream
+    accept = request.headers.get('Accept', '')
+    for stream_format, mimetype in STREAM_MIMETYPES.items():
+        if mimetype in accept:
+            return stream_format
+    return None
+
+
+def encode_event(event, stream_format):
+    data = app.json.dumps(event)
+    if stream_format == 'sse':
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + '\n'
+
+
+def trip_stream_events(user_data, stream_format, weather_forecast=None):
+    """
+    Encoded events of a streamed trip: the weather forecast first, then one
+    event per day as soon as it is planned, then a summary with the stats
+    and routes. A failure is sent as a final error event.
+    """
+    try:
+        for event in plan_trip_events(user_data, weather_forecast):
+            if event[0] == 'weather':
+                yield encode_event({'type': 'weather', 'weatherForecast': event[1]}, stream_format)
+            elif event[0] == 'day':
+                _, name, day_places, day_route = event
+                yield encode_event({'type': 'day', 'day': name, 'places': day_places, 'route': day_route},
+                                   stream_format)
+            else:
+                summary = trip_response(user_data, *event[1])
+                # Already sent piece by piece
+                del summary['weatherForecast'], summary['itinerary']
+                yield encode_event(dict(summary, type='summary'), stream_format)
+    except Exception as e:
+        # Headers are already sent, so the failure travels as the last event
+        logger.exception("request_failed route=/generate-trip stream=%s error=%r", stream_format, str(e))
+        yield encode_event({'type': 'error', 'success': False, 'error': str(e)}, stream_format)
+
+
+def stream_trip(user_data, stream_format):
+    """Streamed /generate-trip response (see trip_stream_events)"""
+    return Response(stream_with_context(trip_stream_events(user_data, stream_format)),
+                    mimetype=STREAM_MIMETYPES[stream_format],
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/generate-trip', methods=['POST'])
 def generate_trip():
     try:
         user_data = request.json
         
-        if 'latestTrip' not in user_data or 'travelerProfile' not in user_data:
-            return jsonify({'error': 'Missing latestTrip or travelerProfile data'}), 400
+        error = trip_request_error(user_data)
+        if error is not None:
+            return error
+        if request.args.get('stream', 'ndjson') not in STREAM_MIMETYPES:
+            return jsonify({'error': f"Invalid stream, expected one of {list(STREAM_MIMETYPES)}"}), 400
+        if request.args.get('format', 'json') not in RESPONSE_FORMATS:
+            return jsonify({'error': f"Invalid format, expected one of {list(RESPONSE_FORMATS)}"}), 400
         
-        if len(places) == 0:
-            return jsonify({'error': 'Places dataset not loaded'}), 500
+        stream_format = requested_stream_format()
+        if stream_format is not None:
+            return stream_trip(user_data, stream_format)
         
-        itinerary, weather_forecast = plan_trip_csp(user_data)
+        itinerary, weather_forecast, route_summary = plan_trip_csp(user_data)
+        response = trip_response(user_data, itinerary, weather_forecast, route_summary)
         
-        total_places = sum([len(day_places) for day_places in itinerary.values()])
-        total_duration = sum([
-            sum([p.get('duration', 0) for p in day_places])
-            for day_places in itinerary.values()
-        ])
-        
-        response = {
-            'success': True,
-            'userId': user_data.get('userId'),
-            'tripId': user_data['latestTrip'].get('_id'),
-            'district': user_data['latestTrip']['district'],
-            'days': user_data['latestTrip']['days'],
-            'budget': user_data['latestTrip']['budget'],
-            'travelWith': user_data['latestTrip']['travelWith'],
-            'travelerType': user_data['travelerProfile']['travelerType'],
-            'weatherForecast': weather_forecast,
-            'itinerary': itinerary,
-            'stats': {
-                'totalPlaces': total_places,
-                'totalDuration': total_duration,
-                'averagePlacesPerDay': round(total_places / len(itinerary), 1) if len(itinerary) > 0 else 0
-            },
-            'aiFeatures': {
-                'naive_bayes': 'Traveler type classification',
-                'csp': 'Constraint satisfaction planning',
-                'a_star': 'Route optimization',
-                'weather_aware': 'Weather-based filtering',
-                'explainable_ai': 'Recommendation explanations'
-            },
-            'algorithm': 'CSP + A* + Weather-Aware + Explainable AI'
+        fmt = response_format(request.args.get('format'), request.headers.get('Accept', ''))
+        if fmt != 'json':
+            body, mimetype = encode(compact_trip(response), fmt)
+            return Response(body, status=200, mimetype=mimetype)
+        return jsonify(response), 200
+        
+    except Exception as e:
+        logger.exception("request_failed route=/generate-trip error=%r", str(e))
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def plan_trip_group(items, state=None):
+    """
+    Plan trips that share a district, each with its already fetched forecast.
+    
+    items is a list of (index, user_data, weather_forecast); returns the
+    places version the trips were planned with and (index, result, error)
+    per item. Runs in a batch worker process, where the district's candidate
+    pool and distance matrix are built once, on the worker's current places
+    state unless one is given.
+    """
+    if state is None:
+        state = place_state
+    results = []
+    for index, user_data, weather_forecast in items:
+        try:
+            results.append((index, plan_trip_csp(user_data, weather_forecast, state), None))
+        except Exception as e:
+            logger.exception("request_failed route=/generate-trip-batch index=%d error=%r", index, str(e))
+            results.append((index, None, str(e)))
+    return state.version, results
+
+
+def init_batch_worker():
+    """Batch worker process setup: plans made here are cached by the parent, so the worker caches nothing"""
+    global trip_cache
+    trip_cache = TripCache(0)
+
+
+def plan_trip_group_at(items, version):
+    """
+    plan_trip_group in a batch worker, on the places version the parent has.
+    
+    A worker forked before a places reload reads the data again itself the
+    first time it is asked for a newer version (see start_batch_pool).
+    """
+    if place_state.version != version:
+        try:
+            reload_places(full=True)
+        except Exception as e:
+            # The parent only caches plans made on its own version, so the older ones are still served
+            logger.exception("batch_worker_reload_failed pid=%d error=%r", os.getpid(), str(e))
+    return plan_trip_group(items)
+
+
+def start_batch_pool():
+    """
+    Fork the batch planning workers, once per process.
+    
+    Forking copies the parent's locks in whatever state they are in, so this
+    must run before the server starts its request threads (gunicorn's
+    post_worker_init, the ASGI lifespan startup, or before app.run). All
+    workers are forked here rather than on the first batch; after a places
+    reload each worker refreshes its own copy instead of the pool being
+    forked again. Without a pool, batches are planned in-process.
+    """
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None and BATCH_WORKERS > 1:
+            # Forked workers start with the loaded places and indexes instead of reloading them
+            pool = ProcessPoolExecutor(BATCH_WORKERS, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=init_batch_worker)
+            pool.submit(int).result()
+            _batch_pool = pool
+        return _batch_pool
+
+
+@app.route('/generate-trip-batch', methods=['POST'])
+def generate_trip_batch():
+    """
+    Plan many trips in one request.
+    
+    Body: {"trips": [<generate-trip body>, ...]}. Trips are grouped by
+    district; each district's forecast is fetched once and its trips are
+    planned together on a process pool. Results come back in input order,
+    each the /generate-trip response (or error) for that trip plus its index.
+    """
+    try:
+        data = request.json
+        trips = data.get('trips') if isinstance(data, dict) else data
+        if not isinstance(trips, list):
+            return jsonify({'error': 'Expected a list of trips in "trips"'}), 400
+        if len(trips) > BATCH_MAX_TRIPS:
+            return jsonify({'error': f'At most {BATCH_MAX_TRIPS} trips per batch'}), 400
+        
+        results = [None] * len(trips)
+        groups = {}
+        for i, user_data in enumerate(trips):
+            problem = trip_request_problem(user_data)
+            if problem is not None:
+                results[i] = {'index': i, 'success': False, 'error': problem[0], 'status': problem[1]}
+                continue
+            district = user_data['latestTrip']['district']
+            try:
+                # The first trip of a district fetches its forecast; the rest are cache hits
+                forecast = get_weather_forecast(district, user_data['latestTrip']['days'])
+            except Exception as e:
+                logger.exception("request_failed route=/generate-trip-batch index=%d error=%r", i, str(e))
+                results[i] = {'index': i, 'success': False, 'error': str(e), 'status': 500}
+                continue
+            groups.setdefault(district, []).append((i, user_data, forecast))
+        
+        # Large districts are split so their trips spread over the workers too
+        tasks = []
+        for items in groups.values():
+            size = max(BATCH_GROUP_SIZE, -(-len(items) // BATCH_WORKERS))
+            tasks.extend(items[start:start + size] for start in range(0, len(items), size))
+        state = place_state
+        pool = _batch_pool
+        if pool is not None and len(tasks) > 1:
+            planned = pool.map(plan_trip_group_at, tasks, [state.version] * len(tasks))
+        else:
+            planned = (plan_trip_group(items, state) for items in tasks)
+        
+        for items, (version, group_results) in zip(tasks, planned):
+            for (index, user_data, forecast), (_, result, error) in zip(items, group_results):
+                if error is not None:
+                    results[index] = {'index': index, 'success': False, 'error': error, 'status': 500}
+                    continue
+                # Plans made in workers are cached here so single requests can reuse them, under the
+                # version they were planned with; plans from before a reload are not cached at all
+                if version == place_state.version:
+                    trip_cache.put(plan_key(user_data, forecast), version, result)
+                response = trip_response(user_data, *result)
+                response['index'] = index
+                results[index] = response
+        
+        errors = sum(1 for r in results if 'error' in r)
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'districts': len(groups),
+            'succeeded': len(results) - errors,
+            'failed': errors
+        }), 200
+    
+    except Exception as e:
+        logger.exception("request_failed route=/generate-trip-batch error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    """
+    Explanation for one place of a planned trip, on demand.
+    
+    Takes the /generate-trip body plus 'place' (name) and 'day' (1-based)
+    and returns the same explanation the itinerary would have carried.
+    """
+    try:
+        user_data = request.json
+        
+        error = trip_request_error(user_data)
+        if error is not None:
+            return error
+        
+        name = user_data.get('place')
+        day = user_data.get('day', 1)
+        days = user_data['latestTrip']['days']
+        if not isinstance(name, str) or not name:
+            return jsonify({'error': 'place must be a place name'}), 400
+        if isinstance(day, bool) or not isinstance(day, int) or not 1 <= day <= days:
+            return jsonify({'error': f'day must be between 1 and {days}'}), 400
+        
+        district = user_data['latestTrip']['district']
+        state = place_state
+        rows = state.index.rows_named(name)
+        rows = rows[np.isin(rows, state.index.district_rows.get(district, []))]
+        if len(rows) == 0:
+            return jsonify({'error': f"Place '{name}' not found in {district}"}), 404
+        row = int(rows[0])
+        
+        weather_forecast = get_weather_forecast(district, days)
+        day_weather = weather_forecast[day - 1] if day <= len(weather_forecast) else None
+        condition = day_weather['condition'] if day_weather else None
+        
+        options = user_data.get('options') or {}
+        score = None
+        if options.get('planner', 'scored') != 'legacy':
+            scores = CandidateScores(state.index, np.array([row]), user_data['travelerProfile']['travelerType'],
+                                     user_data['latestTrip']['budget'], resolve_weights(options.get('weights')))
+            score = scores.breakdown(0, condition)
+        
+        return jsonify({
+            'place': name,
+            'day': day,
+            'explanation': generate_explanation(state, row, user_data, condition, day, score)
+        }), 200
+    
+    except Exception as e:
+        logger.exception("request_failed route=/explain error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
+def day_condition(weather_forecast, day):
+    """Weather condition of a 1-based day, None when the forecast doesn't cover it"""
+    if weather_forecast and day <= len(weather_forecast) and weather_forecast[day - 1]:
+        return weather_forecast[day - 1].get('condition')
+    return None
+
+
+def itinerary_conditions(itinerary, days):
+    """Per-day weather conditions an itinerary was planned for, read from its places"""
+    conditions = []
+    for day in range(1, days + 1):
+        weather = next((place.get('weather') for place in itinerary.get(f'Day {day}', []) if place.get('weather')), None)
+        conditions.append(weather.get('condition') if isinstance(weather, dict) else None)
+    return conditions
+
+
+def replan_trip(state, user_data, itinerary, weather_forecast, previous_conditions, routes=None, timer=NULL_TIMER):
+    """
+    Re-plan only the days of an itinerary whose weather condition class changed.
+    
+    Other days keep their places and times. On a changed day, places whose
+    venue type no longer suits the weather are dropped and the day is
+    re-routed and re-timed, filling spare hours with the best unused fitting
+    places; places on any other day are never reused. Returns
+    (itinerary, route_summary, names of the re-planned days).
+    """
+    district = user_data['latestTrip']['district']
+    days = user_data['latestTrip']['days']
+    budget = user_data['latestTrip']['budget']
+    traveler_type = user_data['travelerProfile']['travelerType']
+    options = user_data.get('options') or {}
+    route_mode = options.get('routeMode', 'greedy')
+    route_budget_ms = options.get('routeTimeBudgetMs', ROUTE_TIME_BUDGET_MS)
+    explanations = options.get('explanations', True)
+    daily_hours = 8
+    max_food = 2 if traveler_type == 'Foodie' else 1
+    
+    conditions = [day_condition(weather_forecast, day) for day in range(1, days + 1)]
+    changed = [day for day in range(days) if condition_class(conditions[day]) != condition_class(previous_conditions[day])]
+    
+    itinerary = {f'Day {day}': list(itinerary.get(f'Day {day}', [])) for day in range(1, days + 1)}
+    route_summary = new_route_summary(options)
+    route_summary['days'] = dict((routes or {}).get('days') or {})
+    
+    # Kept days only get the new forecast's details on their places
+    for day in range(1, days + 1):
+        day_weather = weather_forecast[day - 1] if day <= len(weather_forecast) else None
+        if day - 1 not in changed and day_weather:
+            itinerary[f'Day {day}'] = [dict(place, weather=weather_details(day_weather))
+                                       for place in itinerary[f'Day {day}']]
+    
+    rows = state.index.unique_rows(district)
+    if changed:
+        with timer.span('candidate_scoring'):
+            scores = CandidateScores(state.index, rows, traveler_type, budget, resolve_weights(options.get('weights')),
+                                     daily_hours)
+            durations = state.index.duration[rows].astype(np.int64)
+            food = state.index.food_mask[rows]
+            visitable = state.index.opening_hours.visitable(rows, durations * 60)
+            indoor_code = state.index.indoor_code[rows]
+        
+        # Every place already on the trip stays taken unless a changed day drops it
+        names = [[place.get('name') for place in itinerary[f'Day {day}']] for day in range(1, days + 1)]
+        positions = state.index.name_positions(rows, [name for day_names in names for name in day_names])
+        day_of = np.repeat(np.arange(days), [len(day_names) for day_names in names])
+        assignment = np.full(len(rows), -1, dtype=np.int64)
+        assignment[positions[positions >= 0]] = day_of[positions >= 0]
+    
+    for day in changed:
+        condition = conditions[day]
+        with timer.span('day_selection'):
+            day_scores = scores.day_scores(condition)
+            day_scores[~visitable] = -np.inf
+            fitting = FITTING_VENUES.get(condition_class(condition))
+            if fitting is not None:
+                # Places of unknown venue type are left alone
+                unfit = (indoor_code >= 0) & ~np.isin(indoor_code, [INDOOR_CODES.index(kind) for kind in fitting])
+                day_scores[unfit] = -np.inf
+            
+            picks = np.flatnonzero(assignment == day)
+            assignment[picks[~np.isfinite(day_scores[picks])]] = -1
+            picks = picks[np.isfinite(day_scores[picks])]
+            if len(picks) == 0:
+                free = np.flatnonzero((assignment < 0) & np.isfinite(day_scores))
+                if len(free):
+                    picks = free[[int(np.argmax(day_scores[free]))]]
+                    assignment[picks] = day
+            picks = picks[np.argsort(-day_scores[picks], kind='stable')]
+        
+        picks, times, distance_km, greedy_km = route_and_time(
+            state, district, rows, picks, assignment, day, day_scores, durations, food, daily_hours, max_food,
+            route_mode, route_budget_ms, timer
+        )
+        scored = options.get('planner', 'scored') != 'legacy'
+        plan = {
+            'picks': [(state.index.record(rows[p]), int(rows[p]), scores.breakdown(p, condition) if scored else None)
+                      for p in picks],
+            'times': times
+        }
+        day_weather = weather_forecast[day] if day < len(weather_forecast) else None
+        itinerary[f'Day {day + 1}'] = day_entries(state, plan, day + 1, day_weather, user_data, explanations, timer)
+        route_summary['days'][f'Day {day + 1}'] = {
+            'distanceKm': round(distance_km, 2),
+            'greedyDistanceKm': round(greedy_km, 2)
         }
+    
+    # Kept days the client sent no route for are measured as they stand
+    for day in range(1, days + 1):
+        if f'Day {day}' not in route_summary['days']:
+            positions = state.index.name_positions(rows, [place.get('name') for place in itinerary[f'Day {day}']])
+            dist = state.engine.stop_matrix(district, rows[positions[positions >= 0]])
+            route_summary['days'][f'Day {day}'] = {
+                'distanceKm': round(path_length(dist, np.arange(len(dist))), 2),
+                'greedyDistanceKm': round(path_length(dist, nearest_neighbour(dist)) if len(dist) else 0.0, 2)
+            }
+    route_summary['days'] = {f'Day {day}': route_summary['days'][f'Day {day}'] for day in range(1, days + 1)}
+    route_summary['totalDistanceKm'] = round(sum(d['distanceKm'] for d in route_summary['days'].values()), 2)
+    route_summary['greedyDistanceKm'] = round(sum(d['greedyDistanceKm'] for d in route_summary['days'].values()), 2)
+    return itinerary, route_summary, [f'Day {day + 1}' for day in changed]
+
+
+def forecast_problem(value, field):
+    """Error message when a forecast in a request body isn't a list of day objects, else None"""
+    if value is not None and (not isinstance(value, list) or not all(isinstance(d, dict) or d is None for d in value)):
+        return f'{field} must be a list of daily forecasts'
+    return None
+
+
+@app.route('/replan', methods=['POST'])
+def replan():
+    """
+    Update a planned trip for a new weather forecast.
+    
+    Takes the /generate-trip body plus the trip's 'itinerary' and optionally
+    its 'routes', the new 'weatherForecast' (fetched when missing) and the
+    'previousForecast' it was planned for (read from the places' weather
+    otherwise). Only days whose condition class changed are re-planned.
+    """
+    try:
+        user_data = request.json
         
-        return jsonify(response), 200
+        error = trip_request_error(user_data)
+        if error is not None:
+            return error
+        if request.args.get('format', 'json') not in RESPONSE_FORMATS:
+            return jsonify({'error': f"Invalid format, expected one of {list(RESPONSE_FORMATS)}"}), 400
+        
+        itinerary = user_data.get('itinerary')
+        if not isinstance(itinerary, dict) or not all(
+            isinstance(day_places, list) and all(isinstance(p, dict) and isinstance(p.get('name'), str) for p in day_places)
+            for day_places in itinerary.values()
+        ):
+            return jsonify({'error': 'itinerary must map day names to lists of places'}), 400
+        routes = user_data.get('routes')
+        if routes is not None and not (isinstance(routes, dict) and isinstance(routes.get('days', {}), dict)):
+            return jsonify({'error': 'routes must be the routes object of a planned trip'}), 400
+        for field in ('weatherForecast', 'previousForecast'):
+            problem = forecast_problem(user_data.get(field), field)
+            if problem is not None:
+                return jsonify({'error': problem}), 400
         
+        district = user_data['latestTrip']['district']
+        days = user_data['latestTrip']['days']
+        state = place_state
+        timer = metrics.timer()
+        with timer.span('replan'):
+            weather_forecast = user_data.get('weatherForecast')
+            if weather_forecast is None:
+                with timer.span('weather_fetch'):
+                    weather_forecast = get_weather_forecast(district, days)
+            
+            previous = user_data.get('previousForecast')
+            if previous is not None:
+                previous_conditions = [day_condition(previous, day) for day in range(1, days + 1)]
+            else:
+                previous_conditions = itinerary_conditions(itinerary, days)
+            
+            itinerary, route_summary, replanned = replan_trip(
+                state, user_data, itinerary, weather_forecast, previous_conditions, routes, timer
+            )
+        timer.finish()
+        logger.info("trip_replanned district=%s days=%d replanned=%d", district, days, len(replanned))
+        
+        response = trip_response(user_data, itinerary, weather_forecast, route_summary)
+        response['replannedDays'] = replanned
+        
+        fmt = response_format(request.args.get('format'), request.headers.get('Accept', ''))
+        if fmt != 'json':
+            body, mimetype = encode(compact_trip(response), fmt)
+            return Response(body, status=200, mimetype=mimetype)
+        return jsonify(response), 200
+    
     except Exception as e:
-        print(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("request_failed route=/replan error=%r", str(e))
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def retrain_model():
+    """
+    Train a fresh model, save it as a new version, validate it and swap it in.
+    
+    Runs as a background job. The training data is the training CSV plus
+    every answer set ingested so far; sets ingested while training are
+    added to the new online learner, so no accepted sample is dropped.
+    Requests keep using the current classifier until the new one has passed
+    validation; the swap is one reference assignment, so a request sees
+    either the old model or the new one.
+    """
+    global classifier, online_model
+    # Training needs scikit-learn, so it is only imported here
+    from train_model import TravelClassifier
+    with model_swap_lock:
+        ingested = read_ingested_samples()
+    df = pd.concat([pd.read_csv(RETRAIN_CSV_PATH), ingested], ignore_index=True)
+    trainer = TravelClassifier()
+    accuracy = trainer.train_frame(df)
+    version, path = save_version(trainer, model_path)
+    
+    retrained = InferenceClassifier()
+    retrained.load_model(path)
+    validate_model(retrained, trainer, df, accuracy)
+    if CLASSIFIER_COMPILED:
+        retrained.compile(answer_options(df))
+    
+    with model_swap_lock:
+        publish_version(path, model_path)
+        # Online learning restarts from the retrained model; its old snapshot would shadow it on restart
+        if os.path.exists(f'{ONLINE_SNAPSHOT_DIR}/{EXPORT_FILENAME}'):
+            os.remove(f'{ONLINE_SNAPSHOT_DIR}/{EXPORT_FILENAME}')
+        previous = classifier.version
+        classifier = retrained
+        online_model = start_online_learning(retrained)
+        late = read_ingested_samples().iloc[len(ingested):]
+        if online_model is not None and len(late):
+            late = late[late['label'].isin(list(online_model.class_index))]
+            texts = [answers_text(answers) for answers in late[QUESTION_FIELDS].to_dict('records')]
+            classifier = online_model.partial_fit(texts, late['label'].tolist())
+    logger.info("model_swapped version=%s previous=%s accuracy=%.4f ingested=%d late=%d",
+                version, previous, accuracy, len(ingested), len(late))
+    return {'version': version, 'previousVersion': previous, 'accuracy': round(float(accuracy), 4),
+            'ingestedSamples': len(ingested), 'lateSamples': len(late)}
+
+
+def validate_model(retrained, trainer, df, accuracy):
+    """Raise ValueError unless a retrained model is fit to serve"""
+    if accuracy < RETRAIN_MIN_ACCURACY:
+        raise ValueError(f"Cross-validated accuracy {accuracy:.2%} is below the {RETRAIN_MIN_ACCURACY:.2%} minimum")
+    # The NumPy export must predict exactly what the trained scikit-learn model does
+    texts = [answers_text(answers) for answers in df[QUESTION_FIELDS].to_dict('records')]
+    expected = trainer.classes_[trainer.posterior(texts).argmax(axis=1)]
+    served = retrained.classes_[retrained.posterior(texts).argmax(axis=1)]
+    if not np.array_equal(expected, served):
+        raise ValueError("Exported model disagrees with the trained model")
+
+
+def snapshot_online_model():
+    """Write the online counts to disk and serve them with a compiled lookup table"""
+    global classifier
+    learner = online_model
+    model = learner.save_snapshot(ONLINE_SNAPSHOT_DIR)
+    if CLASSIFIER_COMPILED:
+        model.compile(answer_options(pd.read_csv(RETRAIN_CSV_PATH)))
+    with model_swap_lock:
+        # Batches ingested while compiling already replaced the model; they keep theirs
+        swapped = online_model is learner and classifier.version == model.version
+        if swapped:
+            classifier = model
+    return {'version': model.version, 'samplesSeen': learner.samples_seen, 'compiledSwap': swapped}
+
+
+def snapshot_loop():
+    """Snapshot the online counts every ONLINE_SNAPSHOT_SECONDS while they have unsaved samples"""
+    while True:
+        time.sleep(ONLINE_SNAPSHOT_SECONDS)
+        learner = online_model
+        if learner is not None and learner.dirty:
+            snapshot_jobs.submit(snapshot_online_model)
+
+
+def start_snapshot_timer():
+    """Start the snapshot timer in this process, once (on the first ingest, so never in a preforking master)"""
+    global _snapshot_timer
+    with _snapshot_timer_lock:
+        if _snapshot_timer is None:
+            _snapshot_timer = threading.Thread(target=snapshot_loop, name='online-snapshot-timer', daemon=True)
+            _snapshot_timer.start()
+
+
+@atexit.register
+def flush_online_model():
+    """Write online counts the timer has not snapshotted yet when the service stops"""
+    learner = online_model
+    if learner is not None and learner.dirty:
+        learner.save_snapshot(ONLINE_SNAPSHOT_DIR)
+        logger.info("online_snapshot_flushed samples=%d", learner.samples_seen)
+
+
+def append_ingested_samples(rows):
+    """Append accepted answer sets to the ingested samples log (caller holds model_swap_lock)"""
+    frame = pd.DataFrame(rows, columns=QUESTION_FIELDS + ['label'])
+    exists = os.path.exists(ONLINE_SAMPLES_PATH)
+    frame.to_csv(ONLINE_SAMPLES_PATH, mode='a', header=not exists, index=False)
+
+
+def read_ingested_samples():
+    """Every answer set ingested so far, as a labelled frame (empty when there are none)"""
+    if not os.path.exists(ONLINE_SAMPLES_PATH):
+        return pd.DataFrame(columns=QUESTION_FIELDS + ['label'])
+    return pd.read_csv(ONLINE_SAMPLES_PATH)
+
+
+def single_worker_error(route):
+    """
+    Error response for a route that changes in-process state when several
+    preforked workers serve the app, or None. Each worker has its own model,
+    places and jobs, so the change would only reach the worker that served
+    it and a job's status would be unknown to the others.
+    """
+    if PREFORK_WORKERS <= 1:
+        return None
+    return jsonify({
+        'error': f"{route} is disabled with {PREFORK_WORKERS} preforked workers, as it would only change the "
+                 f"worker that serves it; update the model or places files and restart the service, "
+                 f"or run with WEB_WORKERS=1"
+    }), 409
+
+
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    """
+    Learn from a batch of labelled answer sets without retraining.
+    
+    Body: {"samples": [{"answers": {q1_activity: ..., ...}, "label": "Foodie"}, ...]}
+    (answers may also sit at the top level of a sample, as in the training CSV).
+    Accepted samples are logged to ONLINE_SAMPLES_PATH for the next retrain,
+    and the counts are snapshotted to disk every ONLINE_SNAPSHOT_SECONDS
+    while there are unsaved ones.
+    """
+    global classifier
+    error = single_worker_error('/ingest')
+    if error is not None:
+        return error
+    try:
+        data = request.json
+        samples = data.get('samples') if isinstance(data, dict) else None
+        if not isinstance(samples, list) or not samples:
+            return jsonify({'error': 'samples must be a non-empty list'}), 400
+        if len(samples) > ONLINE_MAX_BATCH:
+            return jsonify({'error': f'At most {ONLINE_MAX_BATCH} samples per batch'}), 400
+        learner = online_model
+        if learner is None:
+            return jsonify({'error': 'Online learning is not available'}), 503
+        
+        rows, rejected = [], []
+        for i, sample in enumerate(samples):
+            answers = sample.get('answers', sample) if isinstance(sample, dict) else None
+            if not isinstance(answers, dict):
+                rejected.append({'index': i, 'error': 'Sample must be an object'})
+                continue
+            missing = [field for field in QUESTION_FIELDS if field not in answers]
+            if missing:
+                rejected.append({'index': i, 'error': f'Missing field: {missing[0]}'})
+                continue
+            if sample.get('label') not in learner.class_index:
+                rejected.append({'index': i, 'error': f"Unknown label {sample.get('label')!r}"})
+                continue
+            rows.append(dict({field: answers[field] for field in QUESTION_FIELDS}, label=sample['label']))
+        
+        start = time.perf_counter()
+        if rows:
+            with model_swap_lock:
+                # A retrain may have replaced the learner since; the batch goes to the current one
+                learner = online_model
+                if learner is None:
+                    return jsonify({'error': 'Online learning is not available'}), 503
+                if any(row['label'] not in learner.class_index for row in rows):
+                    return jsonify({'error': 'The model was replaced while ingesting and no longer has some '
+                                             'of these labels; nothing was accepted'}), 409
+                append_ingested_samples(rows)
+                classifier = learner.partial_fit([answers_text(row) for row in rows], [row['label'] for row in rows])
+            start_snapshot_timer()
+        update_ms = (time.perf_counter() - start) * 1000
+        
+        return jsonify({
+            'accepted': len(rows),
+            'rejected': rejected,
+            'samplesSeen': learner.samples_seen,
+            'modelVersion': classifier.version,
+            'updateMs': round(update_ms, 3)
+        }), 200
+    
+    except Exception as e:
+        logger.exception("request_failed route=/ingest error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/retrain', methods=['POST'])
 def retrain():
+    error = single_worker_error('/retrain')
+    if error is not None:
+        return error
+    try:
+        job, started = retrain_jobs.submit(retrain_model)
+        return jsonify({
+            'message': 'Model retraining started' if started else 'Model retraining already in progress',
+            'job': job,
+            'statusUrl': f"/retrain/{job['id']}"
+        }), 202
+    except Exception as e:
+        logger.exception("request_failed route=/retrain error=%r", str(e))
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/retrain/<job_id>', methods=['GET'])
+def retrain_status(job_id):
+    error = single_worker_error('/retrain')
+    if error is not None:
+        return error
+    job = retrain_jobs.latest() if job_id == 'latest' else retrain_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Unknown retrain job '{job_id}'"}), 404
+    return jsonify({'job': job, 'modelVersion': classifier.version}), 200
+
+
+def reload_places(full=False):
+    """
+    Build the next places state, validate it and swap it in.
+    
+    Runs as a background job. By default only delta files added since the
+    last load are applied to the places in memory; the CSVs are read again
+    when full is set, when the CSVs changed, or when an applied delta file
+    was edited or removed. Requests keep using the state they started with;
+    the swap is one reference assignment, so a request sees either the old
+    places and indexes or the new ones, never a mix.
+    """
+    global place_state
+    current = place_state
+    found = delta_files(PLACES_DELTA_DIR)
+    incremental = (not full and tuple(found[:len(current.deltas)]) == current.deltas
+                   and data_version(places_data_dir, list(current.deltas)) == current.version)
+    if incremental:
+        pending = found[len(current.deltas):]
+        if not pending:
+            return {'mode': 'delta', 'swapped': False, 'placesVersion': current.version, 'places': len(current.places)}
+        updated = apply_delta_files(current.places, PLACES_DELTA_DIR, pending)
+    else:
+        pending = found
+        updated, _ = load_places(places_data_dir, use_snapshot=PLACES_SNAPSHOT)
+        updated = apply_delta_files(updated, PLACES_DELTA_DIR, pending)
+    validate_places(updated)
+    
+    state = build_place_state(updated, found, data_version(places_data_dir, found))
+    warm_place_state(state)
+    place_state = state
+    # Cached plans are keyed by places version, so the old ones could only go stale
+    trip_cache.clear()
+    logger.info("places_swapped version=%s previous=%s places=%d deltas=%d mode=%s",
+                state.version, current.version, len(updated), len(pending), 'delta' if incremental else 'full')
+    return {'mode': 'delta' if incremental else 'full', 'swapped': True, 'placesVersion': state.version,
+            'previousVersion': current.version, 'places': len(updated), 'deltasApplied': [d['name'] for d in pending]}
+
+
+@app.route('/reload-places', methods=['POST'])
+def reload_places_route():
+    """
+    Reload the places data without restarting.
+    
+    Body (optional): {"full": true} to read the CSVs again instead of only
+    applying new delta files from PLACES_DELTA_DIR.
+    """
+    error = single_worker_error('/reload-places')
+    if error is not None:
+        return error
     try:
-        csv_path = 'data/training-data.csv'
-        classifier.train(csv_path)
-        classifier.save_model()
-        return jsonify({'message': 'Model retrained successfully'}), 200
+        data = request.get_json(silent=True) or {}
+        full = data.get('full', False) if isinstance(data, dict) else None
+        if not isinstance(full, bool):
+            return jsonify({'error': 'full must be true or false'}), 400
+        job, started = reload_jobs.submit(lambda: reload_places(full))
+        return jsonify({
+            'message': 'Places reload started' if started else 'Places reload already in progress',
+            'job': job,
+            'statusUrl': f"/reload-places/{job['id']}"
+        }), 202
     except Exception as e:
+        logger.exception("request_failed route=/reload-places error=%r", str(e))
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/reload-places/<job_id>', methods=['GET'])
+def reload_places_status(job_id):
+    error = single_worker_error('/reload-places')
+    if error is not None:
+        return error
+    job = reload_jobs.latest() if job_id == 'latest' else reload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Unknown reload job '{job_id}'"}), 404
+    state = place_state
+    return jsonify({'job': job, 'placesVersion': state.version, 'places': len(state.places)}), 200
+
+
 if __name__ == '__main__':
     print("\n🚀 Starting AI Trip Planner Service...")
     print("✨ All 5 AI Features Enabled:")
@@ -582,4 +1826,5 @@ if __name__ == '__main__':
     print("   4. Weather-Aware Planning")
     print("   5. Explainable AI")
     print("📍 Running on http://localhost:5000\n")
+    start_batch_pool()
     app.run(host='0.0.0.0', port=5000, debug=True)
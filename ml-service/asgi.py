@@ -0,0 +1,374 @@
+"""
+Asyncio (ASGI) serving mode for the ML service.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    python asgi.py
+
+/generate-trip is served natively: the weather forecast comes through the
+shared forecast cache over a pooled keep-alive async HTTP client, and only
+planning runs on a bounded thread pool. Every other route (/predict,
+/health, /retrain, ...) is the Flask view itself, called on the same pool.
+
+Configuration (environment):
+    ASYNC_WORKERS            planning / view threads (default: CPU count)
+    ASYNC_MAX_INFLIGHT       requests handled at once; more get 503 (default 256)
+    ASYNC_REQUEST_TIMEOUT    seconds before a request gets 504 (default 30)
+    WEATHER_POOL_SIZE        keep-alive connections to the weather API (default 32)
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import httpx
+
+import app as service
+from payloads import RESPONSE_FORMATS, compact_trip, encode, response_format
+from weather_cache import FORECAST_DAYS, OpenWeatherMapBackend, parse_forecast
+
+
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', os.cpu_count() or 1))
+ASYNC_MAX_INFLIGHT = int(os.environ.get('ASYNC_MAX_INFLIGHT', 256))
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', 30))
+WEATHER_POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE', 32))
+MAX_BODY_BYTES = 1024 * 1024
+
+# Cheap routes that are answered even when the service is at its in-flight limit
+UNLIMITED_PATHS = ('/health', '/metrics')
+
+logger = logging.getLogger('ml_service.asgi')
+
+
+class AsyncForecasts:
+    """
+    Forecasts through a ForecastCache, fetched without holding a thread.
+
+    OpenWeatherMap requests share one keep-alive connection pool; any other
+    backend (e.g. the static fixture backend) is called on the executor.
+    Concurrent misses for a city share one fetch and stale entries are
+    refreshed in the background, as with ForecastCache.get.
+    """
+
+    def __init__(self, cache, executor, pool_size=WEATHER_POOL_SIZE):
+        self.cache = cache
+        self.executor = executor
+        self.pool_size = pool_size
+        self.client = None
+        self._inflight = {}
+
+    def _client(self):
+        if self.client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self.client = httpx.AsyncClient(limits=limits)
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get(self, city, days):
+        """Forecast for up to min(days, 5) days; [] when no forecast is available"""
+        forecast, refresh = self.cache.peek(city, days)
+        if forecast is not None:
+            if refresh:
+                self._fetch_task(city, background=True)
+            return forecast
+        # A timed-out request must not cancel the fetch other requests wait on
+        await asyncio.shield(self._fetch_task(city))
+        return self.cache.current(city, days)
+
+    def _fetch_task(self, city, background=False):
+        key = self.cache.key(city)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(city))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            if background:
+                self.cache.count('refreshes')
+        elif not background:
+            self.cache.count('coalesced')
+        return task
+
+    async def _fetch(self, city):
+        backend = self.cache.backend
+        try:
+            if isinstance(backend, OpenWeatherMapBackend):
+                response = await self._client().get(
+                    f"{backend.base_url}/forecast",
+                    params={'q': city, 'appid': backend.api_key, 'units': 'metric'},
+                    timeout=backend.timeout
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Weather API error: {response.status_code}")
+                forecast = parse_forecast(response.json())
+            else:
+                forecast = await asyncio.get_running_loop().run_in_executor(self.executor, backend.fetch, city)
+            logger.info("forecast_fetched city=%s days=%d", city, len(forecast[:FORECAST_DAYS]))
+        except Exception as e:
+            logger.warning("forecast_failed city=%s error=%r", city, str(e))
+            forecast = None
+        self.cache.store(city, forecast)
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP request"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion; returns (status, headers, body)"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return started['status'], started['headers'], body
+
+
+class AsyncService:
+    """ASGI application serving the Flask service's routes"""
+
+    def __init__(self, flask_app, workers=ASYNC_WORKERS, max_inflight=ASYNC_MAX_INFLIGHT,
+                 timeout=ASYNC_REQUEST_TIMEOUT):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='async-worker')
+        self.forecasts = AsyncForecasts(service.weather_cache, self.executor)
+        self.max_inflight = max_inflight
+        self.timeout = timeout
+        self.inflight = 0
+        self.stats = {'rejected': 0, 'timeouts': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Before any request runs on the executor, so the fork inherits no held locks
+                service.start_batch_pool()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.forecasts.close()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        limited = scope['path'] not in UNLIMITED_PATHS
+        if limited and self.inflight >= self.max_inflight:
+            # Backpressure: shed load at once rather than queueing without bound
+            self.stats['rejected'] += 1
+            await send_json(send, 503, {'error': 'Service overloaded, retry later'}, [(b'retry-after', b'1')])
+            return
+
+        self.inflight += limited
+        start = time.perf_counter()
+        try:
+            body = await read_body(receive)
+            if body is None:
+                await send_json(send, 413, {'error': f'Request body larger than {MAX_BODY_BYTES} bytes'})
+                return
+            deadline = start + self.timeout
+            if scope['method'] == 'POST' and scope['path'] == '/generate-trip':
+                await self.generate_trip(scope, body, send, deadline)
+            else:
+                await self.wsgi(scope, body, send, deadline)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            logger.warning("request_timeout path=%s seconds=%.3f", scope['path'], time.perf_counter() - start)
+            await send_json(send, 504, {'error': f'Request timed out after {self.timeout:g}s'})
+        finally:
+            self.inflight -= limited
+
+    async def run(self, deadline, func, *args):
+        """
+        func(*args) on the executor, bounded by the request deadline.
+
+        A timed-out call keeps its thread until it finishes; only the response
+        stops waiting for it.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        return await asyncio.wait_for(future, max(deadline - time.perf_counter(), 0))
+
+    async def wsgi(self, scope, body, send, deadline):
+        status, headers, body = await self.run(deadline, call_wsgi, self.flask_app.wsgi_app, wsgi_environ(scope, body))
+        await send_response(send, status, [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+                            body)
+
+    async def generate_trip(self, scope, body, send, deadline):
+        """POST /generate-trip, as served by the Flask view"""
+        query = {name: values[0] for name, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        try:
+            user_data = json.loads(body)
+        except ValueError:
+            await send_json(send, 400, {'error': 'Request body must be JSON'})
+            return
+
+        try:
+            problem = service.trip_request_problem(user_data)
+            if problem is not None:
+                message, status = problem
+                await send_json(send, status, {'error': message})
+                return
+            if query.get('stream', 'ndjson') not in service.STREAM_MIMETYPES:
+                await send_json(send, 400, {'error': f"Invalid stream, expected one of {list(service.STREAM_MIMETYPES)}"})
+                return
+            if query.get('format', 'json') not in RESPONSE_FORMATS:
+                await send_json(send, 400, {'error': f"Invalid format, expected one of {list(RESPONSE_FORMATS)}"})
+                return
+
+            trip = user_data['latestTrip']
+            weather_forecast = await asyncio.wait_for(self.forecasts.get(trip['district'], trip['days']),
+                                                      max(deadline - time.perf_counter(), 0))
+
+            stream_format = requested_stream_format(query, headers.get('accept', ''))
+            if stream_format is not None:
+                await self.stream_trip(user_data, weather_forecast, stream_format, send, deadline)
+                return
+
+            fmt = response_format(query.get('format'), headers.get('accept', ''))
+            payload, mimetype = await self.run(deadline, trip_body, user_data, weather_forecast, fmt)
+            await send_response(send, 200, [(b'content-type', mimetype.encode('latin-1'))], payload)
+
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            logger.exception("request_failed route=/generate-trip error=%r", str(e))
+            await send_json(send, 500, {'success': False, 'error': str(e)})
+
+    async def stream_trip(self, user_data, weather_forecast, stream_format, send, deadline):
+        """Streamed /generate-trip; each event is produced on the executor and sent as it is ready"""
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', f"{service.STREAM_MIMETYPES[stream_format]}; charset=utf-8".encode('latin-1')),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')
+            ]
+        })
+        events = service.trip_stream_events(user_data, stream_format, weather_forecast)
+        while True:
+            try:
+                event = await self.run(deadline, next, events, None)
+            except asyncio.TimeoutError:
+                # Headers are already sent, so the timeout travels as the last event
+                self.stats['timeouts'] += 1
+                event = service.encode_event({'type': 'error', 'success': False,
+                                              'error': f'Request timed out after {self.timeout:g}s'}, stream_format)
+                await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+                break
+            if event is None:
+                break
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def trip_body(user_data, weather_forecast, fmt):
+    """Planned and encoded /generate-trip response body: (bytes, mimetype)"""
+    response = service.trip_response(user_data, *service.plan_trip_csp(user_data, weather_forecast))
+    if fmt == 'json':
+        return json_body(response), 'application/json'
+    payload, mimetype = encode(compact_trip(response), fmt)
+    return payload.encode('utf-8') if isinstance(payload, str) else payload, mimetype
+
+
+def json_body(payload):
+    """JSON encoded like Flask's jsonify"""
+    return f"{service.app.json.dumps(payload, separators=(',', ':'))}\n".encode('utf-8')
+
+
+def requested_stream_format(query, accept):
+    """'ndjson' or 'sse' when the client asked for a streamed trip (?stream= or Accept), else None"""
+    stream = query.get('stream')
+    if stream in service.STREAM_MIMETYPES:
+        return stream
+    for stream_format, mimetype in service.STREAM_MIMETYPES.items():
+        if mimetype in accept:
+            return stream_format
+    return None
+
+
+async def read_body(receive):
+    """Request body, or None when it exceeds MAX_BODY_BYTES"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    headers = list(headers) + [(b'content-length', str(len(body)).encode('latin-1'))]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, payload, headers=()):
+    await send_response(send, status, [(b'content-type', b'application/json')] + list(headers), json_body(payload))
+
+
+app = AsyncService(service.app)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    print("\n🚀 Starting AI Trip Planner Service (async mode)...")
+    print(f"⚙️  {ASYNC_WORKERS} worker threads, up to {ASYNC_MAX_INFLIGHT} requests in flight, "
+          f"{ASYNC_REQUEST_TIMEOUT:g}s request timeout")
+    print(f"📍 Running on http://localhost:{port}\n")
+    uvicorn.run(app, host='0.0.0.0', port=port, access_log=False, log_level='warning')
@@ -0,0 +1,80 @@
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger('ml_service.jobs')
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobRunner:
+    """
+    Runs background jobs one at a time and keeps the status of recent ones.
+
+    A job's status is a dict with its id, state (running, succeeded or
+    failed), timestamps, and the work function's result or error.
+    """
+
+    def __init__(self, name, max_jobs=20):
+        self.name = name
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._active = None
+        self._lock = threading.Lock()
+
+    def submit(self, work):
+        """
+        Start work() in a background thread.
+
+        Returns (status, started); while a job is running no other starts and
+        the running job's status is returned with started=False.
+        """
+        with self._lock:
+            if self._active is not None:
+                return dict(self._jobs[self._active]), False
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                'id': job_id,
+                'state': 'running',
+                'startedAt': _now(),
+                'finishedAt': None,
+                'result': None,
+                'error': None
+            }
+            self._active = job_id
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            status = dict(self._jobs[job_id])
+
+        thread = threading.Thread(target=self._run, args=(job_id, work), name=f'{self.name}-{job_id}', daemon=True)
+        thread.start()
+        return status, True
+
+    def _run(self, job_id, work):
+        update = {}
+        try:
+            update['result'] = work()
+            update['state'] = 'succeeded'
+        except Exception as e:
+            logger.exception("job_failed job=%s id=%s error=%r", self.name, job_id, str(e))
+            update['state'] = 'failed'
+            update['error'] = str(e)
+        update['finishedAt'] = _now()
+        with self._lock:
+            self._jobs[job_id].update(update)
+            self._active = None
+        logger.info("job_finished job=%s id=%s state=%s", self.name, job_id, update['state'])
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def latest(self):
+        with self._lock:
+            return dict(next(reversed(self._jobs.values()))) if self._jobs else None
@@ -0,0 +1,199 @@
+"""
+Concurrency benchmark: the Flask server against the async (ASGI) mode.
+
+Both servers run as subprocesses on the real place data, with the weather
+API pointed at a local stub server that answers after a fixed delay and the
+forecast cache disabled, so every trip waits on weather I/O. Each level of
+concurrent clients sends the same mix of /generate-trip requests.
+
+    python benchmarks/concurrency_benchmark.py
+    python benchmarks/concurrency_benchmark.py --levels 1 16 64 --requests 400 --weather-delay-ms 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(SERVICE_DIR, 'benchmarks')
+sys.path.insert(0, BENCH_DIR)
+
+from run_benchmarks import WEATHER_CONDITIONS, git_revision, summarize  # noqa: E402
+
+DEFAULT_LEVELS = [1, 8, 32, 128]
+DISTRICTS = ['Chennai', 'Coimbatore', 'Madurai', 'Tiruchirappalli', 'Salem', 'Tirunelveli', 'Vellore', 'Erode']
+FLASK_SERVER = (
+    "import os, app; "
+    "app.app.run(host='127.0.0.1', port=int(os.environ['PORT']), threaded=True, debug=False)"
+)
+
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """OpenWeatherMap-shaped forecast for any city, after the configured delay"""
+    delay = 0.2
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        city = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+        rng = random.Random(city)
+        body = json.dumps({'list': [
+            {'weather': [{'main': rng.choice(WEATHER_CONDITIONS), 'description': 'stub'}],
+             'main': {'temp': rng.uniform(22, 36), 'humidity': rng.randint(40, 90)}}
+            for _ in range(40)
+        ]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_weather(delay):
+    StubWeatherHandler.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubWeatherHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(mode, port, weather_url, extra_env):
+    env = dict(os.environ, PORT=str(port), WEATHER_API_URL=weather_url, LOG_LEVEL='ERROR',
+               WEATHER_CACHE_TTL='0', WEATHER_CACHE_STALE_TTL='0', TRIP_CACHE_SIZE='0', **extra_env)
+    command = [sys.executable, 'asgi.py'] if mode == 'async' else [sys.executable, '-c', FLASK_SERVER]
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/health', timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"{mode} server did not start")
+
+
+def thread_count(pid):
+    """Threads of a process (Linux), None elsewhere"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+async def run_level(base_url, payloads, concurrency, pid):
+    """Send every payload with `concurrency` clients in flight; returns the summary and status counts"""
+    latencies = []
+    statuses = {}
+    peak_threads = 0
+    queue = list(payloads)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def client_loop():
+            nonlocal peak_threads
+            while queue:
+                payload = queue.pop()
+                t = time.perf_counter()
+                try:
+                    status = (await client.post('/generate-trip', json=payload)).status_code
+                except httpx.HTTPError:
+                    status = 'error'
+                latencies.append(time.perf_counter() - t)
+                statuses[status] = statuses.get(status, 0) + 1
+                peak_threads = max(peak_threads, thread_count(pid) or 0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    summary = summarize(f'c={concurrency}', latencies, wall)
+    summary['statuses'] = {str(status): count for status, count in sorted(statuses.items(), key=str)}
+    summary['peak_server_threads'] = peak_threads or None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Flask and async serving under concurrent /generate-trip load')
+    parser.add_argument('--levels', type=int, nargs='+', default=DEFAULT_LEVELS, help='concurrent clients per run')
+    parser.add_argument('--requests', type=int, default=256, help='requests per level')
+    parser.add_argument('--weather-delay-ms', type=int, default=200, help='stub weather API response delay')
+    parser.add_argument('--modes', nargs='+', default=['flask', 'async'], choices=['flask', 'async'])
+    parser.add_argument('--async-workers', type=int, default=None, help='ASYNC_WORKERS for the async server')
+    parser.add_argument('--max-inflight', type=int, default=None, help='ASYNC_MAX_INFLIGHT for the async server')
+    parser.add_argument('--port', type=int, default=5090)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help='results JSON path (default: benchmarks/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    stub = start_stub_weather(args.weather_delay_ms / 1000)
+    weather_url = f'http://127.0.0.1:{stub.server_address[1]}'
+    rng = random.Random(args.seed)
+    payloads = [{
+        'userId': 'bench-user',
+        'latestTrip': {'_id': f'bench-{i}', 'district': rng.choice(DISTRICTS), 'days': rng.choice([1, 2, 3, 5]),
+                       'budget': rng.choice(['LIMITED', 'MODERATE', 'LUXURY']), 'travelWith': 'Family'},
+        'travelerProfile': {'travelerType': 'Adventure Seeker'}
+    } for i in range(args.requests)]
+
+    extra_env = {}
+    if args.async_workers is not None:
+        extra_env['ASYNC_WORKERS'] = str(args.async_workers)
+    if args.max_inflight is not None:
+        extra_env['ASYNC_MAX_INFLIGHT'] = str(args.max_inflight)
+
+    runs = []
+    for mode in args.modes:
+        process = start_server(mode, args.port, weather_url, extra_env)
+        try:
+            base_url = f'http://127.0.0.1:{args.port}'
+            asyncio.run(run_level(base_url, payloads[:16], 4, process.pid))  # warm-up
+            levels = [asyncio.run(run_level(base_url, payloads, level, process.pid)) for level in args.levels]
+        finally:
+            process.terminate()
+            process.wait()
+        runs.append({'mode': mode, 'levels': levels})
+
+        print(f"\n{mode} server — weather delay {args.weather_delay_ms}ms, {args.requests} requests per level")
+        print(f"  {'clients':<10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'threads':>8}  statuses")
+        for level in levels:
+            print(f"  {level['scenario']:<10} {level['throughput_rps']:>10} {level['p50_ms']:>10} "
+                  f"{level['p99_ms']:>10} {str(level['peak_server_threads']):>8}  {level['statuses']}")
+    stub.shutdown()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'requests_per_level': args.requests,
+        'weather_delay_ms': args.weather_delay_ms,
+        'runs': runs
+    }
+    out = args.out or os.path.join(BENCH_DIR, 'results', f"concurrency-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📝 Results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Memory and startup benchmark for preforked serving (gunicorn.conf.py).
+
+Starts gunicorn twice, with every worker loading the app itself
+(WEB_PRELOAD=0) and with the app loaded once in the master and shared by
+the forked workers (WEB_PRELOAD=1). Startup is the time from launch until
+every worker is ready. After a round of /generate-trip traffic each
+process's memory is read from /proc/<pid>/smaps_rollup (Linux only):
+
+    RSS   resident pages, shared ones counted in full by every process
+    PSS   resident pages with shared ones split between their sharers
+    USS   pages private to the process (what a worker really adds)
+
+    python benchmarks/prefork_benchmark.py --workers 4
+    python benchmarks/prefork_benchmark.py --workers 4 --places-dir benchmarks/.data/100000-500-42
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(SERVICE_DIR, 'benchmarks')
+sys.path.insert(0, BENCH_DIR)
+
+from run_benchmarks import git_revision  # noqa: E402
+
+MODES = {'independent': '0', 'preforked': '1'}
+
+
+def memory_mb(pid):
+    """RSS, PSS and USS of a process in MB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_mb': round(fields['Rss'] / 1024, 1),
+        'pss_mb': round(fields['Pss'] / 1024, 1),
+        'uss_mb': round((fields['Private_Clean'] + fields['Private_Dirty']) / 1024, 1)
+    }
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_mode(mode, args, places_dir):
+    port = args.port
+    log = tempfile.NamedTemporaryFile('w+', suffix='.log', delete=False)
+    env = dict(os.environ, WEB_WORKERS=str(args.workers), WEB_THREADS='1', WEB_PRELOAD=MODES[mode], PORT=str(port),
+               PLACES_DATA_DIR=places_dir, LOG_LEVEL='ERROR')
+    start = time.perf_counter()
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--error-logfile', log.name, '--log-level', 'info'],
+                              cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + args.startup_timeout
+        while True:
+            with open(log.name) as f:
+                ready = f.read().count('worker_ready')
+            if ready >= args.workers:
+                break
+            if time.perf_counter() > deadline or master.poll() is not None:
+                raise SystemExit(f"{mode}: workers did not start (see {log.name})")
+            time.sleep(0.05)
+        startup_seconds = time.perf_counter() - start
+
+        rng = random.Random(args.seed)
+        with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=60) as client:
+            for i in range(args.requests):
+                client.post('/generate-trip', json={
+                    'latestTrip': {'_id': f'bench-{i}', 'district': rng.choice(args.districts),
+                                   'days': rng.choice([1, 2, 3]), 'budget': 'MODERATE', 'travelWith': 'Family'},
+                    'travelerProfile': {'travelerType': 'Culture Seeker'}
+                })
+
+        workers = [memory_mb(pid) for pid in children(master.pid)]
+        master_memory = memory_mb(master.pid)
+    finally:
+        master.terminate()
+        master.wait()
+        os.unlink(log.name)
+
+    def mean(key):
+        return round(sum(w[key] for w in workers) / len(workers), 1)
+
+    return {
+        'mode': mode,
+        'workers': len(workers),
+        'startup_seconds': round(startup_seconds, 2),
+        'worker_rss_mb': mean('rss_mb'),
+        'worker_pss_mb': mean('pss_mb'),
+        'worker_uss_mb': mean('uss_mb'),
+        'master': master_memory,
+        'total_pss_mb': round(master_memory['pss_mb'] + sum(w['pss_mb'] for w in workers), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-worker memory and startup time with and without preforking')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='/generate-trip requests before measuring')
+    parser.add_argument('--places-dir', default='data', help='PLACES_DATA_DIR for the service')
+    parser.add_argument('--districts', nargs='+', default=None, help='districts to plan trips in (default: all)')
+    parser.add_argument('--port', type=int, default=5091)
+    parser.add_argument('--startup-timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help='results JSON path (default: benchmarks/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    places_dir = os.path.abspath(os.path.join(SERVICE_DIR, args.places_dir))
+    if args.districts is None:
+        import pandas as pd
+        args.districts = sorted(pd.read_csv(f'{places_dir}/places_dataset.csv',
+                                            usecols=['destination_city'])['destination_city'].dropna().unique())
+
+    runs = [run_mode(mode, args, places_dir) for mode in MODES]
+
+    print(f"\n{args.workers} workers, {args.requests} trips planned, places from {args.places_dir}")
+    print(f"  {'mode':<12} {'startup s':>10} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} "
+          f"{'master PSS':>11} {'total PSS':>10}")
+    for run in runs:
+        print(f"  {run['mode']:<12} {run['startup_seconds']:>10} {run['worker_rss_mb']:>11} {run['worker_pss_mb']:>11} "
+              f"{run['worker_uss_mb']:>11} {run['master']['pss_mb']:>11} {run['total_pss_mb']:>10}")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'places_dir': args.places_dir,
+        'requests': args.requests,
+        'runs': runs
+    }
+    out = args.out or os.path.join(BENCH_DIR, 'results', f"prefork-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📝 Results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Load and scale benchmarks for the ML service.
+
+Each scale runs in its own process against synthetic place data, with the
+weather API replaced by a static backend. Results are printed as a table and
+written as JSON under benchmarks/results/ so runs can be compared over time.
+
+    python benchmarks/run_benchmarks.py                      # 10k, 100k, 1M places
+    python benchmarks/run_benchmarks.py --scales 10000 --requests 500
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(SERVICE_DIR, 'benchmarks')
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+DEFAULT_SCALES = [10000, 100000, 1000000]
+WEATHER_CONDITIONS = ['Clear', 'Clouds', 'Rain', 'Drizzle', 'Thunderstorm', 'Mist']
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(name, latencies, wall_seconds):
+    """Throughput and latency percentiles (milliseconds) for one scenario"""
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / wall_seconds, 1) if wall_seconds > 0 else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0
+    }
+
+
+def run_scenario(name, func, payloads):
+    latencies = []
+    start = time.perf_counter()
+    for payload in payloads:
+        t = time.perf_counter()
+        func(payload)
+        latencies.append(time.perf_counter() - t)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def peak_rss_mb():
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def static_forecasts(districts, days=5, seed=7):
+    """Deterministic per-district forecasts so every run plans against the same weather"""
+    rng = random.Random(seed)
+    return {
+        district: [{'day': d + 1, 'condition': rng.choice(WEATHER_CONDITIONS), 'temp': round(rng.uniform(22, 36), 1),
+                    'description': 'synthetic', 'humidity': rng.randint(40, 90)} for d in range(days)]
+        for district in districts
+    }
+
+
+def worker(data_dir, n_requests, seed):
+    """Benchmark one dataset inside this process and print the results as JSON"""
+    os.chdir(SERVICE_DIR)
+    os.environ['PLACES_DATA_DIR'] = data_dir
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    import io
+    import contextlib
+    load_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    load_seconds = time.perf_counter() - load_start
+    rss_after_load = peak_rss_mb()
+
+    from weather_cache import StaticBackend
+    from nb_inference import QUESTION_FIELDS
+
+    districts = sorted(app.place_state.index.district_rows)
+    app.weather_cache.backend = StaticBackend(static_forecasts(districts), default=[])
+    rng = random.Random(seed)
+
+    def trip_payload():
+        return {
+            'userId': 'bench-user',
+            'latestTrip': {'_id': 'bench-trip', 'district': rng.choice(districts), 'days': rng.choice([1, 2, 3, 5, 7]),
+                           'budget': rng.choice(['LIMITED', 'MODERATE', 'LUXURY']), 'travelWith': 'Family'},
+            'travelerProfile': {'travelerType': rng.choice(list(app.TRAVELER_INFO))}
+        }
+
+    options = app.classifier.lookup.options if app.classifier.lookup is not None else {}
+
+    def answer_payload():
+        answers = {field: rng.choice(options.get(field) or ['unknown']) for field in QUESTION_FIELDS}
+        # Every tenth answer set is off-vocabulary to exercise the model path
+        if rng.random() < 0.1:
+            answers['q1_activity'] = 'Something the quiz never offered'
+        return answers
+
+    trips = [trip_payload() for _ in range(n_requests)]
+    answers = [answer_payload() for _ in range(n_requests)]
+    client = app.app.test_client()
+
+    # Warm the weather cache so every scenario measures planning, not fixture lookups
+    for district in districts:
+        app.get_weather_forecast(district, 5)
+
+    results = []
+    trip_cache_size = app.trip_cache.max_entries
+    app.trip_cache.max_entries = 0
+    results.append(run_scenario('plan_trip_csp', app.plan_trip_csp, trips))
+    results.append(run_scenario('classifier.predict', app.classifier.predict, answers))
+    results.append(run_scenario('POST /predict', lambda a: client.post('/predict', json=a), answers))
+    results.append(run_scenario('POST /generate-trip', lambda t: client.post('/generate-trip', json=t), trips))
+
+    def first_streamed_day(trip):
+        response = client.post('/generate-trip?stream=ndjson', json=trip, buffered=False)
+        for line in response.response:
+            if json.loads(line)['type'] == 'day':
+                break
+        response.close()
+
+    results.append(run_scenario('POST /generate-trip (1st day)', first_streamed_day, trips))
+    app.trip_cache.max_entries = trip_cache_size or 1024
+    repeated = [trips[i % 20] for i in range(n_requests)]
+    results.append(run_scenario('POST /generate-trip (cached)', lambda t: client.post('/generate-trip', json=t), repeated))
+
+    print(json.dumps({
+        'places': len(app.place_state.places),
+        'districts': len(districts),
+        'load_seconds': round(load_seconds, 3),
+        'rss_after_load_mb': rss_after_load,
+        'peak_rss_mb': peak_rss_mb(),
+        'scenarios': results
+    }))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /predict and /generate-trip at several dataset sizes')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='number of places per run')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--per-district', type=int, default=500, help='average places per synthetic district')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-root', default=os.path.join(BENCH_DIR, '.data'))
+    parser.add_argument('--out', default=None, help='results JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.requests, args.seed)
+        return
+
+    from synthetic_data import write_places
+
+    runs = []
+    for scale in args.scales:
+        data_dir = os.path.join(args.data_root, f'{scale}-{args.per_district}-{args.seed}')
+        gen_start = time.perf_counter()
+        write_places(data_dir, scale, args.per_district, args.seed)
+        print(f"📦 {scale} places ready in {data_dir} ({time.perf_counter() - gen_start:.1f}s)")
+
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', data_dir,
+             '--requests', str(args.requests), '--seed', str(args.seed)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(result.stderr)
+            raise SystemExit(f"Benchmark worker failed for {scale} places")
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        run['scale'] = scale
+        runs.append(run)
+
+        print(f"\n{scale} places ({run['districts']} districts) — load {run['load_seconds']}s, "
+              f"RSS after load {run['rss_after_load_mb']}MB, peak {run['peak_rss_mb']}MB")
+        print(f"  {'scenario':<30} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for scenario in run['scenarios']:
+            print(f"  {scenario['scenario']:<30} {scenario['throughput_rps']:>10} "
+                  f"{scenario['p50_ms']:>10} {scenario['p99_ms']:>10}")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'requests_per_scenario': args.requests,
+        'runs': runs
+    }
+    out = args.out or os.path.join(BENCH_DIR, 'results', f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📝 Results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# Traveler labels as they appear in the category column (Shopper / Urban Explorer is one label)
+TRAVELER_LABELS = ['Culture Seeker', 'Nature Lover', 'Spiritual Traveler', 'Adventure Seeker', 'Foodie',
+                   'Budget Backpacker', 'Family Planner', 'Relaxation Lover', 'Shopper / Urban Explorer',
+                   'Romantic Couple']
+LABEL_WEIGHTS = [0.22, 0.18, 0.13, 0.09, 0.08, 0.08, 0.06, 0.06, 0.05, 0.05]
+COST_CATEGORIES = ['Budget', 'Mid-range', 'Premium']
+COST_WEIGHTS = [0.81, 0.17, 0.02]
+INDOOR_OUTDOOR = ['outdoor', 'both', 'indoor']
+INDOOR_WEIGHTS = [0.54, 0.24, 0.22]
+SUITABLE_FOR = ['Just Me / Family', 'Couple / Family', 'Friends / Family', 'Just Me / Friends', 'Family']
+TIMINGS = ['06:00-20:00', '06:00-18:00', '09:00-17:00', '06:00-19:00', '09:00-18:00', '07:00-22:00',
+           '08:00-17:00', '06:00-12:00, 16:00-20:00', '10:00-17:00', '11:00-23:00', '24 hours']
+DURATIONS = [1, 2, 3, 4, 5, 6]
+DURATION_WEIGHTS = [0.3, 0.46, 0.15, 0.05, 0.03, 0.01]
+
+
+def district_names(n_districts):
+    return [f'District {i:04d}' for i in range(n_districts)]
+
+
+def generate_places(n_places, places_per_district=500, seed=42):
+    """
+    Synthetic places_dataset / place_metadata / place_coordinates frames.
+
+    Place names are unique so the service's merge on place_name stays one row per place.
+    """
+    rng = np.random.default_rng(seed)
+    n_districts = max(1, n_places // places_per_district)
+    districts = np.array(district_names(n_districts), dtype=object)
+
+    district_idx = rng.integers(0, n_districts, n_places)
+    city = districts[district_idx]
+    names = np.char.add('Synthetic Place ', np.arange(n_places).astype(str)).astype(object)
+
+    # One to three traveler labels per place, joined like the real data
+    labels = np.array(TRAVELER_LABELS, dtype=object)
+    n_labels = rng.choice([1, 2, 3], n_places, p=[0.2, 0.45, 0.35])
+    picks = rng.choice(len(labels), (n_places, 3), p=LABEL_WEIGHTS)
+    category = labels[picks[:, 0]]
+    for k in (1, 2):
+        extra = n_labels > k
+        category[extra] = category[extra] + ' / ' + labels[picks[extra, k]]
+
+    cost = rng.choice(COST_CATEGORIES, n_places, p=COST_WEIGHTS)
+    indoor = rng.choice(INDOOR_OUTDOOR, n_places, p=INDOOR_WEIGHTS)
+    duration = rng.choice(DURATIONS, n_places, p=DURATION_WEIGHTS)
+    rating = np.clip(rng.poisson(2.0, n_places), 1, 5)
+
+    # Each district is a cluster roughly 50 km across somewhere in Tamil Nadu's bounding box
+    centre_lat = rng.uniform(8.5, 13.3, n_districts)
+    centre_lon = rng.uniform(76.5, 80.3, n_districts)
+    latitude = np.round(centre_lat[district_idx] + rng.normal(0, 0.15, n_places), 4)
+    longitude = np.round(centre_lon[district_idx] + rng.normal(0, 0.15, n_places), 4)
+
+    places_dataset = pd.DataFrame({
+        'place_name': names,
+        'category': category,
+        'cost_category': cost,
+        'suitable_for': rng.choice(SUITABLE_FOR, n_places),
+        'duration_hours': duration,
+        'timing': rng.choice(TIMINGS, n_places),
+        'destination_city': city
+    })
+    place_metadata = pd.DataFrame({
+        'place_name': names,
+        'category': category,
+        'cost_category': cost,
+        'indoor_outdoor': indoor,
+        'popularity_rating': rating,
+        'destination_city': city
+    })
+    place_coordinates = pd.DataFrame({
+        'place_name': names,
+        'latitude': latitude,
+        'longitude': longitude,
+        'destination_city': city
+    })
+    return places_dataset, place_metadata, place_coordinates
+
+
+def write_places(data_dir, n_places, places_per_district=500, seed=42):
+    """Write the three CSVs the service reads into data_dir (skipped if already there)"""
+    marker = f'{data_dir}/.generated-{n_places}-{places_per_district}-{seed}'
+    if os.path.exists(marker):
+        return data_dir
+    os.makedirs(data_dir, exist_ok=True)
+    places_dataset, place_metadata, place_coordinates = generate_places(n_places, places_per_district, seed)
+    places_dataset.to_csv(f'{data_dir}/places_dataset.csv', index=False)
+    place_metadata.to_csv(f'{data_dir}/place_metadata.csv', index=False)
+    place_coordinates.to_csv(f'{data_dir}/place_coordinates.csv', index=False)
+    open(marker, 'w').close()
+    return data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic place CSVs for benchmarking')
+    parser.add_argument('places', type=int, help='number of places')
+    parser.add_argument('out_dir', help='directory to write the CSVs into')
+    parser.add_argument('--per-district', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    write_places(args.out_dir, args.places, args.per_district, args.seed)
+    print(f"✅ Wrote {args.places} synthetic places to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
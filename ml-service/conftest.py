@@ -0,0 +1,9 @@
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The service reads data/ and models/ relative to its own directory
+os.chdir(SERVICE_DIR)
+sys.path.insert(0, SERVICE_DIR)
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
@@ -0,0 +1,128 @@
+import numpy as np
+
+from scoring import top_k
+from spatial_index import KM_PER_DEGREE
+
+
+def project_km(latitudes, longitudes):
+    """Equirectangular projection to km around the points' mean latitude (fine at district scale)"""
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    cos_lat = np.cos(np.radians(np.nanmean(latitudes))) if len(latitudes) else 1.0
+    return np.column_stack([latitudes * KM_PER_DEGREE, longitudes * KM_PER_DEGREE * cos_lat])
+
+
+def _init_centres(points, k, rng):
+    """k-means++ seeding"""
+    centres = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = ((points[:, None, :] - np.array(centres)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        centres.append(points[rng.choice(len(points), p=d2 / total)] if total > 0 else points[rng.integers(len(points))])
+    return np.array(centres)
+
+
+def _capacitated_assign(dist, weights, capacity):
+    """
+    Nearest-centre assignment where no cluster takes more than `capacity` weight.
+
+    Points with the most to lose from their second choice are placed first.
+    """
+    n, k = dist.shape
+    ranked = np.argsort(dist, axis=1)
+    regret = dist[np.arange(n), ranked[:, 1]] - dist[np.arange(n), ranked[:, 0]] if k > 1 else np.zeros(n)
+    load = np.zeros(k)
+    labels = np.empty(n, dtype=np.int64)
+    for i in np.argsort(-regret, kind='stable'):
+        for c in ranked[i]:
+            if load[c] + weights[i] <= capacity:
+                break
+        else:
+            c = int(np.argmin(load))
+        labels[i] = c
+        load[c] += weights[i]
+    return labels
+
+
+def balanced_kmeans(points, weights, k, slack=1.15, iterations=20, seed=0):
+    """
+    Split points into k spatially compact clusters of roughly equal total weight.
+
+    Lloyd iterations with a capacity-limited assignment step; each cluster
+    holds at most slack times its even share of the weight.
+    Returns a cluster label per point.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    n = len(points)
+    if k <= 1:
+        return np.zeros(n, dtype=np.int64)
+    if n <= k:
+        return np.arange(n)
+
+    capacity = weights.sum() / k * slack
+    centres = _init_centres(points, k, np.random.default_rng(seed))
+    labels = None
+    for _ in range(iterations):
+        dist = np.sqrt(((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2))
+        new_labels = _capacitated_assign(dist, weights, capacity)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = labels == c
+            if members.any():
+                centres[c] = np.average(points[members], axis=0, weights=weights[members])
+    return labels
+
+
+def match_clusters_to_days(value):
+    """
+    Give each day one cluster, best total value first (value[c, d] is cluster c on day d).
+
+    Greedy on the largest remaining value; days outnumbering clusters get -1.
+    """
+    value = np.array(value, dtype=np.float64)
+    clusters, days = value.shape
+    day_cluster = np.full(days, -1, dtype=np.int64)
+    for _ in range(min(clusters, days)):
+        c, d = np.unravel_index(int(np.argmax(value)), value.shape)
+        day_cluster[d] = c
+        value[c, :] = -np.inf
+        value[:, d] = -np.inf
+    return day_cluster
+
+
+def cluster_day_scores(day_scores, latitudes, longitudes, durations, daily_hours=8, pool_factor=3):
+    """
+    Restrict each day to one spatially compact cluster of the strongest candidates.
+
+    The best-scoring places (about pool_factor times the trip's hours) are
+    split into one hour-balanced cluster per day, clusters are matched to
+    days by how well they score under that day's weather, and every place
+    outside a day's cluster gets -inf for that day.
+    """
+    days = len(day_scores)
+    best = day_scores.max(axis=0) if days else np.empty(0)
+    usable = np.flatnonzero(np.isfinite(best) & np.isfinite(latitudes) & np.isfinite(longitudes))
+    if days <= 1 or len(usable) <= days:
+        return day_scores
+
+    pool = usable[top_k(best[usable], days * daily_hours * pool_factor)]
+    labels = balanced_kmeans(project_km(latitudes[pool], longitudes[pool]), durations[pool], days)
+
+    # Value of cluster c on day d: its best places that fit in one day's hours
+    value = np.zeros((days, days))
+    for c in range(days):
+        members = pool[labels == c]
+        for d in range(days):
+            order = np.argsort(-day_scores[d, members], kind='stable')
+            fits = np.cumsum(durations[members[order]]) <= daily_hours
+            value[c, d] = day_scores[d, members[order[fits]]].sum()
+
+    masked = np.full_like(day_scores, -np.inf)
+    for d, c in enumerate(match_clusters_to_days(value)):
+        if c >= 0:
+            members = pool[labels == c]
+            masked[d, members] = day_scores[d, members]
+    return masked
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+
+ALGORITHM = 'CSP + A* + Weather-Aware Planning'
+MAX_CONFIDENCE = 5
+
+
+def _rating_reason(rating):
+    if rating >= 4:
+        return f"⭐ Highly rated: {rating}/5 stars", 1
+    if rating >= 2:
+        return f"⭐ Rated: {rating}/5 stars", 0.5
+    return None, 0
+
+
+def _column_fragments(places, column, default, text):
+    """
+    Per-row codes into text(value) for each distinct value of a column.
+
+    Values are the ones a place record holds, so the text is the same as
+    formatting the record at request time.
+    """
+    n = len(places)
+    if column not in places.columns:
+        return np.zeros(n, dtype=np.int32), [text(default)]
+    values = places[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        uniques = list(values.cat.categories.to_numpy()) + [np.nan]
+        codes = np.where(codes < 0, len(uniques) - 1, codes)
+    else:
+        codes, uniques = pd.factorize(values.to_numpy(), use_na_sentinel=False)
+    return codes.astype(np.int32), [text(value) for value in uniques]
+
+
+class ExplanationFragments:
+    """
+    Explanation text for every place, formatted once per distinct value.
+
+    Only the traveler type, budget, day number and weather differ between
+    requests, so an explanation is a handful of lookups and joins.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        places = index.places
+        self.rating = _column_fragments(places, 'popularity_rating', 0, _rating_reason)
+        self.cost = _column_fragments(places, 'cost_category', 'Budget', lambda cost: f"(place cost: {cost})")
+        self.duration = _column_fragments(places, 'duration_hours', 2, lambda hours: f"⏱ Duration: {hours}hrs fits Day ")
+        self.venue = _column_fragments(places, 'indoor_outdoor', 'outdoor', lambda kind: f"🌦 Weather-aware: {kind} venue")
+
+    @staticmethod
+    def _text(fragments, row):
+        codes, texts = fragments
+        return texts[codes[row]]
+
+    def explain(self, row, traveler_type, budget, condition, day_number, score=None):
+        """
+        Reasons and confidence for recommending one place on one day.
+
+        condition is the day's weather (None without a forecast). With a score
+        breakdown from the scored planner, the reasons follow its component
+        values and the confidence is the place's weighted score.
+        """
+        reasons = []
+        confidence_score = 0
+
+        type_match = score['type'] if score is not None else self.index.type_match(np.array([row]), traveler_type)[0]
+        if type_match == 1:
+            reasons.append(f"✓ Perfect match for '{traveler_type}' traveler type")
+            confidence_score += 1
+        elif type_match > 0:
+            reasons.append(f"≈ Partial match for '{traveler_type}' interests")
+            confidence_score += 0.5
+
+        if score is not None and score['cost'] < 1:
+            reasons.append(f"⚠ Above {budget} budget {self._text(self.cost, row)}")
+        else:
+            reasons.append(f"✓ Fits {budget} budget {self._text(self.cost, row)}")
+            confidence_score += 1
+
+        rating_reason, points = self._text(self.rating, row)
+        if rating_reason is not None:
+            reasons.append(rating_reason)
+            confidence_score += points
+
+        reasons.append(f"{self._text(self.duration, row)}{day_number} schedule")
+        confidence_score += 1
+
+        if condition is not None:
+            indoor = self.index.indoor_code[row] == 0
+            if score is not None:
+                weather_match = score['weather'] == 1
+            else:
+                weather_match = (condition in ['Rain', 'Thunderstorm'] and indoor) or \
+                    (condition in ['Clear', 'Clouds'] and self.index.indoor_code[row] == 1)
+
+            if weather_match and indoor:
+                reasons.append("☔ Weather-smart: Indoor venue for rainy conditions")
+                confidence_score += 1
+            elif weather_match:
+                reasons.append("☀ Weather-perfect: Outdoor activity for good weather")
+                confidence_score += 1
+            else:
+                reasons.append(self._text(self.venue, row))
+                confidence_score += 0.5
+
+        return {
+            'reasons': reasons,
+            'confidence': round(score['score'] if score is not None else confidence_score / MAX_CONFIDENCE, 2),
+            'algorithm': ALGORITHM
+        }
@@ -0,0 +1,61 @@
+"""
+Preforked production serving for the ML service.
+
+    gunicorn                                    # Flask app, settings below
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+The app (model, places data and indexes) is imported once in the master,
+which then forks the workers, so they share it copy-on-write instead of
+each loading its own copy. Before forking, the lazily built read-only
+state is filled in and the garbage collector is frozen, so neither a
+worker's first request nor its first collection writes to the inherited
+pages.
+
+Each worker still has its own caches, model and places, so with more
+than one worker the routes that change them in-process (/ingest,
+/retrain, /reload-places and their job status) are disabled: update the
+files and restart instead. Batch planning pools are sized so the
+workers' pools together use every CPU once; each worker forks its pool
+before starting its request threads.
+
+Configuration (environment):
+    WEB_WORKERS     worker processes (default: CPU count)
+    WEB_THREADS     threads per worker (default 4)
+    WEB_PRELOAD     0 to load the app separately in every worker (default 1)
+    PORT            listening port (default 5000)
+    BATCH_WORKERS   batch planning processes per worker (default: CPU count / WEB_WORKERS)
+"""
+import gc
+import os
+import time
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+wsgi_app = 'app:app'
+workers = int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+preload_app = os.environ.get('WEB_PRELOAD', '1') == '1'
+timeout = 60
+
+# Read by the app, which is imported after this file
+os.environ['PREFORK_WORKERS'] = str(workers)
+os.environ.setdefault('BATCH_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+_started = time.perf_counter()
+
+
+def when_ready(server):
+    """Master, after the preloaded app is imported and before any worker is forked"""
+    if preload_app:
+        import app
+        app.prepare_shared_state()
+        gc.collect()
+        gc.freeze()
+    server.log.info("app_ready preload=%s seconds=%.2f", preload_app, time.perf_counter() - _started)
+
+
+def post_worker_init(worker):
+    """Worker, before it starts its request threads: the batch pool is forked here while nothing holds a lock"""
+    import app
+    app.start_batch_pool()
+    worker.log.info("worker_ready pid=%s seconds=%.2f", worker.pid, time.perf_counter() - _started)
@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import threading
+
+
+# Latency buckets in seconds, from sub-millisecond index lookups to slow weather calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def configure_logging(level=None):
+    """Level-gated key=value logging for the service (LOG_LEVEL, default INFO)"""
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO),
+        format='ts=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s'
+    )
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullTimer:
+    """Stand-in used when instrumentation is disabled; every call is a no-op"""
+
+    def span(self, stage):
+        return NULL_SPAN
+
+    def add(self, stage, seconds):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class _Span:
+    __slots__ = ('timer', 'stage', 'start')
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class RequestTimer:
+    """Accumulates per-stage time for one request, then records it once"""
+
+    def __init__(self, registry, metric):
+        self.registry = registry
+        self.metric = metric
+        self.totals = {}
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def finish(self):
+        for stage, seconds in self.totals.items():
+            self.registry.observe(self.metric, stage, seconds)
+        self.totals = {}
+
+
+class MetricsRegistry:
+    """Latency histograms and counters rendered in Prometheus text format"""
+
+    def __init__(self, enabled=True, prefix='ml_service'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, metric, help_text):
+        self._help[metric] = help_text
+
+    def timer(self, metric='stage_seconds'):
+        """Per-request stage timer, or the shared no-op timer when disabled"""
+        if not self.enabled:
+            return NULL_TIMER
+        return RequestTimer(self, metric)
+
+    def observe(self, metric, label, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get((metric, label))
+            if histogram is None:
+                histogram = self._histograms[(metric, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self, label_name='stage', counters=None):
+        """
+        Prometheus text exposition of every histogram.
+
+        counters maps a metric name to {label: value} and is rendered as
+        counter samples (used for cache statistics owned by other objects).
+        """
+        lines = []
+        with self._lock:
+            metrics = sorted({metric for metric, _ in self._histograms})
+            for metric in metrics:
+                name = f'{self.prefix}_{metric}'
+                lines.append(f'# HELP {name} {self._help.get(metric, metric)}')
+                lines.append(f'# TYPE {name} histogram')
+                for (m, label), histogram in sorted(self._histograms.items()):
+                    if m != metric:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram.count}')
+
+        for metric, samples in (counters or {}).items():
+            name = f'{self.prefix}_{metric}'
+            lines.append(f'# HELP {name} {self._help.get(metric, metric)}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in samples.items():
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f'{name}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+from nb_inference import EXPORT_FILENAME, model_version
+
+
+# Files that make up one trained model (joblib pickles plus the NumPy export)
+MODEL_FILES = ('naive_bayes_model.pkl', 'vectorizer.pkl', EXPORT_FILENAME)
+VERSIONS_DIRNAME = 'versions'
+CURRENT_FILENAME = 'CURRENT'
+
+
+def versions_dir(model_dir='models'):
+    return os.path.join(model_dir, VERSIONS_DIRNAME)
+
+
+def save_version(trainer, model_dir='models', tag='new'):
+    """
+    Save a trained model as a new immutable version under models/versions/.
+
+    Returns (version, path); the version is the export's content hash, the
+    same value InferenceClassifier.version reports once it is loaded.
+    """
+    tmp_dir = os.path.join(versions_dir(model_dir), f'.tmp-{tag}-{os.getpid()}')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    trainer.save_model(tmp_dir)
+
+    version = model_version(tmp_dir)
+    path = os.path.join(versions_dir(model_dir), version)
+    if os.path.exists(path):
+        # Identical model already saved (e.g. retrained on unchanged data)
+        shutil.rmtree(tmp_dir)
+    else:
+        os.rename(tmp_dir, path)
+    return version, path
+
+
+def publish_version(path, model_dir='models'):
+    """
+    Make a saved version the one loaded at startup.
+
+    Each file is copied next to its target and renamed over it, so a reader
+    never sees a partially written file; CURRENT records the version.
+    """
+    for filename in MODEL_FILES:
+        tmp_path = os.path.join(model_dir, f'.{filename}.tmp-{os.getpid()}')
+        shutil.copyfile(os.path.join(path, filename), tmp_path)
+        os.replace(tmp_path, os.path.join(model_dir, filename))
+
+    tmp_path = os.path.join(model_dir, f'.{CURRENT_FILENAME}.tmp-{os.getpid()}')
+    with open(tmp_path, 'w') as f:
+        f.write(os.path.basename(path) + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILENAME))
+
+
+def list_versions(model_dir='models'):
+    """Saved model versions, oldest first"""
+    root = versions_dir(model_dir)
+    if not os.path.isdir(root):
+        return []
+    names = [name for name in os.listdir(root) if not name.startswith('.')]
+    return sorted(names, key=lambda name: os.path.getmtime(os.path.join(root, name)))
@@ -0,0 +1,297 @@
+import os
+import re
+import hashlib
+
+import numpy as np
+
+
+# Version of the exported .npz model layout
+EXPORT_FORMAT_VERSION = 1
+EXPORT_FILENAME = 'naive_bayes_model.npz'
+
+# Quiz answers that make up one prediction input, in feature order
+QUESTION_FIELDS = ['q1_activity', 'q2_destination', 'q3_pace',
+                   'q4_accommodation', 'q5_souvenir', 'q6_evening', 'q7_motivation']
+
+
+def answers_text(answers):
+    """Combine one answer set into the single text feature the model was trained on"""
+    return " ".join(f"{answers[field]}" for field in QUESTION_FIELDS)
+
+
+def answer_options(df):
+    """Answer vocabulary per question, in first-seen order"""
+    return {field: list(dict.fromkeys(df[field].dropna())) for field in QUESTION_FIELDS}
+
+
+class AnswerLookup:
+    """
+    Precomputed predictions for every combination of known answers.
+
+    Each answer set is encoded as a mixed-radix integer (one digit per
+    question) that indexes straight into the label and confidence arrays.
+    """
+
+    def __init__(self, options, classes, labels, confidences):
+        self.options = options
+        self.codes = {field: {answer: i for i, answer in enumerate(options[field])} for field in QUESTION_FIELDS}
+        radices = [len(options[field]) for field in QUESTION_FIELDS]
+        self.strides = np.cumprod([1] + radices[:0:-1])[::-1]
+        self.classes = classes
+        self.labels = labels
+        self.confidences = confidences
+
+    def key(self, answers):
+        """Mixed-radix key for an answer set, or None if any answer is unknown"""
+        key = 0
+        try:
+            for field, stride in zip(QUESTION_FIELDS, self.strides):
+                key += self.codes[field][answers[field]] * int(stride)
+        except (KeyError, TypeError):
+            return None
+        return key
+
+    def lookup(self, answers):
+        key = self.key(answers)
+        if key is None:
+            return None
+        return self.classes[self.labels[key]], float(self.confidences[key])
+
+
+class QuizClassifier:
+    """
+    Shared prediction logic for the quiz classifiers.
+
+    Subclasses provide classes_, answer_counts(texts) returning a dense token
+    count matrix, and posterior(texts) / posterior_counts(counts) returning
+    class probabilities.
+    """
+
+    lookup = None
+
+    def compile(self, options, chunk_size=16384):
+        """
+        Precompute prediction and confidence for every answer combination.
+
+        Rows are assembled from per-answer count vectors rather than text, so
+        the results are exactly what predict would return for the same answers.
+        """
+        # Token counts contributed by each individual answer
+        answer_counts = {
+            field: self.answer_counts([f"{answer}" for answer in options[field]])
+            for field in QUESTION_FIELDS
+        }
+        radices = [len(options[field]) for field in QUESTION_FIELDS]
+        total = int(np.prod(radices))
+        labels = np.empty(total, dtype=np.int16)
+        confidences = np.empty(total, dtype=np.float64)
+
+        for start in range(0, total, chunk_size):
+            keys = np.arange(start, min(start + chunk_size, total))
+            digits = np.unravel_index(keys, radices)
+            counts = sum(answer_counts[field][digit] for field, digit in zip(QUESTION_FIELDS, digits))
+            probabilities = self.posterior_counts(counts)
+            best = probabilities.argmax(axis=1)
+            labels[keys] = best
+            confidences[keys] = probabilities[np.arange(len(keys)), best]
+
+        self.lookup = AnswerLookup(options, self.classes_, labels, confidences)
+        return total
+
+    def predict(self, answers):
+        """Predict traveler type from answers"""
+        if self.lookup is not None:
+            result = self.lookup.lookup(answers)
+            if result is not None:
+                return result
+
+        # Label and confidence both come from a single posterior pass
+        probabilities = self.posterior([answers_text(answers)])[0]
+        best = int(np.argmax(probabilities))
+
+        return self.classes_[best], float(probabilities[best])
+
+    def predict_batch(self, answer_sets):
+        """
+        Predict traveler types for many answer sets at once.
+
+        Returns one dict per input, in order: {'prediction', 'confidence'} for
+        valid sets and {'error'} for sets that are missing fields.
+        """
+        results = [None] * len(answer_sets)
+        texts, positions = [], []
+        for i, answers in enumerate(answer_sets):
+            if not isinstance(answers, dict):
+                results[i] = {'error': 'Answer set must be an object'}
+                continue
+            missing = [field for field in QUESTION_FIELDS if field not in answers]
+            if missing:
+                results[i] = {'error': f'Missing field: {missing[0]}'}
+                continue
+            if self.lookup is not None:
+                result = self.lookup.lookup(answers)
+                if result is not None:
+                    results[i] = {'prediction': result[0], 'confidence': result[1]}
+                    continue
+            texts.append(answers_text(answers))
+            positions.append(i)
+
+        if texts:
+            # One feature matrix and one posterior pass for the whole batch
+            probabilities = self.posterior(texts)
+            best = probabilities.argmax(axis=1)
+            labels = self.classes_[best]
+            confidences = probabilities[np.arange(len(texts)), best]
+            for i, label, confidence in zip(positions, labels, confidences):
+                results[i] = {'prediction': label, 'confidence': float(confidence)}
+
+        return results
+
+
+class InferenceClassifier(QuizClassifier):
+    """Multinomial Naive Bayes inference from an exported model, using only NumPy"""
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.classes_ = np.empty(0, dtype=str)
+        self.feature_log_prob_t = None
+        self.class_log_prior = None
+        self.token_pattern = None
+        self.lowercase = True
+        self.lookup = None
+        self.version = None
+        self.feature_count = None
+        self.class_count = None
+        self.alpha = None
+
+    def load_model(self, model_dir='models'):
+        """Load the exported vocabulary and Naive Bayes parameters"""
+        self.version = model_version(model_dir)
+        with np.load(f'{model_dir}/{EXPORT_FILENAME}', allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != EXPORT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported model export version {version}")
+            self.vocabulary = {term: i for i, term in enumerate(data['vocabulary'].tolist())}
+            self.classes_ = data['classes']
+            # Stored term-major so each token's per-class weights are one contiguous row
+            self.feature_log_prob_t = np.ascontiguousarray(data['feature_log_prob'].T)
+            self.class_log_prior = data['class_log_prior']
+            self.token_pattern = re.compile(str(data['token_pattern']))
+            self.lowercase = bool(data['lowercase'])
+            # Raw counts for incremental updates (absent from older exports)
+            if 'feature_count' in data.files:
+                self.feature_count = data['feature_count']
+                self.class_count = data['class_count']
+                self.alpha = float(data['alpha'])
+
+    @classmethod
+    def from_counts(cls, template, feature_count, class_count, alpha, version):
+        """
+        Classifier with the template's vocabulary and tokenization and
+        parameters computed from Naive Bayes counts, the way MultinomialNB does.
+        """
+        model = cls()
+        model.vocabulary = template.vocabulary
+        model.classes_ = template.classes_
+        model.token_pattern = template.token_pattern
+        model.lowercase = template.lowercase
+        model.feature_count = feature_count
+        model.class_count = class_count
+        model.alpha = alpha
+        smoothed = feature_count + alpha
+        model.feature_log_prob_t = np.ascontiguousarray(
+            (np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))).T
+        )
+        model.class_log_prior = np.log(class_count) - np.log(class_count.sum())
+        model.version = version
+        return model
+
+    def answer_counts(self, texts):
+        """Dense token count matrix, tokenized the way CountVectorizer does by default"""
+        counts = np.zeros((len(texts), len(self.vocabulary)), dtype=np.int64)
+        for row, text in enumerate(texts):
+            if self.lowercase:
+                text = text.lower()
+            for token in self.token_pattern.findall(text):
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    counts[row, column] += 1
+        return counts
+
+    def posterior_counts(self, counts):
+        """Class probabilities for a dense count matrix"""
+        # Accumulate term by term in vocabulary order, the same sequence of
+        # float operations as scikit-learn's sparse dot product
+        jll = np.zeros((len(counts), len(self.classes_)))
+        for column in np.nonzero(counts.any(axis=0))[0]:
+            jll += counts[:, column:column + 1] * self.feature_log_prob_t[column]
+        jll += self.class_log_prior
+
+        # Normalize with log-sum-exp, keeping the largest terms out of the sum for precision
+        shift = jll.max(axis=1, keepdims=True)
+        is_max = jll == shift
+        ties = is_max.sum(axis=1, keepdims=True).astype(jll.dtype)
+        rest = np.exp(np.where(is_max, -np.inf, jll) - shift).sum(axis=1, keepdims=True) / ties
+        log_norm = np.log1p(rest) + np.log(ties) + shift
+        return np.exp(jll - log_norm)
+
+    def posterior(self, texts):
+        return self.posterior_counts(self.answer_counts(texts))
+
+
+def model_version(model_dir='models'):
+    """Short content hash of the exported model"""
+    with open(f'{model_dir}/{EXPORT_FILENAME}', 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def check_exportable(vectorizer):
+    """Raise ValueError unless the vectorizer tokenizes the way InferenceClassifier does"""
+    if vectorizer.analyzer != 'word' or tuple(vectorizer.ngram_range) != (1, 1) \
+            or vectorizer.stop_words is not None or vectorizer.preprocessor is not None \
+            or vectorizer.tokenizer is not None or vectorizer.strip_accents is not None \
+            or vectorizer.binary:
+        raise ValueError("Only default word-unigram vectorizer settings can be exported")
+
+
+def export_model(vectorizer, classifier, model_dir='models'):
+    """Write a fitted CountVectorizer + MultinomialNB pair to the NumPy export format"""
+    check_exportable(vectorizer)
+
+    vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    os.makedirs(model_dir, exist_ok=True)
+    np.savez(
+        f'{model_dir}/{EXPORT_FILENAME}',
+        format_version=np.array(EXPORT_FORMAT_VERSION),
+        vocabulary=np.array(vocabulary, dtype=str),
+        classes=np.array(classifier.classes_, dtype=str),
+        feature_log_prob=classifier.feature_log_prob_,
+        class_log_prior=classifier.class_log_prior_,
+        token_pattern=np.array(vectorizer.token_pattern),
+        lowercase=np.array(vectorizer.lowercase),
+        feature_count=classifier.feature_count_,
+        class_count=classifier.class_count_,
+        alpha=np.array(float(classifier.alpha))
+    )
+
+
+def save_counts_export(model, path):
+    """
+    Write a counts-based classifier (see InferenceClassifier.from_counts) in
+    the export format, replacing any existing file atomically.
+    """
+    tmp_path = f'{path}.tmp-{os.getpid()}.npz'
+    np.savez(
+        tmp_path,
+        format_version=np.array(EXPORT_FORMAT_VERSION),
+        vocabulary=np.array(sorted(model.vocabulary, key=model.vocabulary.get), dtype=str),
+        classes=np.array(model.classes_, dtype=str),
+        feature_log_prob=model.feature_log_prob_t.T,
+        class_log_prior=model.class_log_prior,
+        token_pattern=np.array(model.token_pattern.pattern),
+        lowercase=np.array(model.lowercase),
+        feature_count=model.feature_count,
+        class_count=model.class_count,
+        alpha=np.array(model.alpha)
+    )
+    os.replace(tmp_path, path)
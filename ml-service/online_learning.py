@@ -0,0 +1,85 @@
+import os
+import threading
+
+import numpy as np
+
+from nb_inference import EXPORT_FILENAME, QUESTION_FIELDS, InferenceClassifier, answers_text, save_counts_export
+
+
+def counts_from_data(model, df):
+    """Naive Bayes (feature_count, class_count) of a labelled answers DataFrame under a model's vocabulary"""
+    texts = [answers_text(answers) for answers in df[QUESTION_FIELDS].to_dict('records')]
+    one_hot = (df['label'].to_numpy()[:, None] == model.classes_[None, :]).astype(np.float64)
+    return one_hot.T @ model.answer_counts(texts), one_hot.sum(axis=0)
+
+
+class OnlineNaiveBayes:
+    """
+    Multinomial Naive Bayes counts that grow with every ingested batch.
+
+    The feature space is fixed to the base model's vocabulary (tokens
+    outside it are ignored) and the classes to its labels, so an update is
+    two count additions. Each update produces a new immutable classifier
+    for serving; the counts themselves are never read by requests.
+    """
+
+    def __init__(self, base, feature_count, class_count, alpha=1.0):
+        self.base = base
+        self.base_version = base.version
+        self.feature_count = np.array(feature_count, dtype=np.float64)
+        self.class_count = np.array(class_count, dtype=np.float64)
+        self.alpha = alpha
+        self.class_index = {label: i for i, label in enumerate(base.classes_.tolist())}
+        self.samples_seen = 0
+        # samples_seen when the counts were last written to disk
+        self.snapshot_samples = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model, training_df=None):
+        """Start from a loaded model's counts, rebuilt from its training data for exports without them"""
+        if model.feature_count is not None:
+            return cls(model, model.feature_count, model.class_count, model.alpha)
+        if training_df is None:
+            raise ValueError('Model export has no counts and no training data was given')
+        feature_count, class_count = counts_from_data(model, training_df)
+        return cls(model, feature_count, class_count)
+
+    def partial_fit(self, texts, labels):
+        """
+        Add a batch of answer texts with known labels and return the updated classifier.
+
+        Labels must be among the base model's classes.
+        """
+        counts = self.base.answer_counts(texts)
+        classes = np.array([self.class_index[label] for label in labels], dtype=np.intp)
+        with self._lock:
+            np.add.at(self.feature_count, classes, counts)
+            np.add.at(self.class_count, classes, 1)
+            self.samples_seen += len(labels)
+            return self._model()
+
+    def _model(self):
+        return InferenceClassifier.from_counts(
+            self.base, self.feature_count.copy(), self.class_count.copy(), self.alpha,
+            f'{self.base_version}+{self.samples_seen}'
+        )
+
+    def model(self):
+        with self._lock:
+            return self._model()
+
+    @property
+    def dirty(self):
+        """Whether samples were added since the last snapshot"""
+        return self.samples_seen != self.snapshot_samples
+
+    def save_snapshot(self, snapshot_dir):
+        """Write the current counts as a model export; returns the snapshotted classifier"""
+        with self._lock:
+            model = self._model()
+            samples = self.samples_seen
+        os.makedirs(snapshot_dir, exist_ok=True)
+        save_counts_export(model, f'{snapshot_dir}/{EXPORT_FILENAME}')
+        self.snapshot_samples = samples
+        return model
@@ -0,0 +1,140 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+MINUTES_PER_DAY = 24 * 60
+# Sightseeing window for every planned day
+DAY_START_MINUTES = 9 * 60
+DAY_END_MINUTES = 20 * 60
+# Average door-to-door speed between stops, and the fallback when a stop has no coordinates
+TRAVEL_SPEED_KMH = 30
+UNKNOWN_TRAVEL_MINUTES = 30
+
+INTERVAL_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+ALWAYS_OPEN = [(0, MINUTES_PER_DAY)]
+
+
+def parse_timing(text):
+    """
+    Opening intervals of a timing string in minutes since midnight.
+
+    Handles '06:00-18:00', split days like '06:00-12:00, 16:00-20:00',
+    'Open 24 hours' and intervals past midnight. Returns None for strings
+    without times (e.g. 'Seasonal').
+    """
+    if text is None or pd.isna(text):
+        return None
+    text = str(text)
+    if '24 hours' in text.lower():
+        return ALWAYS_OPEN
+    intervals = []
+    for open_h, open_m, close_h, close_m in INTERVAL_PATTERN.findall(text):
+        opens = int(open_h) * 60 + int(open_m)
+        closes = int(close_h) * 60 + int(close_m)
+        if closes <= opens:
+            closes += MINUTES_PER_DAY
+        intervals.append((opens, closes))
+    return intervals or None
+
+
+def format_minutes(minutes):
+    minutes = int(minutes)
+    return f'{(minutes // 60) % 24:02d}:{minutes % 60:02d}'
+
+
+def travel_minutes(dist_km, speed_kmh=TRAVEL_SPEED_KMH):
+    """Whole minutes to cover each distance (missing coordinates get a flat estimate)"""
+    dist_km = np.asarray(dist_km, dtype=np.float64)
+    minutes = np.ceil(np.where(np.isfinite(dist_km), dist_km, 0) / speed_kmh * 60)
+    return np.where(np.isfinite(dist_km), minutes, UNKNOWN_TRAVEL_MINUTES).astype(np.int64)
+
+
+class OpeningHours:
+    """
+    Opening intervals for every place, parsed once per distinct timing string.
+
+    Places whose timing has no parseable hours are treated as open all day.
+    """
+
+    def __init__(self, timings):
+        codes, uniques = pd.factorize(pd.Series(timings))
+        parsed = [parse_timing(t) for t in uniques]
+        width = max([len(p) for p in parsed if p] + [1])
+
+        # One extra row at the end for missing timings (code -1)
+        self.opens = np.full((len(uniques) + 1, width), -1, dtype=np.int32)
+        self.closes = np.full((len(uniques) + 1, width), -1, dtype=np.int32)
+        for i, intervals in enumerate(parsed + [None]):
+            for j, (opens, closes) in enumerate(intervals or ALWAYS_OPEN):
+                self.opens[i, j] = opens
+                self.closes[i, j] = closes
+        self.codes = np.where(codes < 0, len(uniques), codes)
+        self.unparsed = [t for t, p in zip(uniques, parsed) if p is None]
+
+    def earliest_start(self, rows, arrival, duration, day_end=DAY_END_MINUTES):
+        """
+        Earliest start at or after arrival so the whole visit fits in one
+        opening interval and ends by day_end, per row (-1 where it can't).
+        """
+        table = self.codes[rows]
+        opens, closes = self.opens[table], self.closes[table]
+        arrival = np.broadcast_to(np.asarray(arrival, dtype=np.int64), table.shape)[:, None]
+        duration = np.broadcast_to(np.asarray(duration, dtype=np.int64), table.shape)[:, None]
+        starts = np.maximum(opens, arrival)
+        ends = starts + duration
+        fits = (opens >= 0) & (ends <= closes) & (ends <= day_end)
+        start = np.where(fits, starts, np.iinfo(np.int64).max).min(axis=1)
+        return np.where(fits.any(axis=1), start, -1)
+
+    def visitable(self, rows, duration, day_start=DAY_START_MINUTES, day_end=DAY_END_MINUTES):
+        """Whether each place can be visited for its whole duration within the day"""
+        return self.earliest_start(rows, day_start, duration, day_end) >= 0
+
+
+def schedule_visits(hours, rows, duration, travel, day_start=DAY_START_MINUTES, day_end=DAY_END_MINUTES):
+    """
+    Visiting times for one day's stops, given in route order.
+
+    travel[i, j] is the minutes from stop i to stop j. The route order is
+    kept when every stop fits its opening hours; otherwise stops are taken
+    earliest-finish-first. Returns (order, starts, ends) for the stops that
+    fit; stops left out of order could not be scheduled.
+    """
+    rows = np.asarray(rows)
+    duration = np.asarray(duration, dtype=np.int64)
+    n = len(rows)
+
+    order, starts, ends = [], [], []
+    clock, previous = day_start, None
+    for i in range(n):
+        arrival = clock if previous is None else clock + travel[previous, i]
+        start = int(hours.earliest_start(rows[i:i + 1], arrival, duration[i:i + 1], day_end)[0])
+        if start < 0:
+            break
+        order.append(i)
+        starts.append(start)
+        ends.append(start + int(duration[i]))
+        clock, previous = ends[-1], i
+    if len(order) == n:
+        return order, starts, ends
+
+    # Route order breaks an opening window: pick whichever remaining stop can finish first
+    order, starts, ends = [], [], []
+    remaining = np.arange(n)
+    clock, previous = day_start, None
+    while len(remaining):
+        arrival = clock if previous is None else clock + travel[previous, remaining]
+        start = hours.earliest_start(rows[remaining], arrival, duration[remaining], day_end)
+        finish = np.where(start >= 0, start + duration[remaining], np.iinfo(np.int64).max)
+        if not (start >= 0).any():
+            break
+        best = int(np.argmin(finish))
+        stop = int(remaining[best])
+        order.append(stop)
+        starts.append(int(start[best]))
+        ends.append(int(finish[best]))
+        clock, previous = ends[-1], stop
+        remaining = np.delete(remaining, best)
+    return order, starts, ends
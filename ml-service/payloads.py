@@ -0,0 +1,74 @@
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional: MessagePack responses are only offered when it is installed
+    msgpack = None
+
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+COMPACT_JSON_MIMETYPE = 'application/vnd.foai.compact+json'
+RESPONSE_FORMATS = ('json', 'compact', 'msgpack')
+
+# Short keys for itinerary places in compact responses
+COMPACT_PLACE_KEYS = {
+    'name': 'n',
+    'duration': 'd',
+    'category': 'c',
+    'cost_category': 'cc',
+    'rating': 'r',
+    'type': 't',
+    'latitude': 'la',
+    'longitude': 'lo',
+    'timing': 'tm',
+    'start': 's',
+    'end': 'e',
+    'explanation': 'x'
+}
+# Constant blocks left out of compact responses
+COMPACT_DROPPED = ('aiFeatures', 'algorithm')
+
+
+def response_format(query_format, accept):
+    """
+    'msgpack', 'compact' or 'json' for a request's ?format= value and Accept header.
+
+    MessagePack falls back to compact JSON when msgpack isn't installed.
+    """
+    wanted = query_format
+    if wanted is None:
+        if any(mimetype in accept for mimetype in MSGPACK_MIMETYPES):
+            wanted = 'msgpack'
+        elif COMPACT_JSON_MIMETYPE in accept:
+            wanted = 'compact'
+        else:
+            wanted = 'json'
+    if wanted == 'msgpack' and msgpack is None:
+        return 'compact'
+    return wanted
+
+
+def compact_place(place):
+    """
+    One place with short keys. Its weather repeats the day's forecast and is
+    dropped, as is the constant algorithm name of its explanation.
+    """
+    compact = {COMPACT_PLACE_KEYS.get(key, key): value for key, value in place.items() if key != 'weather'}
+    if 'explanation' in place:
+        compact['x'] = {key: value for key, value in place['explanation'].items() if key not in COMPACT_DROPPED}
+    return compact
+
+
+def compact_trip(response):
+    """Trip response with short place keys and without its constant blocks"""
+    compact = {key: value for key, value in response.items() if key not in COMPACT_DROPPED}
+    compact['itinerary'] = {day: [compact_place(place) for place in places] for day, places in response['itinerary'].items()}
+    compact['placeKeys'] = COMPACT_PLACE_KEYS
+    return compact
+
+
+def encode(payload, fmt):
+    """(body, mimetype) of a payload as 'msgpack' or 'compact' JSON (UTF-8, no whitespace)"""
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPES[0]
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')), COMPACT_JSON_MIMETYPE
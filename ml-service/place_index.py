@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+
+from metrics import NULL_TIMER
+from opening_hours import OpeningHours
+
+
+INDOOR_CODES = ('indoor', 'outdoor', 'both')
+
+
+def _text_array(values):
+    """Values as a NumPy unicode array when they are all strings, else None"""
+    if all(isinstance(value, str) for value in values):
+        return np.asarray(values, dtype=str)
+    return None
+
+
+def _column_reader(values):
+    """
+    Function returning one row's value without materializing the column as objects.
+
+    Text columns read from a NumPy unicode array, so each read builds a new
+    str rather than touching the refcount of a shared object; pages a
+    forked worker inherits stay shared.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        categories = values.cat.categories.to_numpy()
+    elif values.dtype == object:
+        codes, categories = pd.factorize(values.to_numpy())
+    else:
+        return values.to_numpy().__getitem__
+    text = _text_array(categories)
+    if text is not None:
+        return lambda row: str(text[codes[row]]) if codes[row] >= 0 else np.nan
+    return lambda row: categories[codes[row]] if codes[row] >= 0 else np.nan
+
+
+class CandidateIndex:
+    """Load-time index over the merged places DataFrame for fast candidate lookups"""
+
+    def __init__(self, places, traveler_types, budget_map):
+        self.places = places.reset_index(drop=True)
+        self.budget_map = budget_map
+        n = len(self.places)
+
+        # Parse every category string once into a traveler-type bitmask column.
+        # A bit is set when the traveler type is a substring of the category,
+        # the same test plan_trip_csp has always applied per request.
+        self.type_bits = {t: 1 << i for i, t in enumerate(traveler_types)}
+        self.type_mask = np.zeros(n, dtype=np.uint32)
+        if 'category' in self.places.columns:
+            categories = self.places['category']
+            for traveler_type, bit in self.type_bits.items():
+                matches = categories.str.contains(traveler_type, regex=False, na=False).to_numpy(dtype=bool)
+                self.type_mask[matches] |= np.uint32(bit)
+
+        # Encode cost categories as one bit each so a budget is a single mask
+        cost_names = sorted({c for costs in budget_map.values() for c in costs})
+        self.cost_bits = {c: 1 << i for i, c in enumerate(cost_names)}
+        self.cost_mask = np.zeros(n, dtype=np.uint8)
+        if 'cost_category' in self.places.columns:
+            costs = self.places['cost_category']
+            for cost, bit in self.cost_bits.items():
+                self.cost_mask[(costs == cost).to_numpy(dtype=bool)] |= np.uint8(bit)
+
+        # Partial matches: any word of the traveler type appears in the category
+        # (the "≈ Partial match" test generate_explanation applies)
+        self.partial_mask = np.zeros(n, dtype=np.uint32)
+        if 'category' in self.places.columns:
+            for traveler_type, bit in self.type_bits.items():
+                matches = np.zeros(n, dtype=bool)
+                for keyword in traveler_type.split():
+                    matches |= categories.str.contains(keyword, regex=False, na=False).to_numpy(dtype=bool)
+                self.partial_mask[matches] |= np.uint32(bit)
+            self.food_mask = categories.str.contains('Foodie', regex=False, na=False).to_numpy(dtype=bool)
+        else:
+            self.food_mask = np.zeros(n, dtype=bool)
+
+        # Cost level 0..n in the order of the widest budget (-1 when unknown)
+        self.cost_levels = list(max(budget_map.values(), key=len)) if budget_map else []
+        self.cost_level = np.full(n, -1, dtype=np.int8)
+        if 'cost_category' in self.places.columns:
+            for level, cost in enumerate(self.cost_levels):
+                self.cost_level[(self.places['cost_category'] == cost).to_numpy(dtype=bool)] = level
+
+        # Indoor/outdoor as a small code (see INDOOR_CODES, -1 when unknown)
+        self.indoor_code = np.full(n, -1, dtype=np.int8)
+        if 'indoor_outdoor' in self.places.columns:
+            for code, value in enumerate(INDOOR_CODES):
+                self.indoor_code[(self.places['indoor_outdoor'] == value).to_numpy(dtype=bool)] = code
+
+        # Opening intervals in minutes, parsed once per distinct timing string
+        self.opening_hours = OpeningHours(self.places['timing'] if 'timing' in self.places.columns else [None] * n)
+
+        self.rating = self._numeric('popularity_rating', 0)
+        self.duration = self._numeric('duration_hours', 2)
+        if 'place_name' in self.places.columns:
+            self.name_codes, names = pd.factorize(self.places['place_name'])
+            self.names = np.asarray(names, dtype=str)
+        else:
+            self.name_codes, self.names = np.arange(n), np.empty(0, dtype=str)
+        self._name_order = None
+        self._readers = {column: _column_reader(self.places[column]) for column in self.places.columns}
+
+        # Row positions per district, kept in original dataset order
+        self.district_rows = {}
+        if 'destination_city' in self.places.columns and n > 0:
+            for district, rows in self.places.groupby('destination_city', sort=False, observed=True).indices.items():
+                self.district_rows[district] = np.sort(rows)
+
+        # (district, traveler type, cost category) -> row positions
+        self.buckets = {}
+        for district, rows in self.district_rows.items():
+            for traveler_type, bit in self.type_bits.items():
+                type_rows = rows[(self.type_mask[rows] & bit) != 0]
+                for cost, cost_bit in self.cost_bits.items():
+                    self.buckets[(district, traveler_type, cost)] = type_rows[(self.cost_mask[type_rows] & cost_bit) != 0]
+
+        self._pools = {}
+        self._unique_rows = {}
+
+    def _numeric(self, column, default):
+        if column not in self.places.columns:
+            return np.full(len(self.places), default, dtype=np.float32)
+        values = pd.to_numeric(self.places[column], errors='coerce').to_numpy(dtype=np.float32)
+        return np.where(np.isnan(values), np.float32(default), values)
+
+    def record(self, row):
+        """Column values of one place as a dict (what planners read from a DataFrame row)"""
+        return {column: read(row) for column, read in self._readers.items()}
+
+    def name_code(self, names):
+        """Code of each place name (an index into self.names), -1 for unknown names"""
+        if self._name_order is None:
+            self._name_order = np.argsort(self.names, kind='stable')
+        known = np.array([isinstance(name, str) for name in names], dtype=bool)
+        names = np.asarray([name if ok else '' for name, ok in zip(names, known)], dtype=str)
+        if len(self.names) == 0:
+            return np.full(len(names), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.names[self._name_order], names), len(self.names) - 1)
+        codes = self._name_order[found]
+        return np.where(known & (self.names[codes] == names), codes, -1)
+
+    def rows_named(self, name):
+        """Row positions of every place with this exact name"""
+        code = int(self.name_code([name])[0])
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.name_codes == code)
+
+    def name_positions(self, rows, names):
+        """Position in rows of each place name, -1 for names not among them (rows must have distinct names)"""
+        codes = self.name_code(names)
+        if len(rows) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+        order = np.argsort(self.name_codes[rows], kind='stable')
+        sorted_codes = self.name_codes[rows][order]
+        found = np.minimum(np.searchsorted(sorted_codes, codes), len(rows) - 1)
+        return np.where((sorted_codes[found] == codes) & (codes >= 0), order[found], -1)
+
+    def unique_rows(self, district):
+        """District rows with each place name kept once, at its first occurrence"""
+        rows = self._unique_rows.get(district)
+        if rows is None:
+            rows = self.district_rows.get(district, np.empty(0, dtype=np.int64))
+            _, first = np.unique(self.name_codes[rows], return_index=True)
+            rows = rows[np.sort(first)]
+            if district in self.district_rows:
+                self._unique_rows[district] = rows
+        return rows
+
+    def type_match(self, rows, traveler_type):
+        """Type-match strength per row: 1 exact, 0.5 partial keyword match, 0 otherwise"""
+        bit = self.type_bits.get(traveler_type)
+        if bit is not None:
+            exact = (self.type_mask[rows] & bit) != 0
+            partial = (self.partial_mask[rows] & bit) != 0
+        elif 'category' in self.places.columns:
+            # Traveler types outside the index are matched by scanning these rows only
+            categories = [str(x) if pd.notna(x) else '' for x in self.places['category'].to_numpy()[rows]]
+            keywords = traveler_type.split()
+            exact = np.fromiter((traveler_type in c for c in categories), dtype=bool, count=len(rows))
+            partial = np.fromiter((any(k in c for k in keywords) for c in categories), dtype=bool, count=len(rows))
+        else:
+            return np.zeros(len(rows), dtype=np.float32)
+        return np.where(exact, np.float32(1.0), np.where(partial, np.float32(0.5), np.float32(0.0)))
+
+    def budget_bits(self, budget):
+        """Combined cost bitmask for a budget level, or None for unknown budgets"""
+        if budget not in self.budget_map:
+            return None
+        bits = 0
+        for cost in self.budget_map[budget]:
+            bits |= self.cost_bits[cost]
+        return bits
+
+    def type_rows(self, district, traveler_type):
+        """Row positions in a district whose category contains the traveler type"""
+        rows = self.district_rows.get(district, np.empty(0, dtype=np.int64))
+        if 'category' not in self.places.columns:
+            return rows[:0]
+        bit = self.type_bits.get(traveler_type)
+        if bit is not None:
+            return rows[(self.type_mask[rows] & bit) != 0]
+        # Traveler types outside the index fall back to a scan of this district only
+        categories = self.places['category'].to_numpy()[rows]
+        matches = np.fromiter(
+            (traveler_type in str(x) if pd.notna(x) else False for x in categories),
+            dtype=bool, count=len(rows)
+        )
+        return rows[matches]
+
+    def candidate_pool(self, district, traveler_type, budget, days, timer=NULL_TIMER):
+        """
+        Build the rating-sorted, de-duplicated candidate pool for a trip.
+
+        Returns (pool, stage_counts). The pool is shared between requests and
+        must not be modified in place.
+        """
+        with timer.span('district_filter'):
+            rows = self.district_rows.get(district, np.empty(0, dtype=np.int64))
+            counts = {'district': len(rows)}
+
+        with timer.span('type_filter'):
+            type_rows = self.type_rows(district, traveler_type)
+            counts['type_matched'] = len(type_rows)
+            type_applied = len(type_rows) > 0
+            if type_applied:
+                rows = type_rows
+
+        budget_applied = False
+        with timer.span('budget_filter'):
+            if budget in self.budget_map and 'cost_category' in self.places.columns:
+                if type_applied and traveler_type in self.type_bits:
+                    parts = [self.buckets[(district, traveler_type, cost)] for cost in self.budget_map[budget]]
+                    budget_rows = np.sort(np.concatenate(parts))
+                else:
+                    budget_rows = rows[(self.cost_mask[rows] & self.budget_bits(budget)) != 0]
+                counts['budget_matched'] = len(budget_rows)
+                if len(budget_rows) >= days * 2:
+                    rows = budget_rows
+                    budget_applied = True
+
+        # Only indexed traveler types are memoized so arbitrary request values can't grow the cache
+        with timer.span('pool_sort'):
+            key = (district, traveler_type, budget if budget_applied else None)
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self.places.iloc[rows]
+                if 'popularity_rating' in pool.columns:
+                    pool = pool.sort_values('popularity_rating', ascending=False)
+                pool = pool.drop_duplicates(subset=['place_name'])
+                # Keep each candidate's row in the full dataset for the array-backed engines
+                pool = pool.assign(place_row=pool.index.to_numpy()).reset_index(drop=True)
+                if traveler_type in self.type_bits:
+                    self._pools[key] = pool
+        return pool, counts
@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+
+# Version of the snapshot directory layout
+SNAPSHOT_FORMAT_VERSION = 1
+SOURCE_FILES = ['places_dataset.csv', 'place_metadata.csv', 'place_coordinates.csv']
+# Columns a merged places frame must have to be served
+REQUIRED_COLUMNS = ['place_name', 'destination_city', 'latitude', 'longitude']
+DELTA_OPS = ('upsert', 'delete')
+
+
+def merge_place_csvs(data_dir='data'):
+    """Read the three place CSVs and join them on place_name"""
+    places_dataset = pd.read_csv(f'{data_dir}/places_dataset.csv')
+    place_metadata = pd.read_csv(f'{data_dir}/place_metadata.csv')
+    place_coordinates = pd.read_csv(f'{data_dir}/place_coordinates.csv')
+
+    # Keep category from places_dataset, add indoor_outdoor and popularity_rating from metadata
+    metadata_cols = place_metadata[['place_name', 'indoor_outdoor', 'popularity_rating']].copy()
+
+    # Merge datasets
+    places = places_dataset.merge(metadata_cols, on='place_name', how='left')
+    places = places.merge(place_coordinates[['place_name', 'latitude', 'longitude']], on='place_name', how='left')
+    return places
+
+
+def source_signature(data_dir='data'):
+    """Size and modification time of each source CSV, used to detect stale snapshots"""
+    signature = {}
+    for name in SOURCE_FILES:
+        stat = os.stat(f'{data_dir}/{name}')
+        signature[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    return signature
+
+
+def places_version(data_dir='data', deltas=None):
+    """Short hash identifying the current version of the place CSVs and the deltas applied on top"""
+    signature = source_signature(data_dir)
+    if deltas:
+        signature = {'sources': signature, 'deltas': deltas}
+    payload = json.dumps(signature, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def delta_files(delta_dir):
+    """Delta CSVs in a directory, in the order they apply (by file name), with their size and mtime"""
+    if not os.path.isdir(delta_dir):
+        return []
+    deltas = []
+    for name in sorted(os.listdir(delta_dir)):
+        if name.endswith('.csv'):
+            stat = os.stat(f'{delta_dir}/{name}')
+            deltas.append({'name': name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return deltas
+
+
+def read_delta(path):
+    """
+    One delta file: an 'op' column (upsert or delete), place_name, and any
+    place columns to set. Raises ValueError when it is malformed.
+    """
+    delta = pd.read_csv(path)
+    missing = [column for column in ('op', 'place_name') if column not in delta.columns]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)}: missing columns {missing}")
+    unknown = sorted(set(delta['op'].dropna()) - set(DELTA_OPS)) + (['(empty)'] if delta['op'].isna().any() else [])
+    if unknown:
+        raise ValueError(f"{os.path.basename(path)}: unknown ops {unknown}, expected one of {list(DELTA_OPS)}")
+    if delta['place_name'].isna().any():
+        raise ValueError(f"{os.path.basename(path)}: every row needs a place_name")
+    return delta
+
+
+def _cell(value, dtype):
+    # Float columns stay float: anything that isn't a number becomes NaN, which validation rejects
+    if pd.api.types.is_float_dtype(dtype):
+        return float(pd.to_numeric(value, errors='coerce'))
+    # Whole numbers stay integers in integer columns
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def apply_delta(places, delta):
+    """
+    Places with one delta applied, as a new frame.
+
+    Rows match on place_name, narrowed to destination_city when the delta
+    row gives one. 'delete' drops every matching row; 'upsert' sets the
+    delta's non-empty values on them, or adds a new place, which must then
+    give a value for every column. Text columns that were categorical are
+    encoded again afterwards.
+    """
+    categorical = [c for c in places.columns if isinstance(places[c].dtype, pd.CategoricalDtype)]
+    work = places.astype({column: object for column in categorical}).reset_index(drop=True)
+    unknown = sorted(set(delta.columns) - set(work.columns) - {'op'})
+    if unknown:
+        raise ValueError(f"Delta sets unknown columns {unknown}")
+
+    by_name = {name: list(rows) for name, rows in work.groupby('place_name', sort=False).indices.items()}
+    columns = [c for c in delta.columns if c != 'op']
+    keep = np.ones(len(work), dtype=bool)
+    added = []
+
+    for change in delta.to_dict('records'):
+        values = {c: change[c] for c in columns if not pd.isna(change[c])}
+        city = values.get('destination_city')
+        rows = [r for r in by_name.get(change['place_name'], [])
+                if city is None or work.at[r, 'destination_city'] == city]
+        new_rows = [i for i, row in enumerate(added) if row['place_name'] == change['place_name']
+                    and (city is None or row['destination_city'] == city)]
+        if change['op'] == 'delete':
+            keep[rows] = False
+            for i in reversed(new_rows):
+                del added[i]
+            continue
+
+        live = [r for r in rows if keep[r]]
+        if live or new_rows:
+            for column, value in values.items():
+                for r in live:
+                    work.at[r, column] = _cell(value, work[column].dtype)
+                for i in new_rows:
+                    added[i][column] = value
+        else:
+            missing = [c for c in work.columns if c not in values]
+            if missing:
+                raise ValueError(f"New place '{change['place_name']}' is missing {missing}")
+            added.append(values)
+
+    result = work[keep]
+    if added:
+        result = pd.concat([result, pd.DataFrame(added, columns=work.columns)], ignore_index=True)
+    result = result.reset_index(drop=True)
+    return result.astype({column: 'category' for column in categorical})
+
+
+def apply_delta_files(places, delta_dir, deltas):
+    """Apply delta files (as listed by delta_files) to places in order"""
+    for delta in deltas:
+        change = read_delta(f"{delta_dir}/{delta['name']}")
+        try:
+            places = apply_delta(places, change)
+        except ValueError as e:
+            raise ValueError(f"{delta['name']}: {e}") from e
+    return places
+
+
+def validate_places(places):
+    """Raise ValueError unless a merged places frame is fit to serve"""
+    problems = []
+    if len(places) == 0:
+        problems.append('no places')
+    missing = [c for c in REQUIRED_COLUMNS if c not in places.columns]
+    if missing:
+        problems.append(f'missing columns {missing}')
+    else:
+        if places['place_name'].isna().any():
+            problems.append(f"{int(places['place_name'].isna().sum())} places without a name")
+        latitudes = pd.to_numeric(places['latitude'], errors='coerce')
+        longitudes = pd.to_numeric(places['longitude'], errors='coerce')
+        unknown = ~(np.isfinite(latitudes) & np.isfinite(longitudes))
+        if unknown.any():
+            problems.append(f'{int(unknown.sum())} places without numeric coordinates')
+        bad = (latitudes.abs() > 90) | (longitudes.abs() > 180)
+        if bad.any():
+            problems.append(f'{int(bad.sum())} places with out-of-range coordinates')
+    if 'popularity_rating' in places.columns:
+        ratings = pd.to_numeric(places['popularity_rating'], errors='coerce')
+        if (ratings < 0).any():
+            problems.append('negative popularity_rating')
+    if 'duration_hours' in places.columns:
+        if (pd.to_numeric(places['duration_hours'], errors='coerce') <= 0).any():
+            problems.append('non-positive duration_hours')
+    if problems:
+        raise ValueError('Invalid places data: ' + '; '.join(problems))
+
+
+def _codes_dtype(n_categories):
+    # Same integer width pandas picks for Categorical codes, so loading never copies
+    if n_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if n_categories < np.iinfo(np.int16).max:
+        return np.int16
+    if n_categories < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+def build_snapshot(places, snapshot_dir, sources=None):
+    """
+    Write a pre-joined columnar snapshot of the places DataFrame.
+
+    Numeric columns are stored as plain .npy arrays. String columns are
+    dictionary-encoded into integer codes plus a small array of categories.
+    The directory is written next to the target and renamed into place, so
+    readers never see a half-written snapshot.
+    """
+    tmp_dir = f'{snapshot_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for column in places.columns:
+        values = places[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            np.save(f'{tmp_dir}/{column}.npy', values.to_numpy())
+            columns.append({'name': column, 'kind': 'numeric'})
+        else:
+            codes, categories = pd.factorize(values, sort=True)
+            np.save(f'{tmp_dir}/{column}.codes.npy', codes.astype(_codes_dtype(len(categories))))
+            np.save(f'{tmp_dir}/{column}.categories.npy', np.asarray(categories, dtype=str))
+            columns.append({'name': column, 'kind': 'categorical'})
+
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'rows': len(places),
+        'columns': columns,
+        'sources': sources or {},
+        'built_at': time.time()
+    }
+    with open(f'{tmp_dir}/manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished directory in
+    old_dir = f'{snapshot_dir}.old-{os.getpid()}'
+    if os.path.exists(snapshot_dir):
+        os.rename(snapshot_dir, old_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(snapshot_dir):
+    with open(f'{snapshot_dir}/manifest.json') as f:
+        return json.load(f)
+
+
+def load_snapshot(snapshot_dir, mmap=True):
+    """
+    Load a snapshot as a DataFrame backed by the .npy files.
+
+    With mmap=True arrays are memory-mapped read-only, so the data is shared
+    through the page cache by every process that loads it. The frame must be
+    treated as read-only.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest['format_version'] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported place snapshot version {manifest['format_version']}")
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in manifest['columns']:
+        name = column['name']
+        if column['kind'] == 'numeric':
+            data[name] = np.load(f'{snapshot_dir}/{name}.npy', mmap_mode=mmap_mode)
+        else:
+            codes = np.load(f'{snapshot_dir}/{name}.codes.npy', mmap_mode=mmap_mode)
+            categories = pd.Index(np.load(f'{snapshot_dir}/{name}.categories.npy').astype(object))
+            data[name] = pd.Categorical.from_codes(codes, categories=categories)
+    return pd.DataFrame(data, copy=False)
+
+
+def is_snapshot_current(snapshot_dir, data_dir='data'):
+    """True when the snapshot exists and was built from the current CSVs"""
+    try:
+        manifest = read_manifest(snapshot_dir)
+        return manifest['format_version'] == SNAPSHOT_FORMAT_VERSION \
+            and manifest['sources'] == source_signature(data_dir)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def load_places(data_dir='data', snapshot_dir=None, use_snapshot=True):
+    """
+    Load the merged places data, preferring the columnar snapshot.
+
+    A missing or stale snapshot is rebuilt from the CSVs; if it can't be
+    written the CSV-merged frame is returned as before.
+    """
+    snapshot_dir = snapshot_dir or f'{data_dir}/places_snapshot'
+    if not use_snapshot:
+        return merge_place_csvs(data_dir), 'csv'
+    if is_snapshot_current(snapshot_dir, data_dir):
+        return load_snapshot(snapshot_dir), 'snapshot'
+
+    sources = source_signature(data_dir)
+    places = merge_place_csvs(data_dir)
+    try:
+        build_snapshot(places, snapshot_dir, sources)
+        return load_snapshot(snapshot_dir), 'snapshot (rebuilt)'
+    except OSError as e:
+        print(f"⚠ Could not write places snapshot: {e}")
+        return places, 'csv'
+
+
+def _measure(mode, data_dir):
+    """Load places one way and print load time and peak RSS as JSON (runs in a child process)"""
+    import resource
+    start = time.perf_counter()
+    if mode == 'csv':
+        places = merge_place_csvs(data_dir)
+    else:
+        places = load_snapshot(f'{data_dir}/places_snapshot')
+    # Touch every column the planner reads so mapped pages are counted
+    for column in places.columns:
+        np.asarray(places[column])
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'mode': mode,
+        'rows': len(places),
+        'load_seconds': round(elapsed, 4),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }))
+
+
+def main():
+    """Build the places snapshot and compare it with the CSV path"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+
+    if command == 'build':
+        manifest = build_snapshot(merge_place_csvs(data_dir), f'{data_dir}/places_snapshot', source_signature(data_dir))
+        print(f"✅ Wrote places snapshot: {manifest['rows']} rows, {len(manifest['columns'])} columns")
+    elif command == 'measure':
+        _measure(sys.argv[3], data_dir)
+    elif command == 'compare':
+        if not is_snapshot_current(f'{data_dir}/places_snapshot', data_dir):
+            build_snapshot(merge_place_csvs(data_dir), f'{data_dir}/places_snapshot', source_signature(data_dir))
+        # Baseline process: interpreter plus pandas/numpy imports, no data
+        baseline = subprocess.run(
+            [sys.executable, '-c', 'import resource, pandas, numpy; '
+             'print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)'],
+            capture_output=True, text=True, check=True
+        )
+        base_rss = float(baseline.stdout.strip())
+        for mode in ('csv', 'snapshot'):
+            result = subprocess.run(
+                [sys.executable, __file__, 'measure', data_dir, mode],
+                capture_output=True, text=True, check=True
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            stats['data_rss_mb'] = round(stats['peak_rss_mb'] - base_rss, 1)
+            print(f"{mode:<9} rows={stats['rows']:<8} load={stats['load_seconds'] * 1000:.1f}ms "
+                  f"peak_rss={stats['peak_rss_mb']}MB (+{stats['data_rss_mb']}MB over imports)")
+    else:
+        print("Usage: python place_store.py [build|compare] [data_dir]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371
+
+ROUTE_MODES = ('greedy', 'improve', 'exact')
+
+
+def haversine_matrix(lat, lon):
+    """Pairwise haversine distances in km between all coordinates (vectorized)"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    dlat = lat[None, :] - lat[:, None]
+    dlon = lon[None, :] - lon[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    dist = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    # Missing coordinates should never look like the nearest stop
+    dist[np.isnan(dist)] = np.inf
+    return dist
+
+
+def haversine_km(lat, lon, latitudes, longitudes):
+    """Distances in km from one coordinate to many (vectorized)"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = np.sin((latitudes - lat) / 2) ** 2 + np.cos(lat) * np.cos(latitudes) * np.sin((longitudes - lon) / 2) ** 2
+    dist = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    dist[np.isnan(dist)] = np.inf
+    return dist
+
+
+def path_length(dist, order):
+    """Total length of an open path visiting order[0] -> order[-1]"""
+    if len(order) < 2:
+        return 0.0
+    order = np.asarray(order)
+    return float(dist[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour(dist, start=0):
+    """Greedy route: always move to the closest unvisited stop (ties go to the earliest)"""
+    n = len(dist)
+    order = [start]
+    remaining = [i for i in range(n) if i != start]
+    while remaining:
+        row = dist[order[-1], remaining]
+        order.append(remaining.pop(int(np.argmin(row))))
+    return order
+
+
+def two_opt(dist, order, deadline):
+    """Improve an open path with 2-opt segment reversals and Or-opt moves until no gain or deadline"""
+    order = list(order)
+    n = len(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        # 2-opt: reverse order[i:j+1]; endpoints of an open path are free
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                a = order[i - 1] if i > 0 else None
+                b, c = order[i], order[j]
+                d = order[j + 1] if j + 1 < n else None
+                before = (dist[a, b] if a is not None else 0) + (dist[c, d] if d is not None else 0)
+                after = (dist[a, c] if a is not None else 0) + (dist[b, d] if d is not None else 0)
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+            if time.perf_counter() >= deadline:
+                return order
+
+        # Or-opt: move a segment of 1-3 stops to a better position
+        for seg_len in (1, 2, 3):
+            for i in range(n - seg_len + 1):
+                current = path_length(dist, order)
+                segment = order[i:i + seg_len]
+                rest = order[:i] + order[i + seg_len:]
+                best, best_len = None, current
+                for k in range(len(rest) + 1):
+                    for seg in (segment, segment[::-1]):
+                        candidate = rest[:k] + seg + rest[k:]
+                        length = path_length(dist, candidate)
+                        if length < best_len - 1e-9:
+                            best, best_len = candidate, length
+                if best is not None:
+                    order = best
+                    improved = True
+            if time.perf_counter() >= deadline:
+                return order
+    return order
+
+
+def held_karp(dist):
+    """
+    Exact shortest open path over all stops (dynamic programming over subsets).
+
+    When no path of finite length exists (a stop without coordinates) the
+    greedy order is returned instead, so the result always visits every stop.
+    """
+    n = len(dist)
+    full = 1 << n
+    dp = np.full((full, n), np.inf)
+    parent = np.full((full, n), -1, dtype=np.int64)
+    for i in range(n):
+        dp[1 << i, i] = 0
+    bits = 1 << np.arange(n)
+    for mask in range(1, full):
+        costs = dp[mask]
+        if not np.isfinite(costs).any():
+            continue
+        # Best predecessor for extending this subset to every stop j
+        totals = costs[:, None] + dist
+        best_prev = np.argmin(totals, axis=0)
+        best = totals[best_prev, np.arange(n)]
+        for j in np.nonzero((mask & bits) == 0)[0]:
+            nxt = mask | (1 << j)
+            if best[j] < dp[nxt, j]:
+                dp[nxt, j] = best[j]
+                parent[nxt, j] = best_prev[j]
+
+    mask = full - 1
+    if not np.isfinite(dp[mask]).any():
+        return nearest_neighbour(dist)
+    last = int(np.argmin(dp[mask]))
+    order = []
+    while last != -1:
+        order.append(last)
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+    return order[::-1]
+
+
+class RouteEngine:
+    """Orders each day's stops using cached per-district distance matrices"""
+
+    def __init__(self, latitudes, longitudes, district_rows, max_matrix_places=2000, max_districts=64,
+                 exact_max_stops=10):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.district_rows = district_rows
+        self.max_matrix_places = max_matrix_places
+        self.max_districts = max_districts
+        self.exact_max_stops = exact_max_stops
+        self._matrices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def district_matrix(self, district):
+        """Distance matrix over all places of a district, built once and kept in an LRU cache"""
+        with self._lock:
+            if district in self._matrices:
+                self._matrices.move_to_end(district)
+                return self._matrices[district]
+        rows = self.district_rows.get(district)
+        if rows is None or len(rows) > self.max_matrix_places:
+            return None
+        matrix = haversine_matrix(self.latitudes[rows], self.longitudes[rows])
+        with self._lock:
+            self._matrices[district] = matrix
+            while len(self._matrices) > self.max_districts:
+                self._matrices.popitem(last=False)
+        return matrix
+
+    def stop_matrix(self, district, rows):
+        """Distance matrix between the given place rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        matrix = self.district_matrix(district)
+        if matrix is not None:
+            district_rows = self.district_rows[district]
+            local = np.minimum(np.searchsorted(district_rows, rows), len(district_rows) - 1)
+            if np.array_equal(district_rows[local], rows):
+                return matrix[np.ix_(local, local)]
+        # Very large districts (or rows outside the district) get a small matrix built on the fly
+        return haversine_matrix(self.latitudes[rows], self.longitudes[rows])
+
+    def optimize(self, district, rows, mode='greedy', time_budget_ms=50):
+        """
+        Order the stops for one day.
+
+        Returns (order, distance_km, greedy_distance_km) where order indexes into rows.
+        The greedy pass starts from the first (highest rated) stop, as it always has.
+        Legs to a stop without coordinates have no distance; such a day keeps
+        the greedy order and its distances count only the known legs.
+        """
+        n = len(rows)
+        if n < 2:
+            return list(range(n)), 0.0, 0.0
+        dist = self.stop_matrix(district, rows)
+        order = nearest_neighbour(dist)
+        greedy_km = path_length(dist, order)
+
+        if mode == 'exact' and n <= self.exact_max_stops:
+            order = held_karp(dist)
+        elif mode in ('improve', 'exact'):
+            deadline = time.perf_counter() + time_budget_ms / 1000
+            order = two_opt(dist, order, deadline)
+
+        distance_km = path_length(dist, order)
+        if sorted(order) != list(range(n)) or not np.isfinite(distance_km) or distance_km > greedy_km:
+            # Improvement never makes a route worse than the greedy pass, or drops a stop
+            order = nearest_neighbour(dist)
+            distance_km = greedy_km
+        if not np.isfinite(greedy_km):
+            legs = dist[order[:-1], order[1:]]
+            distance_km = greedy_km = float(legs[np.isfinite(legs)].sum())
+        return order, distance_km, greedy_km
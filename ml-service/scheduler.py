@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+
+
+def prune(day_values, durations, food, capacity, max_food, days_sharing=1):
+    """
+    Candidates that can appear in an optimal schedule for these days.
+
+    A day holds at most capacity // d places of duration d (and at most
+    max_food food places), so within each (duration, food) group only that
+    many of a day's best-scoring places can matter; with several days
+    competing for the same group it is that many per day.
+    """
+    keep = np.zeros(len(durations), dtype=bool)
+    fits = np.flatnonzero(durations <= capacity)
+    if len(fits) == 0:
+        return fits
+    group = durations[fits] * 2 + food[fits]
+    order = np.argsort(group, kind='stable')
+    bounds = np.r_[0, np.flatnonzero(np.diff(group[order])) + 1, len(order)]
+
+    # Days with the same weather have identical scores, so each distinct row is pruned once
+    distinct = {values.tobytes(): values for values in day_values}.values()
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        rows = fits[order[start:end]]
+        limit = capacity // int(durations[rows[0]])
+        if food[rows[0]]:
+            limit = min(limit, max_food)
+        limit *= days_sharing
+        if len(rows) <= limit:
+            keep[rows] = True
+            continue
+        for values in distinct:
+            keep[rows[np.argpartition(-values[rows], limit - 1)[:limit]]] = True
+    return np.flatnonzero(keep)
+
+
+def knapsack(day_values, durations, food, capacity, max_food):
+    """
+    Exact assignment of places to one or two days maximizing total value.
+
+    day_values has one row of place values per day. The DP state is the hours and
+    food places used on each day. Returns the day index per place, -1 if unused.
+    """
+    k, m = day_values.shape
+    shape = (capacity + 1, max_food + 1) * k
+    best = np.full(shape, -np.inf)
+    best[(0,) * (2 * k)] = 0.0
+    choice = np.zeros((m,) + shape, dtype=np.int8)
+
+    # (target, source) slices that move one day's (hours, food) state forward by a place
+    moves = {}
+    for d, f in set(zip(durations.tolist(), food.tolist())):
+        if d > capacity or f > max_food:
+            continue
+        for day in range(k):
+            target = [slice(None)] * (2 * k)
+            source = [slice(None)] * (2 * k)
+            target[2 * day], source[2 * day] = slice(d, None), slice(None, capacity + 1 - d)
+            target[2 * day + 1], source[2 * day + 1] = slice(f, None), slice(None, max_food + 1 - f)
+            moves[(d, f, day)] = (tuple(target), tuple(source))
+
+    for i in range(m):
+        d, f = int(durations[i]), int(food[i])
+        if d > capacity or f > max_food:
+            continue
+        previous = best.copy()
+        for day in range(k):
+            target, source = moves[(d, f, day)]
+            taken = previous[source] + day_values[day, i]
+            region = best[target]
+            better = taken > region
+            region[better] = taken[better]
+            choice[i][target][better] = day + 1
+
+    # Walk the choices back from the best final state
+    assignment = np.full(m, -1, dtype=np.int64)
+    state = list(np.unravel_index(int(np.argmax(best)), shape))
+    for i in range(m - 1, -1, -1):
+        day = int(choice[i][tuple(state)]) - 1
+        if day >= 0:
+            assignment[i] = day
+            state[2 * day] -= int(durations[i])
+            state[2 * day + 1] -= int(food[i])
+    return assignment
+
+
+def schedule_days(day_values, durations, food, capacity=8, max_food=1, deadline=None):
+    """
+    Assign places to every day at once, maximizing the total score-hours.
+
+    A place is worth its score for every hour it fills, so a day is filled
+    with the places that are best per hour rather than with as many short
+    ones as fit. Each day gets at most `capacity` hours and `max_food` food
+    places, and no place is used twice. Days are first solved one after another (each
+    exactly, given the earlier ones); then pairs of days are re-solved
+    jointly while that still improves the total and the deadline allows.
+    Returns the day index per place, -1 if unused.
+    """
+    durations = np.maximum(np.asarray(durations, dtype=np.int64), 1)
+    day_values = np.asarray(day_values, dtype=np.float64) * durations
+    food = np.asarray(food, dtype=np.int64)
+    days, n = day_values.shape
+    assignment = np.full(n, -1, dtype=np.int64)
+    candidates = prune(day_values, durations, food, capacity, max_food, days)
+
+    def solve(day_list, pool, days_sharing):
+        values = day_values[day_list][:, pool]
+        keep = prune(values, durations[pool], food[pool], capacity, max_food, days_sharing)
+        chosen = knapsack(values[:, keep], durations[pool[keep]], food[pool[keep]], capacity, max_food)
+        return pool[keep], chosen
+
+    def value(day):
+        return day_values[day, assignment == day].sum()
+
+    # Each day's best on its own bounds what it can reach in any joint schedule
+    upper, upper_by_values = [], {}
+    for day in range(days):
+        key = day_values[day].tobytes()
+        if key not in upper_by_values:
+            places, chosen = solve([day], candidates, 1)
+            upper_by_values[key] = day_values[day, places[chosen == 0]].sum()
+        upper.append(upper_by_values[key])
+
+    for day in range(days):
+        places, chosen = solve([day], candidates[assignment[candidates] < 0], 1)
+        assignment[places[chosen == 0]] = day
+
+    improved = True
+    while improved and (deadline is None or time.perf_counter() < deadline):
+        improved = False
+        for a in range(days):
+            for b in range(a + 1, days):
+                before = value(a) + value(b)
+                if before >= upper[a] + upper[b] - 1e-9:
+                    continue
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return assignment
+                pool = candidates[np.isin(assignment[candidates], (-1, a, b))]
+                places, chosen = solve([a, b], pool, 2)
+                after = day_values[a, places[chosen == 0]].sum() + day_values[b, places[chosen == 1]].sum()
+                if after > before + 1e-9:
+                    assignment[pool] = -1
+                    assignment[places[chosen == 0]] = a
+                    assignment[places[chosen == 1]] = b
+                    improved = True
+    return assignment
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+# Score components, each in [0, 1]
+SCORE_COMPONENTS = ('type', 'rating', 'cost', 'weather', 'duration')
+DEFAULT_WEIGHTS = {'type': 0.35, 'rating': 0.2, 'cost': 0.15, 'weather': 0.2, 'duration': 0.1}
+
+PLANNERS = ('scored', 'legacy')
+
+RAINY_CONDITIONS = ('Rain', 'Thunderstorm', 'Drizzle')
+FAIR_CONDITIONS = ('Clear', 'Clouds')
+
+# Venue types that suit each weather condition class; any venue suits a neutral day
+FITTING_VENUES = {'rainy': ('indoor', 'both'), 'fair': ('outdoor', 'both')}
+
+# Weather fit per indoor code (unknown, indoor, outdoor, both) for a day's condition
+RAINY_FIT = np.array([0.5, 1.0, 0.0, 0.75], dtype=np.float32)
+FAIR_FIT = np.array([0.5, 0.25, 1.0, 0.75], dtype=np.float32)
+NEUTRAL_FIT = np.full(4, 0.5, dtype=np.float32)
+
+MAX_RATING = 5
+# Cost fit by how many levels a place is above the budget's most expensive category
+OVER_BUDGET_FIT = np.array([1.0, 0.25, 0.0], dtype=np.float32)
+
+
+def resolve_weights(overrides=None):
+    """Default weights with per-request overrides, normalised to sum to 1 (ValueError if invalid)"""
+    weights = dict(DEFAULT_WEIGHTS)
+    if overrides is None:
+        return weights
+    if not isinstance(overrides, dict):
+        raise ValueError('weights must be an object')
+    for name, value in overrides.items():
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown weight '{name}', expected one of {list(SCORE_COMPONENTS)}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value) or value < 0:
+            raise ValueError(f"Weight '{name}' must be a non-negative number")
+        weights[name] = float(value)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('At least one weight must be positive')
+    return {name: value / total for name, value in weights.items()}
+
+
+def condition_class(condition):
+    """'rainy', 'fair' or 'neutral' (no forecast or any other condition); days in one class are planned alike"""
+    if condition in RAINY_CONDITIONS:
+        return 'rainy'
+    if condition in FAIR_CONDITIONS:
+        return 'fair'
+    return 'neutral'
+
+
+def weather_fit_table(condition):
+    if condition in RAINY_CONDITIONS:
+        return RAINY_FIT
+    if condition in FAIR_CONDITIONS:
+        return FAIR_FIT
+    return NEUTRAL_FIT
+
+
+def cost_fit(index, rows, budget):
+    """1 within budget, less the further above it, 0.5 for places with no cost category"""
+    if budget not in index.budget_map:
+        return np.ones(len(rows), dtype=np.float32)
+    max_level = max(index.cost_levels.index(cost) for cost in index.budget_map[budget])
+    levels = index.cost_level[rows].astype(np.int16)
+    over = np.clip(levels - max_level, 0, len(OVER_BUDGET_FIT) - 1)
+    return np.where(levels < 0, np.float32(0.5), OVER_BUDGET_FIT[over])
+
+
+def duration_fit(durations, daily_hours):
+    """Shorter visits leave room in the day; anything longer than a day doesn't fit at all"""
+    fit = 1 - 0.5 * (durations - 1) / max(daily_hours - 1, 1)
+    return np.where(durations > daily_hours, np.float32(0.0), np.clip(fit, 0, 1)).astype(np.float32)
+
+
+class CandidateScores:
+    """
+    Weighted scores for every candidate row of one trip.
+
+    Everything except weather is computed once per request; each day only
+    adds its weather term, so a day costs one vector add over the candidates.
+    """
+
+    def __init__(self, index, rows, traveler_type, budget, weights, daily_hours=8):
+        self.index = index
+        self.rows = rows
+        self.weights = weights
+        self.components = {
+            'type': index.type_match(rows, traveler_type),
+            'rating': np.clip(index.rating[rows] / MAX_RATING, 0, 1),
+            'cost': cost_fit(index, rows, budget),
+            'duration': duration_fit(index.duration[rows], daily_hours)
+        }
+        self.base = sum(weights[name] * values for name, values in self.components.items())
+        self._indoor = index.indoor_code[rows].astype(np.intp) + 1
+
+    def day_scores(self, condition):
+        """Total score per candidate for a day with this weather condition (None: no forecast)"""
+        return self.base + self.weights['weather'] * weather_fit_table(condition)[self._indoor]
+
+    def breakdown(self, position, condition):
+        """Component values and total score of one candidate, as reported in explanations"""
+        values = {name: float(v[position]) for name, v in self.components.items()}
+        values['weather'] = float(weather_fit_table(condition)[self._indoor[position]])
+        values['score'] = sum(self.weights[name] * values[name] for name in SCORE_COMPONENTS)
+        return values
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first (ties keep dataset order)"""
+    n = len(scores)
+    if k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.empty(0, dtype=np.intp)
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
@@ -0,0 +1,97 @@
+import numpy as np
+
+from route_engine import haversine_km
+
+
+KM_PER_DEGREE = 111.195
+# Offset that keeps longitude cell numbers positive inside a combined cell key
+LON_CELLS = 1 << 20
+
+
+class GridIndex:
+    """
+    Fixed-size lat/lon grid over place coordinates for radius and nearest queries.
+
+    Rows are sorted by cell key (latitude cell major), so the cells of one
+    latitude band inside a query box are a single contiguous slice.
+    Places without coordinates are left out.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_deg=0.05):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_deg = cell_deg
+
+        valid = np.flatnonzero(np.isfinite(self.latitudes) & np.isfinite(self.longitudes))
+        keys = self._keys(self._lat_cell(self.latitudes[valid]), self._lon_cell(self.longitudes[valid]))
+        order = np.argsort(keys, kind='stable')
+        self.rows = valid[order]
+        self.keys = keys[order]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _lat_cell(self, lat):
+        return np.floor(np.asarray(lat) / self.cell_deg).astype(np.int64)
+
+    def _lon_cell(self, lon):
+        return np.floor(np.asarray(lon) / self.cell_deg).astype(np.int64) + LON_CELLS // 2
+
+    @staticmethod
+    def _keys(lat_cells, lon_cells):
+        return lat_cells * LON_CELLS + lon_cells
+
+    def box_rows(self, lat, lon, radius_km):
+        """Rows in every cell of the bounding box around a circle (a superset of the circle)"""
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = max(np.cos(np.radians(min(abs(lat) + lat_span, 89.9))), 1e-6)
+        lon_span = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        lat_lo, lat_hi = self._lat_cell(max(lat - lat_span, -90.0)), self._lat_cell(min(lat + lat_span, 90.0))
+        lon_lo, lon_hi = self._lon_cell(lon - lon_span), self._lon_cell(lon + lon_span)
+        bands = np.arange(lat_lo, lat_hi + 1)
+        starts = np.searchsorted(self.keys, self._keys(bands, lon_lo), side='left')
+        ends = np.searchsorted(self.keys, self._keys(bands, lon_hi), side='right')
+        parts = [self.rows[s:e] for s, e in zip(starts, ends) if e > s]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _candidates(self, lat, lon, radius_km, keep):
+        rows = self.box_rows(lat, lon, radius_km)
+        if keep is not None and len(rows):
+            rows = rows[keep(rows)]
+        dist = haversine_km(lat, lon, self.latitudes[rows], self.longitudes[rows])
+        return rows, dist
+
+    def within(self, lat, lon, radius_km, keep=None, limit=None):
+        """
+        Rows within radius_km of a point, nearest first, with their distances.
+
+        keep is an optional function taking candidate rows and returning a
+        boolean mask (used for category and budget filters).
+        """
+        rows, dist = self._candidates(lat, lon, radius_km, keep)
+        inside = dist <= radius_km
+        rows, dist = rows[inside], dist[inside]
+        order = np.lexsort((rows, dist))
+        if limit is not None:
+            order = order[:limit]
+        return rows[order], dist[order]
+
+    def nearest(self, lat, lon, k, keep=None, max_radius_km=None):
+        """
+        The k nearest rows to a point (optionally within max_radius_km), nearest first.
+
+        Searches a box that doubles in size until it holds k places inside the
+        searched radius, so results are exact without scanning every place.
+        """
+        radius = self.cell_deg * KM_PER_DEGREE
+        limit_km = max_radius_km if max_radius_km is not None else np.pi * 6371
+        while True:
+            radius = min(radius, limit_km)
+            rows, dist = self._candidates(lat, lon, radius, keep)
+            inside = dist <= radius
+            if inside.sum() >= k or radius >= limit_km:
+                rows, dist = rows[inside], dist[inside]
+                order = np.lexsort((rows, dist))[:k]
+                return rows[order], dist[order]
+            radius *= 2
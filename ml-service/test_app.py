@@ -0,0 +1,228 @@
+import pandas as pd
+import pytest
+
+import app
+from nb_inference import EXPORT_FILENAME
+
+
+def trip_body(district='Chennai', days=2, traveler_type='Culture Seeker', **options):
+    return {
+        'latestTrip': {'_id': 'test-trip', 'district': district, 'days': days, 'budget': 'MODERATE',
+                       'travelWith': 'Family'},
+        'travelerProfile': {'travelerType': traveler_type},
+        'options': options
+    }
+
+
+@pytest.mark.parametrize('option', ['routeTimeBudgetMs', 'scheduleTimeBudgetMs'])
+@pytest.mark.parametrize('value', ['50', -1, True, float('nan')])
+def test_invalid_time_budget_is_rejected(option, value):
+    problem = app.trip_request_problem(trip_body(**{option: value}))
+    assert problem == (f'{option} must be a non-negative number', 400)
+
+
+
+@pytest.mark.parametrize('options', [[1], 'fast', 5])
+def test_options_must_be_an_object(client, options):
+    body = dict(trip_body(), options=options)
+    assert app.trip_request_problem(body) == ('options must be an object', 400)
+    assert client.post('/generate-trip', json=body).status_code == 400
+
+
+@pytest.mark.parametrize('district', [5, None, ['Chennai']])
+def test_district_must_be_a_string(client, district):
+    body = trip_body()
+    body['latestTrip']['district'] = district
+    response = client.post('/generate-trip', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'latestTrip.district must be a string'}
+
+def forecast(*conditions):
+    return [{'condition': condition, 'temp': 30, 'description': condition.lower()} for condition in conditions]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'get_weather_forecast', lambda city, days: forecast(*['Clear'] * days))
+    app.trip_cache.clear()
+    return app.app.test_client()
+
+
+def test_replan_changes_only_days_whose_weather_class_changed(client):
+    trip = client.post('/generate-trip', json=trip_body('Chennai', 3)).get_json()
+    response = client.post('/replan', json=dict(
+        trip_body('Chennai', 3),
+        itinerary=trip['itinerary'],
+        routes=trip['routes'],
+        previousForecast=forecast('Clear', 'Clear', 'Clear'),
+        weatherForecast=forecast('Clouds', 'Rain', 'Clear')
+    ))
+    assert response.status_code == 200
+    replanned = response.get_json()
+
+    assert replanned['replannedDays'] == ['Day 2']
+    for day in ('Day 1', 'Day 3'):
+        assert [p['name'] for p in replanned['itinerary'][day]] == [p['name'] for p in trip['itinerary'][day]]
+    assert replanned['itinerary']['Day 2']
+    assert all(p['type'] in ('indoor', 'both', '') for p in replanned['itinerary']['Day 2'])
+    names = [p['name'] for day_places in replanned['itinerary'].values() for p in day_places]
+    assert len(names) == len(set(names))
+
+
+def test_replan_without_weather_change_keeps_the_trip(client):
+    trip = client.post('/generate-trip', json=trip_body('Madurai', 2)).get_json()
+    replanned = client.post('/replan', json=dict(
+        trip_body('Madurai', 2), itinerary=trip['itinerary'], weatherForecast=forecast('Clouds', 'Clear')
+    )).get_json()
+    assert replanned['replannedDays'] == []
+    assert [[p['name'] for p in day_places] for day_places in replanned['itinerary'].values()] == \
+        [[p['name'] for p in day_places] for day_places in trip['itinerary'].values()]
+
+
+@pytest.fixture(params=[1, 2], ids=['in-process', 'pool'])
+def batch_workers(request, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_WORKERS', request.param)
+    monkeypatch.setattr(app, '_batch_pool', None)
+    pool = app.start_batch_pool()
+    yield request.param
+    if pool is not None:
+        pool.shutdown()
+
+
+def test_batch_matches_single_trips(client, batch_workers):
+    trips = [trip_body(district, days, traveler_type)
+             for district, days, traveler_type in [('Chennai', 2, 'Foodie'), ('Madurai', 3, 'Culture Seeker'),
+                                                   ('Chennai', 1, 'Nature Lover'), ('Nilgiris', 2, 'Adventure Seeker')]]
+    batch = client.post('/generate-trip-batch', json={'trips': trips}).get_json()
+    assert batch['succeeded'] == len(trips)
+
+    app.trip_cache.clear()
+    for i, trip in enumerate(trips):
+        single = client.post('/generate-trip', json=trip).get_json()
+        assert batch['results'][i]['index'] == i
+        for field in ('itinerary', 'routes', 'stats', 'weatherForecast'):
+            assert batch['results'][i][field] == single[field]
+
+
+def test_reload_applies_deltas_and_bumps_the_version(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'PLACES_DELTA_DIR', str(tmp_path))
+    monkeypatch.setattr(app, 'place_state', app.place_state)
+    original = app.place_state
+    place = 'Ripon Building'
+    assert len(original.index.rows_named(place))
+
+    (tmp_path / '001-remove.csv').write_text(f"op,place_name,destination_city\ndelete,{place},\n")
+    result = app.reload_places()
+    assert result['mode'] == 'delta' and result['swapped']
+    assert result['placesVersion'] != original.version
+    assert len(app.place_state.index.rows_named(place)) == 0
+    assert client.get(f'/nearby?place={place}').status_code == 404
+
+    # No new delta files: nothing to do
+    assert app.reload_places()['swapped'] is False
+
+    # A removed delta is undone by a full reload back to the original version
+    (tmp_path / '001-remove.csv').unlink()
+    result = app.reload_places()
+    assert result['mode'] == 'full'
+    assert result['placesVersion'] == original.version
+    assert len(app.place_state.places) == len(original.places)
+
+
+def test_invalid_delta_leaves_places_in_place(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'PLACES_DELTA_DIR', str(tmp_path))
+    monkeypatch.setattr(app, 'place_state', app.place_state)
+    original = app.place_state
+    (tmp_path / '001-new.csv').write_text("op,place_name,destination_city\nupsert,Brand New Place,Chennai\n")
+    with pytest.raises(ValueError, match='001-new.csv'):
+        app.reload_places()
+    assert app.place_state is original
+
+
+def test_batch_workers_follow_a_places_reload(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'PLACES_DELTA_DIR', str(tmp_path))
+    monkeypatch.setattr(app, 'place_state', app.place_state)
+    monkeypatch.setattr(app, 'BATCH_WORKERS', 2)
+    monkeypatch.setattr(app, '_batch_pool', None)
+    pool = app.start_batch_pool()
+    try:
+        trips = {'trips': [trip_body('Chennai', 2, 'Foodie'), trip_body('Madurai', 2)]}
+        before = client.post('/generate-trip-batch', json=trips).get_json()
+        place = before['results'][0]['itinerary']['Day 1'][0]['name']
+        
+        (tmp_path / '001-remove.csv').write_text(f"op,place_name,destination_city\ndelete,{place},\n")
+        app.reload_places()
+        after = client.post('/generate-trip-batch', json=trips).get_json()
+        names = [p['name'] for day_places in after['results'][0]['itinerary'].values() for p in day_places]
+        assert place not in names
+        # Planned on the parent's version, so cached for single requests
+        assert app.trip_cache.snapshot()['version'] == app.place_state.version
+        assert app.trip_cache.snapshot()['size'] == 2
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture
+def online(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'ONLINE_SAMPLES_PATH', str(tmp_path / 'ingested.csv'))
+    monkeypatch.setattr(app, 'ONLINE_SNAPSHOT_DIR', str(tmp_path / 'online'))
+    monkeypatch.setattr(app, 'model_path', str(tmp_path / 'models'))
+    monkeypatch.setattr(app, 'classifier', app.classifier)
+    monkeypatch.setattr(app, 'online_model', app.start_online_learning(app.classifier))
+    monkeypatch.setattr(app, 'start_snapshot_timer', lambda: None)
+    return tmp_path
+
+
+def ingest_samples(client, count):
+    rows = pd.read_csv(app.RETRAIN_CSV_PATH).head(count).to_dict('records')
+    samples = [{'answers': row, 'label': row['label']} for row in rows]
+    return client.post('/ingest', json={'samples': samples}).get_json()
+
+
+def test_ingested_samples_are_logged_and_flushed(client, online):
+    result = ingest_samples(client, 3)
+    assert result['accepted'] == 3 and result['samplesSeen'] == 3
+    assert len(pd.read_csv(online / 'ingested.csv')) == 3
+    assert app.online_model.dirty
+    
+    app.flush_online_model()
+    assert not app.online_model.dirty
+    assert (online / 'online' / EXPORT_FILENAME).exists()
+
+
+def test_retrain_keeps_ingested_samples(client, online):
+    ingest_samples(client, 4)
+    result = app.retrain_model()
+    assert result['ingestedSamples'] == 4 and result['lateSamples'] == 0
+    assert app.online_model.samples_seen == 0
+    assert not (online / 'online' / EXPORT_FILENAME).exists()
+    
+    # The log is kept, so the next retrain learns from the same samples again
+    ingest_samples(client, 2)
+    assert app.retrain_model()['ingestedSamples'] == 6
+
+
+def test_samples_ingested_during_a_retrain_reach_the_new_model(client, online, monkeypatch):
+    validate = app.validate_model
+    
+    def validate_and_ingest(*args):
+        validate(*args)
+        assert ingest_samples(client, 2)['accepted'] == 2
+    
+    monkeypatch.setattr(app, 'validate_model', validate_and_ingest)
+    result = app.retrain_model()
+    assert result['lateSamples'] == 2
+    assert app.online_model.samples_seen == 2
+    assert app.classifier.version.endswith('+2')
+
+
+@pytest.mark.parametrize('query', ['lat=95&lon=80', 'lat=13&lon=500', 'lat=-91&lon=80', 'lat=13&lon=80&radius=-5',
+                                   'lat=13&lon=80&radius=0', 'lat=nan&lon=80'])
+def test_nearby_rejects_out_of_range_points(client, query):
+    assert client.get(f'/nearby?{query}').status_code == 400
+
+
+def test_nearby_accepts_the_range_edges(client):
+    assert client.get('/nearby?lat=-90&lon=180').status_code == 200
+    places = client.get('/nearby?lat=13.08&lon=80.27&radius=5').get_json()
+    assert places['count'] > 0
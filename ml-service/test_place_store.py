@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from place_store import apply_delta, places_version, read_delta, validate_places
+
+
+def make_places():
+    places = pd.DataFrame({
+        'place_name': ['Fort', 'Beach', 'Fort'],
+        'destination_city': ['Chennai', 'Chennai', 'Madurai'],
+        'latitude': [13.0, 13.1, 9.9],
+        'longitude': [80.2, 80.3, 78.1],
+        'duration_hours': [2, 3, 1],
+    })
+    return places.astype({'destination_city': 'category'})
+
+
+def delta(*rows, columns=('op', 'place_name', 'destination_city', 'duration_hours')):
+    return pd.DataFrame(list(rows), columns=list(columns))
+
+
+def test_upsert_updates_only_the_matching_city():
+    result = apply_delta(make_places(), delta(('upsert', 'Fort', 'Madurai', 4)))
+    assert result['duration_hours'].tolist() == [2, 3, 4]
+    assert isinstance(result['destination_city'].dtype, pd.CategoricalDtype)
+
+
+def test_delete_without_city_drops_every_match():
+    result = apply_delta(make_places(), delta(('delete', 'Fort', None, None)))
+    assert result['place_name'].tolist() == ['Beach']
+
+
+def test_new_place_needs_every_column():
+    with pytest.raises(ValueError, match="New place 'Temple'"):
+        apply_delta(make_places(), delta(('upsert', 'Temple', 'Madurai', 2)))
+    full = delta(('upsert', 'Temple', 'Madurai', 2, 9.9, 78.1),
+                 columns=('op', 'place_name', 'destination_city', 'duration_hours', 'latitude', 'longitude'))
+    assert apply_delta(make_places(), full)['place_name'].tolist() == ['Fort', 'Beach', 'Fort', 'Temple']
+
+
+def test_read_delta_rejects_unknown_ops(tmp_path):
+    path = tmp_path / '001.csv'
+    path.write_text('op,place_name\nrename,Fort\n')
+    with pytest.raises(ValueError, match='unknown ops'):
+        read_delta(path)
+
+
+def test_version_changes_with_deltas():
+    deltas = [{'name': '001.csv', 'size': 10, 'mtime_ns': 1}]
+    assert places_version() == places_version(deltas=[])
+    assert places_version(deltas=deltas) != places_version()
+    assert places_version(deltas=deltas) != places_version(deltas=[dict(deltas[0], size=11)])
+
+
+def test_validate_rejects_out_of_range_coordinates():
+    places = make_places()
+    places.loc[1, 'latitude'] = 130.0
+    with pytest.raises(ValueError, match='out-of-range coordinates'):
+        validate_places(places)
+    validate_places(make_places())
+
+
+@pytest.mark.parametrize('latitude', [float('nan'), 'north', float('inf')])
+def test_validate_rejects_missing_or_non_numeric_coordinates(latitude):
+    places = make_places().astype({'latitude': object})
+    places.loc[2, 'latitude'] = latitude
+    with pytest.raises(ValueError, match='1 places without numeric coordinates'):
+        validate_places(places)
+
+
+def test_upsert_with_non_numeric_coordinates_fails_validation():
+    upsert = delta(('upsert', 'Beach', 'Chennai', 'somewhere'),
+                   columns=('op', 'place_name', 'destination_city', 'latitude'))
+    with pytest.raises(ValueError, match='without numeric coordinates'):
+        validate_places(apply_delta(make_places(), upsert))
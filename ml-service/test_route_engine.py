@@ -0,0 +1,43 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from route_engine import RouteEngine, haversine_matrix, held_karp, path_length
+
+
+def make_engine(latitudes, longitudes):
+    return RouteEngine(latitudes, longitudes, {'Chennai': np.arange(len(latitudes))})
+
+
+def test_held_karp_finds_the_shortest_open_path():
+    rng = np.random.default_rng(3)
+    dist = haversine_matrix(13 + rng.random(6), 80 + rng.random(6))
+    best = min(path_length(dist, order) for order in itertools.permutations(range(6)))
+    order = held_karp(dist)
+    assert sorted(order) == list(range(6))
+    assert path_length(dist, order) == pytest.approx(best)
+
+
+def test_held_karp_visits_every_stop_without_coordinates():
+    dist = haversine_matrix([13.0, np.nan, 13.1, 13.2], [80.2, 80.3, np.nan, 80.4])
+    assert sorted(held_karp(dist)) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('mode', ['greedy', 'improve', 'exact'])
+def test_optimize_keeps_every_stop_and_finite_distances(mode):
+    engine = make_engine([13.0, np.nan, 13.1, 13.2], [80.2, 80.3, np.nan, 80.4])
+    order, distance_km, greedy_km = engine.optimize('Chennai', [0, 1, 2, 3], mode)
+    assert sorted(order) == [0, 1, 2, 3]
+    assert math.isfinite(distance_km) and math.isfinite(greedy_km)
+    assert distance_km <= greedy_km
+
+
+@pytest.mark.parametrize('mode', ['improve', 'exact'])
+def test_improved_routes_are_never_longer_than_greedy(mode):
+    rng = np.random.default_rng(5)
+    engine = make_engine(13 + rng.random(8), 80 + rng.random(8))
+    order, distance_km, greedy_km = engine.optimize('Chennai', list(range(8)), mode)
+    assert sorted(order) == list(range(8))
+    assert distance_km <= greedy_km + 1e-9
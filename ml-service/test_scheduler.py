@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from scheduler import schedule_days
+
+
+def day_hours(assignment, durations, day):
+    return int(durations[assignment == day].sum())
+
+
+def test_long_good_places_beat_many_short_ones():
+    # Two 4-hour places scoring 0.9 against eight 1-hour places scoring 0.6
+    scores = np.array([[0.9, 0.9] + [0.6] * 8])
+    durations = np.array([4, 4] + [1] * 8)
+    food = np.zeros(10, dtype=bool)
+    assignment = schedule_days(scores, durations, food, capacity=8, max_food=1)
+    assert list(np.flatnonzero(assignment == 0)) == [0, 1]
+
+
+def test_days_respect_hours_food_and_use_each_place_once():
+    rng = np.random.default_rng(7)
+    scores = rng.random((3, 40))
+    durations = rng.integers(1, 5, 40)
+    food = rng.random(40) < 0.3
+    assignment = schedule_days(scores, durations, food, capacity=8, max_food=1)
+    for day in range(3):
+        assert day_hours(assignment, durations, day) <= 8
+        assert int(food[assignment == day].sum()) <= 1
+    assert set(assignment.tolist()) <= {-1, 0, 1, 2}
+
+
+def test_unvisitable_places_are_never_scheduled():
+    scores = np.array([[0.9, -np.inf, 0.5]])
+    assignment = schedule_days(scores, np.array([2, 2, 2]), np.zeros(3, dtype=bool))
+    assert assignment[1] == -1
+
+
+@pytest.mark.parametrize('traveler_type, district', [
+    ('Adventure Seeker', 'Nilgiris'),
+    ('Nature Lover', 'Chennai'),
+    ('Adventure Seeker', 'Chennai'),
+    ('Culture Seeker', 'Madurai'),
+])
+def test_planned_places_mostly_match_traveler_type(traveler_type, district):
+    import app
+
+    user_data = {
+        'latestTrip': {'district': district, 'days': 3, 'budget': 'MODERATE', 'travelWith': 'Family'},
+        'travelerProfile': {'travelerType': traveler_type}
+    }
+    forecast = [{'condition': 'Clear', 'temp': 30, 'description': 'clear sky'}] * 3
+    itinerary, _, _ = app.plan_trip_csp(user_data, forecast)
+    places = [place for day_places in itinerary.values() for place in day_places]
+    matched = [place for place in places if traveler_type in place['category']]
+    assert places
+    assert len(matched) > len(places) / 2
@@ -1,34 +1,87 @@
 import pandas as pd
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import accuracy_score, classification_report
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.model_selection import cross_val_score
 import joblib
+from joblib import Parallel, delayed
+import argparse
 import os
+import re
+import time
+import resource
+from nb_inference import (EXPORT_FILENAME, QUESTION_FIELDS, InferenceClassifier, QuizClassifier, answer_options,
+                          check_exportable, export_model, save_counts_export)
 
 
-class TravelClassifier:
+# Streaming training defaults: rows per CSV chunk and size of the hashed feature space
+STREAM_CHUNK_SIZE = 100_000
+HASH_FEATURES = 2 ** 18
+
+
+def answer_texts(df):
+    """Combine each row's answers into one text feature with vectorized string concatenation"""
+    text = df[QUESTION_FIELDS[0]].astype(str)
+    for field in QUESTION_FIELDS[1:]:
+        text = text + ' ' + df[field].astype(str)
+    return text
+
+
+def read_chunks(csv_path, chunk_size):
+    """(row offset, chunk) for every labelled chunk of a CSV"""
+    offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        chunk = chunk[chunk['label'].notna()]
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def naive_bayes_log_probs(feature_count, class_count, alpha=1.0):
+    """(feature_log_prob, class_log_prior) from counts, as MultinomialNB computes them"""
+    smoothed = feature_count + alpha
+    feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+    return feature_log_prob, np.log(class_count) - np.log(class_count.sum())
+
+
+def score_chunk(offset, chunk, vectorizer, columns, classes, fold_models):
+    """Correct predictions and row counts per fold for one chunk, and the worker's peak memory"""
+    folds = len(fold_models)
+    X = vectorizer.transform(answer_texts(chunk))[:, columns]
+    labels = np.searchsorted(classes, chunk['label'].to_numpy())
+    fold = (offset + np.arange(len(chunk))) % folds
+    correct, total = np.zeros(folds, dtype=np.int64), np.zeros(folds, dtype=np.int64)
+    for f, (feature_log_prob, class_log_prior) in enumerate(fold_models):
+        rows = np.flatnonzero(fold == f)
+        predicted = np.asarray(X[rows] @ feature_log_prob.T + class_log_prior).argmax(axis=1)
+        correct[f] = int((predicted == labels[rows]).sum())
+        total[f] = len(rows)
+    return correct, total, peak_rss_mb()
+
+
+class TravelClassifier(QuizClassifier):
     def __init__(self):
         self.vectorizer = CountVectorizer()
         self.classifier = MultinomialNB()
+        self.lookup = None
+        # Every token seen by train_streaming, in vocabulary order (hashed models only)
+        self.hashed_tokens = None
         
     def prepare_features(self, df):
         """Combine all question answers into a single text feature"""
-        features = df.apply(
-            lambda row: f"{row['q1_activity']} {row['q2_destination']} "
-                       f"{row['q3_pace']} {row['q4_accommodation']} "
-                       f"{row['q5_souvenir']} {row['q6_evening']} "
-                       f"{row['q7_motivation']}", 
-            axis=1
-        )
-        return features
+        return answer_texts(df)
     
     def train(self, csv_path):
         """Train the Naive Bayes model"""
-        # Load data
-        df = pd.read_csv(csv_path)
-        
+        return self.train_frame(pd.read_csv(csv_path))
+    
+    def train_frame(self, df):
+        """Train the Naive Bayes model on labelled answers already loaded"""
         # Prepare features and labels
         X = self.prepare_features(df)
         y = df['label']
@@ -37,6 +90,10 @@ class TravelClassifier:
         X_vec = self.vectorizer.fit_transform(X)
         self.classifier.fit(X_vec, y)
         
+        # A compiled lookup table from the previous fit is no longer valid
+        if self.lookup is not None:
+            self.compile(answer_options(df))
+        
         # Perform cross-validation to estimate accuracy
         cv_scores = cross_val_score(self.classifier, X_vec, y, cv=3)
         
@@ -46,29 +103,135 @@ class TravelClassifier:
         
         return cv_scores.mean()
     
-    def predict(self, answers):
-        """Predict traveler type from answers"""
-        # Combine answers into single text
-        text = f"{answers['q1_activity']} {answers['q2_destination']} " \
-               f"{answers['q3_pace']} {answers['q4_accommodation']} " \
-               f"{answers['q5_souvenir']} {answers['q6_evening']} " \
-               f"{answers['q7_motivation']}"
+    def train_streaming(self, csv_path, chunk_size=STREAM_CHUNK_SIZE, n_features=HASH_FEATURES, folds=3, n_jobs=-1):
+        """
+        Train on a CSV too large for memory, one chunk at a time.
+        
+        Features are hashed, so there is no vocabulary pass: each chunk is
+        transformed and fed to partial_fit. The same pass keeps per-fold
+        counts, so cross-validation needs no refitting; the folds' held-out
+        rows are then scored chunk by chunk in parallel worker processes.
+        Returns a report with accuracy, throughput and peak memory.
+        """
+        start = time.perf_counter()
+        # partial_fit needs every class up front; reading one column is cheap
+        classes = np.sort(pd.read_csv(csv_path, usecols=['label'])['label'].dropna().unique())
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        check_exportable(self.vectorizer)
+        self.classifier = MultinomialNB()
+        analyze = self.vectorizer.build_analyzer()
+        
+        tokens = set()
+        fold_features = [csr_matrix((len(classes), n_features)) for _ in range(folds)]
+        fold_classes = np.zeros((folds, len(classes)))
+        rows = 0
+        for offset, chunk in read_chunks(csv_path, chunk_size):
+            X = self.vectorizer.transform(answer_texts(chunk))
+            labels = np.searchsorted(classes, chunk['label'].to_numpy())
+            self.classifier.partial_fit(X, classes[labels], classes=classes)
+            
+            # Answers repeat heavily, so tokenizing the distinct ones is enough to know every token
+            for field in QUESTION_FIELDS:
+                for answer in chunk[field].astype(str).unique():
+                    tokens.update(analyze(answer))
+            
+            one_hot = csr_matrix((np.ones(len(chunk)), (np.arange(len(chunk)), labels)),
+                                 shape=(len(chunk), len(classes)))
+            fold = (offset + np.arange(len(chunk))) % folds
+            for f in range(folds):
+                held_out = np.flatnonzero(fold == f)
+                fold_features[f] = fold_features[f] + one_hot[held_out].T @ X[held_out]
+                fold_classes[f] += np.asarray(one_hot[held_out].sum(axis=0)).ravel()
+            rows += len(chunk)
+        train_seconds = time.perf_counter() - start
         
-        # Vectorize and predict
-        features = self.vectorizer.transform([text])
-        prediction = self.classifier.predict(features)[0]
-        probabilities = self.classifier.predict_proba(features)[0]
+        self.hashed_tokens = sorted(tokens)
+        columns = self.hashed_columns()
+        if len(np.unique(columns)) < len(columns):
+            print(f"⚠ {len(columns) - len(np.unique(columns))} tokens share a hashed column; raise n_features")
         
-        # Get confidence (probability of predicted class)
-        confidence = float(max(probabilities))
+        # Fold model f is the full counts minus fold f's rows, over the seen tokens like the export
+        feature_count = self.classifier.feature_count_[:, columns]
+        fold_models = [
+            naive_bayes_log_probs(feature_count - fold_features[f][:, columns].toarray(),
+                                  self.classifier.class_count_ - fold_classes[f], self.classifier.alpha)
+            for f in range(folds)
+        ]
+        cv_start = time.perf_counter()
+        # Parallel over chunks rather than over folds: each chunk is hashed once and scored by every
+        # fold model, where a job per fold would hash the whole CSV once per fold and use only `folds` cores
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(score_chunk)(offset, chunk, self.vectorizer, columns, classes, fold_models)
+            for offset, chunk in read_chunks(csv_path, chunk_size)
+        )
+        cv_seconds = time.perf_counter() - cv_start
+        correct = sum(c for c, _, _ in results)
+        total = sum(t for _, t, _ in results)
+        cv_scores = correct / np.maximum(total, 1)
         
-        return prediction, confidence
+        report = {
+            'rows': rows,
+            'accuracy': float(cv_scores.mean()),
+            'accuracy_std': float(cv_scores.std()),
+            'train_seconds': round(train_seconds, 3),
+            'train_rows_per_second': round(rows / train_seconds),
+            'cv_seconds': round(cv_seconds, 3),
+            'cv_rows_per_second': round(rows / cv_seconds),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'peak_worker_rss_mb': round(max(peak for _, _, peak in results), 1) if results else 0.0
+        }
+        print(f"Mean Accuracy: {cv_scores.mean() * 100:.2f}%")
+        print(f"Standard Deviation: {cv_scores.std() * 100:.2f}%")
+        print(f"Rows: {rows} | training {report['train_rows_per_second']:,} rows/s | "
+              f"cross-validation {report['cv_rows_per_second']:,} rows/s")
+        print(f"Peak memory: {report['peak_rss_mb']} MB (largest worker {report['peak_worker_rss_mb']} MB)")
+        return report
+    
+    def hashed_columns(self):
+        """Hashed feature column of each token in hashed_tokens"""
+        return self.vectorizer.transform(self.hashed_tokens).indices
+    
+    @property
+    def classes_(self):
+        return self.classifier.classes_
+    
+    def answer_counts(self, texts):
+        """Dense token count matrix for a list of texts"""
+        return self.vectorizer.transform(texts).toarray()
+    
+    def posterior_counts(self, counts):
+        """Class probabilities for a dense count matrix"""
+        return self.classifier.predict_proba(csr_matrix(counts))
+    
+    def posterior(self, texts):
+        """Class probabilities for raw answer texts (one sparse transform)"""
+        return self.classifier.predict_proba(self.vectorizer.transform(texts))
     
     def save_model(self, model_dir='models'):
         """Save trained model and vectorizer"""
         os.makedirs(model_dir, exist_ok=True)
         joblib.dump(self.classifier, f'{model_dir}/naive_bayes_model.pkl')
         joblib.dump(self.vectorizer, f'{model_dir}/vectorizer.pkl')
+        self.export(model_dir)
+    
+    def export(self, model_dir='models'):
+        """Write the NumPy-only inference export next to the pickles"""
+        if not isinstance(self.vectorizer, HashingVectorizer):
+            export_model(self.vectorizer, self.classifier, model_dir)
+            return
+        if self.hashed_tokens is None:
+            raise ValueError("A hashed model can only be exported right after train_streaming")
+        # Serve the seen tokens as a vocabulary: the same model CountVectorizer would have built
+        template = InferenceClassifier()
+        template.vocabulary = {token: i for i, token in enumerate(self.hashed_tokens)}
+        template.classes_ = self.classifier.classes_
+        template.token_pattern = re.compile(self.vectorizer.token_pattern)
+        template.lowercase = self.vectorizer.lowercase
+        model = InferenceClassifier.from_counts(
+            template, self.classifier.feature_count_[:, self.hashed_columns()], self.classifier.class_count_,
+            float(self.classifier.alpha), None
+        )
+        save_counts_export(model, f'{model_dir}/{EXPORT_FILENAME}')
     
     def load_model(self, model_dir='models'):
         """Load trained model and vectorizer"""
@@ -78,15 +241,26 @@ class TravelClassifier:
 
 def main():
     """Main training script"""
+    parser = argparse.ArgumentParser(description='Train the traveler type classifier')
+    parser.add_argument('--csv', default='data/training-data.csv')
+    parser.add_argument('--stream', action='store_true', help='train in chunks with hashed features')
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE)
+    parser.add_argument('--n-features', type=int, default=HASH_FEATURES)
+    parser.add_argument('--jobs', type=int, default=-1, help='worker processes for cross-validation')
+    parser.add_argument('--model-dir', default='models')
+    args = parser.parse_args()
+    
     # Initialize classifier
     classifier = TravelClassifier()
     
     # Train model
-    csv_path = 'data/training-data.csv'
-    accuracy = classifier.train(csv_path)
+    if args.stream:
+        classifier.train_streaming(args.csv, args.chunk_size, args.n_features, n_jobs=args.jobs)
+    else:
+        classifier.train(args.csv)
     
     # Save model
-    classifier.save_model()
+    classifier.save_model(args.model_dir)
 
 
 if __name__ == '__main__':
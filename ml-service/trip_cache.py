@@ -0,0 +1,87 @@
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def forecast_signature(weather_forecast):
+    """Short hash of the per-day forecast (conditions, temps and descriptions end up in the itinerary)"""
+    payload = json.dumps(weather_forecast, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def plan_key(user_data, weather_forecast):
+    """Cache key for everything plan_trip_csp's output depends on"""
+    trip = user_data['latestTrip']
+    options = json.dumps(user_data.get('options') or {}, sort_keys=True, default=str)
+    return (
+        trip['district'],
+        trip['days'],
+        trip['budget'],
+        user_data['travelerProfile']['travelerType'],
+        options,
+        forecast_signature(weather_forecast)
+    )
+
+
+class TripCache:
+    """
+    Size-bounded LRU cache of planned itineraries.
+
+    Entries belong to a version (of the places data); asking with a
+    different version drops everything cached under the old one.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _check_version(self, version):
+        # Caller holds the lock
+        if version != self.version:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key, version):
+        """Deep copy of the cached plan, or None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, version, value):
+        if self.max_entries <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def snapshot(self):
+        """Counters for /health"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+            stats['version'] = self.version
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,233 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+
+
+FORECAST_DAYS = 5
+
+logger = logging.getLogger('ml_service.weather')
+
+
+class OpenWeatherMapBackend:
+    """Fetches the 5-day forecast from OpenWeatherMap (or any server speaking its API)"""
+
+    def __init__(self, api_key, base_url='http://api.openweathermap.org/data/2.5', timeout=5):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, city):
+        """Return one forecast entry per day; raises on any upstream failure"""
+        response = self.session.get(
+            f"{self.base_url}/forecast",
+            params={'q': city, 'appid': self.api_key, 'units': 'metric'},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Weather API error: {response.status_code}")
+        return parse_forecast(response.json())
+
+
+class StaticBackend:
+    """Serves forecasts from a dict of city -> forecast list (for tests and offline runs)"""
+
+    def __init__(self, forecasts=None, default=None):
+        self.forecasts = forecasts or {}
+        self.default = default
+
+    def fetch(self, city):
+        if city in self.forecasts:
+            return self.forecasts[city]
+        if self.default is not None:
+            return self.default
+        raise KeyError(f"No fixture forecast for {city}")
+
+
+def parse_forecast(data, days=FORECAST_DAYS):
+    """Pick one 3-hourly OpenWeatherMap entry per day (every 8th entry)"""
+    forecast = []
+    for i in range(days):
+        if i * 8 < len(data['list']):
+            day_data = data['list'][i * 8]
+            forecast.append({
+                'day': i + 1,
+                'condition': day_data['weather'][0]['main'],
+                'temp': round(day_data['main']['temp'], 1),
+                'description': day_data['weather'][0]['description'],
+                'humidity': day_data['main']['humidity']
+            })
+    return forecast
+
+
+class _Entry:
+    def __init__(self, forecast, fetched_at, failed=False):
+        self.forecast = forecast
+        self.fetched_at = fetched_at
+        self.failed = failed
+        self.retry_after = 0
+
+
+class ForecastCache:
+    """
+    In-process forecast cache keyed by city.
+
+    Fresh entries (younger than ttl) are served directly. Stale entries (within
+    stale_ttl after that) are served immediately while a background refresh runs.
+    Concurrent misses for the same city share a single upstream fetch, and
+    failures are remembered for error_ttl so a broken upstream is not retried
+    on every request.
+    """
+
+    def __init__(self, backend, ttl=600, stale_ttl=3600, error_ttl=60, max_entries=256, wait_timeout=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0,
+                      'refreshes': 0, 'errors': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(city):
+        return city.strip().lower()
+
+    def get(self, city, days):
+        """Forecast for up to min(days, 5) days; [] when no forecast is available"""
+        key = self.key(city)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cached(key, days, now)
+            if cached is not None:
+                forecast, refresh = cached
+                if refresh and key not in self._inflight:
+                    self._start_fetch(key, city, background=True)
+                return forecast
+
+            self.stats['misses'] += 1
+            done = self._inflight.get(key)
+            owner = done is None
+            if owner:
+                done = self._start_fetch(key, city)
+            else:
+                self.stats['coalesced'] += 1
+
+        if owner:
+            self._fetch(key, city, done)
+        else:
+            done.wait(self.wait_timeout)
+        return self.current(city, days)
+
+    def current(self, city, days):
+        """Stored forecast whatever its age, [] when there is none (counters untouched)"""
+        with self._lock:
+            entry = self._entries.get(self.key(city))
+            if entry is None or entry.failed:
+                return []
+            return self._slice(entry.forecast, days)
+
+    def peek(self, city, days):
+        """
+        Cached forecast without fetching, for callers that fetch on their own.
+
+        Returns (forecast, refresh): refresh is True when a stale entry should
+        be refreshed, and forecast is None on a miss. Pass what was fetched
+        (None on failure) to store(), then read it back with current().
+        """
+        key = self.key(city)
+        with self._lock:
+            cached = self._cached(key, days, time.monotonic())
+            if cached is None:
+                self.stats['misses'] += 1
+                return None, True
+            return cached
+
+    def store(self, city, forecast):
+        self._store(self.key(city), forecast)
+
+    def count(self, event):
+        with self._lock:
+            self.stats[event] += 1
+
+    def _cached(self, key, days, now):
+        """(forecast, refresh) of a servable entry, None on a miss (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = now - entry.fetched_at
+        self._entries.move_to_end(key)
+        if entry.failed:
+            if age < self.error_ttl:
+                self.stats['hits'] += 1
+                return [], False
+        elif age < self.ttl:
+            self.stats['hits'] += 1
+            return self._slice(entry.forecast, days), False
+        elif age < self.ttl + self.stale_ttl or now < entry.retry_after:
+            # Stale-while-revalidate: answer now, refresh in the background
+            self.stats['stale_hits'] += 1
+            return self._slice(entry.forecast, days), now >= entry.retry_after
+        return None
+
+    def _start_fetch(self, key, city, background=False):
+        """Register an in-flight fetch (caller holds the lock)"""
+        done = threading.Event()
+        self._inflight[key] = done
+        if background:
+            self.stats['refreshes'] += 1
+            threading.Thread(target=self._fetch, args=(key, city, done), daemon=True).start()
+        return done
+
+    def _fetch(self, key, city, done):
+        try:
+            forecast = self.backend.fetch(city)
+            logger.info("forecast_fetched city=%s days=%d", city, len(forecast))
+        except Exception as e:
+            logger.warning("forecast_failed city=%s error=%r", city, str(e))
+            forecast = None
+        self._store(key, forecast)
+        done.set()
+
+    def _store(self, key, forecast):
+        """Record a fetched forecast, or a failed fetch when forecast is None"""
+        with self._lock:
+            if forecast is None:
+                self.stats['errors'] += 1
+                previous = self._entries.get(key)
+                if previous is not None and not previous.failed:
+                    # Keep serving the last good forecast, but don't retry until error_ttl passes
+                    previous.retry_after = time.monotonic() + self.error_ttl
+                    entry = previous
+                else:
+                    entry = _Entry([], time.monotonic(), failed=True)
+            else:
+                entry = _Entry(forecast, time.monotonic())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _slice(forecast, days):
+        return [dict(day) for day in forecast[:min(days, FORECAST_DAYS)]]
+
+    def snapshot(self):
+        """Counters for /health"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()